@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 from functools import lru_cache
 
 
@@ -16,8 +16,96 @@ class Settings(BaseSettings):
     # JWT
     JWT_SECRET: str = "your-super-secret-jwt-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
+    # Access tokens are short-lived and carry the user's claims;
+    # JWT_EXPIRES_IN_DAYS is the lifetime of refresh tokens
+    JWT_ACCESS_TOKEN_EXPIRES_MINUTES: int = 15
     JWT_EXPIRES_IN_DAYS: int = 7
     
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    # Size of the dedicated hashing pool (0 = one per CPU, max 4) and how many
+    # hashing requests may wait for it before new ones get a 503
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
+    # Authenticated-user cache (0 disables it)
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+    AUTH_USER_CACHE_MAX_SIZE: int = 1024
+    # How often each worker checks the shared version stamp; this bounds how
+    # long a change made through another worker (e.g. deactivation) can go unseen
+    AUTH_CACHE_VERSION_CHECK_SECONDS: int = 5
+    
+    # Pipeline report uploads (POST /pipelines/{project}/{pipeline}/reports):
+    # results written per transaction, upload size kept in memory before
+    # spilling to a temporary file, and largest Cucumber feature (one JSON
+    # array item) held in memory while parsing
+    PIPELINE_REPORT_BATCH_SIZE: int = 1000
+    PIPELINE_REPORT_SPOOL_MEMORY_MB: int = 8
+    PIPELINE_REPORT_MAX_ITEM_MB: int = 64
+    
+    # Asynchronous ingestion (?async=true): payloads are spooled to disk and
+    # processed by INGEST_WORKERS threads per process; new jobs get a 503
+    # once INGEST_QUEUE_MAX_DEPTH jobs are queued or running
+    INGEST_SPOOL_DIR: str = "spool/ingest"
+    INGEST_WORKERS: int = 2
+    INGEST_QUEUE_MAX_DEPTH: int = 100
+    INGEST_POLL_SECONDS: float = 2.0
+    INGEST_JOB_TIMEOUT_MINUTES: int = 30
+    INGEST_MAX_ATTEMPTS: int = 3
+    
+    # Retention of raw pipeline history (python cli.py purge-results); rollups
+    # are kept forever. Per-project overrides as JSON, e.g. {"123": 365};
+    # 0 days keeps everything
+    RESULT_RETENTION_DAYS: int = 180
+    RESULT_RETENTION_PROJECT_DAYS: Dict[str, int] = {}
+    RESULT_ARCHIVE_DIR: str = "archive"
+    RETENTION_PIPELINES_PER_BATCH: int = 50
+    RETENTION_DELETE_BATCH_SIZE: int = 500
+    RETENTION_BATCH_PAUSE_SECONDS: float = 0.05
+    
+    # Flaky-test detection (python cli.py refresh-test-health): the last
+    # FLAKY_WINDOW_RUNS PASSED/FAILED results per test case are scored, newer
+    # runs weighing more (half-life in runs). Scores are scaled down for test
+    # cases with fewer than FLAKY_MIN_RUNS runs
+    FLAKY_WINDOW_RUNS: int = 50
+    FLAKY_MIN_RUNS: int = 10
+    FLAKY_HALF_LIFE_RUNS: float = 20.0
+    FLAKY_SCORE_THRESHOLD: float = 0.1
+    FLAKY_CHUNK_SIZE: int = 5000
+    
+    # CI shard plans (POST /api/pipelines/shard-plan): estimated duration of
+    # scenarios without any history when the selection has none either
+    SHARD_DEFAULT_DURATION_SECONDS: int = 60
+    SHARD_MAX_COUNT: int = 100
+    
+    # Pipeline diffs: a scenario has regressed in duration when it took at least
+    # this much longer than in the compared pipeline, both relative and in seconds
+    DIFF_DURATION_REGRESSION_RATIO: float = 0.5
+    DIFF_DURATION_REGRESSION_MIN_SECONDS: int = 5
+    
+    # Test cases per POST /api/test-cases/bulk request (one transaction)
+    TEST_CASE_BULK_MAX_ITEMS: int = 5000
+    
+    # .feature file imports (POST /api/applications/{id}/feature-files, cli.py
+    # import-features): upload size kept in memory before spilling to disk, and
+    # cap on the uncompressed size of the .feature files of a zip
+    FEATURE_IMPORT_SPOOL_MEMORY_MB: int = 8
+    FEATURE_IMPORT_MAX_MB: int = 200
+    
+    # Step library (GET /api/steps/suggest): seconds between refreshes of each
+    # worker's suggestion index from the step_library table
+    STEP_LIBRARY_REFRESH_SECONDS: int = 30
+    
+    # Near-duplicate test cases (python cli.py find-duplicates): steps are cut
+    # into DUPLICATE_SHINGLE_WORDS-word shingles, and test cases whose shingle
+    # sets have a Jaccard similarity of at least DUPLICATE_THRESHOLD are
+    # clustered. Signatures are computed by DUPLICATE_WORKERS processes (0: one
+    # per CPU), DUPLICATE_BATCH_SIZE test cases per task
+    DUPLICATE_THRESHOLD: float = 0.8
+    DUPLICATE_SHINGLE_WORDS: int = 3
+    DUPLICATE_WORKERS: int = 0
+    DUPLICATE_BATCH_SIZE: int = 2000
+    
     # CORS
     CORS_ORIGIN: str = "http://localhost:5173"
     
@@ -29,6 +117,16 @@ class Settings(BaseSettings):
     # GitLab Integration (optional)
     GITLAB_URL: Optional[str] = None
     GITLAB_TOKEN: Optional[str] = None
+    # Pipeline sync (POST /api/pipelines/sync): at most GITLAB_SYNC_CONCURRENCY
+    # requests in flight; 429/5xx responses are retried honouring Retry-After.
+    # The first sync of a project goes back GITLAB_SYNC_INITIAL_DAYS days
+    GITLAB_SYNC_CONCURRENCY: int = 8
+    GITLAB_SYNC_PER_PAGE: int = 100
+    GITLAB_SYNC_TIMEOUT_SECONDS: float = 30.0
+    GITLAB_SYNC_MAX_RETRIES: int = 5
+    GITLAB_SYNC_INITIAL_DAYS: int = 30
+    GITLAB_SYNC_FETCH_JOBS: bool = True
+    GITLAB_SYNC_LOCK_MINUTES: int = 30
     
     # Email (SMTP)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -1,14 +1,22 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+database_url = make_url(settings.DATABASE_URL)
+engine_options = {}
+if database_url.get_backend_name() == "mssql" and database_url.get_driver_name() == "pyodbc":
+    # Send executemany batches (bulk inserts/updates) as one parameter array
+    engine_options["fast_executemany"] = True
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     pool_size=10,
-    max_overflow=20
+    max_overflow=20,
+    **engine_options
 )
 
 # Create session factory
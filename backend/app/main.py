@@ -12,6 +12,8 @@ from app.middleware.error_handler import (
     sqlalchemy_error_handler, jwt_error_handler, generic_error_handler
 )
 from app.middleware.request_logger import RequestLoggerMiddleware
+from app.services.password_hasher import password_hasher
+from app.services.ingest_queue_service import ingest_queue
 
 # Import routers
 from app.routers import (
@@ -25,6 +27,8 @@ from app.routers import (
     pipelines,
     dashboard,
     uploads,
+    api_keys,
+    steps,
 )
 
 # Create tables
@@ -66,7 +70,9 @@ def health_check():
     """Health check endpoint."""
     return {
         "status": "ok",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "passwordHashing": password_hasher.stats(),
+        "ingestQueue": ingest_queue.stats()
     }
 
 
@@ -81,6 +87,8 @@ app.include_router(test_requests.router, prefix="/api")
 app.include_router(pipelines.router, prefix="/api")
 app.include_router(dashboard.router, prefix="/api")
 app.include_router(uploads.router, prefix="/api")
+app.include_router(api_keys.router, prefix="/api")
+app.include_router(steps.router, prefix="/api")
 
 # Static files for uploaded images (e.g., test request references)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -93,12 +101,15 @@ async def startup_event():
     print(f"Server running on http://localhost:{settings.PORT}")
     print(f"API available at http://localhost:{settings.PORT}/api")
     print(f"Docs available at http://localhost:{settings.PORT}/api/docs")
+    ingest_queue.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event handler."""
     print("Shutting down...")
+    password_hasher.shutdown()
+    ingest_queue.shutdown()
 
 
 if __name__ == "__main__":
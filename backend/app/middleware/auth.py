@@ -1,12 +1,31 @@
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Union
 from app.database import get_db
-from app.services.auth_service import decode_token
+from app.config import settings
+from app.services.auth_service import decode_token, ACCESS_TOKEN_TYPE
+from app.services.token_service import revocation_list, revoke_user_access_tokens, revoke_refresh_tokens
+from app.services.cache_service import VersionedCache, bump_cache_version
+from app.services.api_key_service import (
+    ApiKeyPrincipal, authenticate_api_key, is_api_key, SCOPE_PIPELINES_WRITE
+)
 from app.models import User, UserRole, UserStatus
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+AUTH_USERS_CACHE = "auth_users"
+
+# Active users by ID, shared by every request in this worker
+user_cache = VersionedCache(
+    AUTH_USERS_CACHE,
+    ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_USER_CACHE_MAX_SIZE,
+    version_check_seconds=settings.AUTH_CACHE_VERSION_CHECK_SECONDS,
+)
 
 
 class AuthUser:
@@ -19,6 +38,58 @@ class AuthUser:
         self.last_name = last_name
 
 
+def _load_active_user(db: Session, user_id: str) -> Optional[AuthUser]:
+    """Load an active user as AuthUser, or None if missing or inactive."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user or user.status != UserStatus.ACTIVE:
+        return None
+    return AuthUser(
+        id=user.id,
+        email=user.email,
+        role=user.role,
+        first_name=user.first_name,
+        last_name=user.last_name
+    )
+
+
+def _auth_user_from_claims(payload: dict) -> Optional[AuthUser]:
+    """Build the AuthUser embedded in an access token, or None for legacy tokens."""
+    if payload.get("type") != ACCESS_TOKEN_TYPE:
+        return None
+    try:
+        return AuthUser(
+            id=payload["userId"],
+            email=payload["email"],
+            role=UserRole(payload["role"]),
+            first_name=payload["firstName"],
+            last_name=payload["lastName"]
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+def get_active_user(db: Session, user_id: str) -> Optional[AuthUser]:
+    """Return the active user for `user_id`, served from the user cache when possible."""
+    return user_cache.get(db, user_id, lambda: _load_active_user(db, user_id))
+
+
+def invalidate_user(db: Session, user_id: str, revoke_sessions: bool = False) -> None:
+    """
+    Mark a user's auth data as changed.
+
+    Call before committing a change to a user's email, names, role, status
+    or password (or its deletion). Access tokens issued so far are revoked,
+    since their embedded claims are stale; `revoke_sessions` also revokes
+    the user's refresh tokens. This worker drops its cached copy once the
+    session commits; other workers do so on their next version check.
+    """
+    bump_cache_version(db, AUTH_USERS_CACHE)
+    revoke_user_access_tokens(db, user_id)
+    if revoke_sessions:
+        revoke_refresh_tokens(db, user_id)
+    event.listen(db, "after_commit", lambda session: user_cache.invalidate(user_id), once=True)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -42,29 +113,30 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Access tokens carry the user's claims: no database lookup needed
+    claims_user = _auth_user_from_claims(payload)
+    if claims_user:
+        if revocation_list.is_revoked(db, payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revocado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return claims_user
     
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario no encontrado",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # Legacy tokens (userId only) are resolved against the database
+    user = get_active_user(db, user_id)
     
-    if user.status != UserStatus.ACTIVE:
+    if not user:
+        # Load once more to tell a missing user from an inactive one
+        exists = db.query(User.id).filter(User.id == user_id).first()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario inactivo",
+            detail="Usuario inactivo" if exists else "Usuario no encontrado",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return AuthUser(
-        id=user.id,
-        email=user.email,
-        role=user.role,
-        first_name=user.first_name,
-        last_name=user.last_name
-    )
+    return user
 
 
 async def get_current_admin_user(
@@ -80,7 +152,7 @@ async def get_current_admin_user(
 
 
 def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db)
 ) -> Optional[AuthUser]:
     """Get current user if authenticated, None otherwise."""
@@ -97,17 +169,57 @@ def get_optional_user(
         if not user_id:
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or user.status != UserStatus.ACTIVE:
-            return None
+        claims_user = _auth_user_from_claims(payload)
+        if claims_user:
+            return None if revocation_list.is_revoked(db, payload) else claims_user
         
-        return AuthUser(
-            id=user.id,
-            email=user.email,
-            role=user.role,
-            first_name=user.first_name,
-            last_name=user.last_name
-        )
+        return get_active_user(db, user_id)
     except Exception:
         return None
 
+
+
+async def get_pipeline_ingest_principal(
+    api_key: Optional[str] = Depends(api_key_header),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Union[AuthUser, ApiKeyPrincipal]:
+    """
+    Authenticate a pipeline ingestion call.
+
+    CI jobs send an API key with the `pipelines:write` scope, either in
+    the X-API-Key header or as the bearer token; users send their JWT.
+    """
+    if not api_key and credentials and is_api_key(credentials.credentials):
+        api_key = credentials.credentials
+    
+    if api_key:
+        principal = authenticate_api_key(db, api_key)
+        if not principal:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key inválida o expirada",
+            )
+        if not principal.has_scope(SCOPE_PIPELINES_WRITE):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="La API key no tiene permiso para registrar resultados"
+            )
+        return principal
+    
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No autorizado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(credentials, db)
+
+
+def ensure_project_access(principal: Union[AuthUser, ApiKeyPrincipal], gitlab_project_id: str) -> None:
+    """Reject API keys restricted to other GitLab projects."""
+    if isinstance(principal, ApiKeyPrincipal) and not principal.can_access_project(gitlab_project_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="La API key no tiene acceso a este proyecto"
+        )
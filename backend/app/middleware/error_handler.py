@@ -30,7 +30,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={
             "success": False,
             "message": exc.detail
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
@@ -12,6 +12,17 @@ from app.models.pipeline import (
 )
 from app.models.test_request import TestRequest, TestRequestStatus
 from app.models.integration import IntegrationConfig, NotificationLog
+from app.models.cache_version import CacheVersion
+from app.models.token import RefreshToken, RevokedToken
+from app.models.api_key import ApiKey
+from app.models.ingest_job import IngestJob, IngestJobKind, IngestJobStatus, IngestReceipt
+from app.models.rollup import TestResultHourlyRollup, TestResultDailyRollup
+from app.models.result_purge import ResultPurgeState
+from app.models.test_case_health import TestCaseHealth
+from app.models.duration_sketch import DurationSketch, DurationSketchScope
+from app.models.gitlab_sync import GitlabSyncState, GitlabSyncStatus
+from app.models.step_library import StepLibraryEntry
+from app.models.duplicate_cluster import DuplicateCluster, DuplicateClusterMember, DuplicateClusterStatus
 
 __all__ = [
     "User", "UserRole", "UserStatus",
@@ -24,5 +35,16 @@ __all__ = [
     "TestCasePipelineResult", "TestCaseResultStatus",
     "TestRequest", "TestRequestStatus",
     "IntegrationConfig", "NotificationLog",
+    "CacheVersion",
+    "RefreshToken", "RevokedToken",
+    "ApiKey",
+    "IngestJob", "IngestJobKind", "IngestJobStatus", "IngestReceipt",
+    "TestResultHourlyRollup", "TestResultDailyRollup",
+    "ResultPurgeState",
+    "TestCaseHealth",
+    "DurationSketch", "DurationSketchScope",
+    "GitlabSyncState", "GitlabSyncStatus",
+    "StepLibraryEntry",
+    "DuplicateCluster", "DuplicateClusterMember", "DuplicateClusterStatus",
 ]
 
@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
+from sqlalchemy.orm import relationship
+from app.database import Base
+from app.utils.id_generator import generate_cuid
+
+
+class ApiKey(Base):
+    """Machine credential for CI jobs; only the key's hash is stored."""
+    __tablename__ = "api_keys"
+
+    id = Column(String, primary_key=True, default=generate_cuid)
+    name = Column(String, nullable=False)
+    key_prefix = Column(String(12), nullable=False)  # shown to admins to identify the key
+    key_hash = Column(String(64), unique=True, nullable=False)
+    scopes = Column(JSON, default=list, nullable=False)
+    # Empty means every project
+    gitlab_project_ids = Column(JSON, default=list, nullable=False)
+    created_by_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    created_by = relationship("User")
+
+    def __repr__(self):
+        return f"<ApiKey {self.name} {self.key_prefix}>"
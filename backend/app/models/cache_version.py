@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer
+from app.database import Base
+
+
+class CacheVersion(Base):
+    """Version stamp shared by every worker for an in-process cache."""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
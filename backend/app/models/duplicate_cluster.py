@@ -0,0 +1,50 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, String, Enum, DateTime, Float, ForeignKey, Integer, Index
+from app.database import Base
+from app.utils.id_generator import generate_cuid
+
+
+class DuplicateClusterStatus(str, enum.Enum):
+    OPEN = "OPEN"
+    CONFIRMED = "CONFIRMED"  # the same test written more than once
+    DISMISSED = "DISMISSED"  # similar on purpose; later runs keep the decision
+
+
+class DuplicateCluster(Base):
+    """Test cases with near-identical steps, found by python cli.py find-duplicates (see test_case_duplicate_service)."""
+    __tablename__ = "duplicate_clusters"
+
+    id = Column(String, primary_key=True, default=generate_cuid)
+    # SHA-256 of the sorted member IDs: a later run finding the same
+    # test cases updates this row instead of opening a new one
+    key = Column(String(64), nullable=False, unique=True)
+    status = Column(Enum(DuplicateClusterStatus), default=DuplicateClusterStatus.OPEN, nullable=False)
+    size = Column(Integer, nullable=False)
+    application_count = Column(Integer, nullable=False)
+    feature_count = Column(Integer, nullable=False)
+    # Highest step similarity (Jaccard) between two members
+    similarity = Column(Float, nullable=False)
+    reviewed_by_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    reviewed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_duplicate_clusters_status_similarity", "status", "similarity"),
+    )
+
+    def __repr__(self):
+        return f"<DuplicateCluster {self.id} size={self.size} {self.status}>"
+
+
+class DuplicateClusterMember(Base):
+    __tablename__ = "duplicate_cluster_members"
+
+    cluster_id = Column(String, ForeignKey("duplicate_clusters.id", ondelete="CASCADE"), primary_key=True)
+    test_case_id = Column(String, ForeignKey("test_cases.id", ondelete="CASCADE"), primary_key=True, index=True)
+    # Highest similarity to another member of the cluster
+    similarity = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<DuplicateClusterMember {self.cluster_id} {self.test_case_id}>"
@@ -0,0 +1,28 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, String, Enum, DateTime, Integer, Float, LargeBinary
+from app.database import Base
+
+
+class DurationSketchScope(str, enum.Enum):
+    TEST_CASE = "TEST_CASE"
+    FEATURE = "FEATURE"
+    APPLICATION = "APPLICATION"
+
+
+class DurationSketch(Base):
+    """All-time DDSketch of reported result durations (seconds) for one scope."""
+    __tablename__ = "duration_sketches"
+
+    scope = Column(Enum(DurationSketchScope), primary_key=True)
+    scope_id = Column(String(64), primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)  # DDSketch.to_bytes()
+    count = Column(Integer, default=0, nullable=False)
+    # Read from the sketch on every write so lists can sort on them
+    p50 = Column(Float, nullable=True)
+    p90 = Column(Float, nullable=True)
+    p99 = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<DurationSketch {self.scope} {self.scope_id} n={self.count}>"
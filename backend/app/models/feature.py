@@ -19,6 +19,8 @@ class Feature(Base):
     name = Column(String, nullable=False, index=True)
     description = Column(String, nullable=True)
     feature_file_path = Column(String, nullable=True)
+    # SHA-256 of the file last imported (feature_file_service); unchanged files are skipped
+    feature_file_hash = Column(String(64), nullable=True)
     status = Column(Enum(FeatureStatus), default=FeatureStatus.PLANNED, nullable=False)
     application_id = Column(String, ForeignKey("applications.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,28 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, String, Enum, DateTime, Integer, Text
+from app.database import Base
+
+
+class GitlabSyncStatus(str, enum.Enum):
+    RUNNING = "RUNNING"
+    OK = "OK"
+    FAILED = "FAILED"
+
+
+class GitlabSyncState(Base):
+    """Incremental GitLab pipeline sync progress of one project."""
+    __tablename__ = "gitlab_sync_states"
+
+    gitlab_project_id = Column(String(64), primary_key=True)
+    # Highest pipeline updated_at already stored; the next sync asks for newer ones
+    updated_after = Column(DateTime, nullable=True)
+    status = Column(Enum(GitlabSyncStatus), nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    pipelines = Column(Integer, default=0, nullable=False)  # pipelines fetched by the last run
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<GitlabSyncState {self.gitlab_project_id} {self.updated_after}>"
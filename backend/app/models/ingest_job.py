@@ -0,0 +1,72 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, String, Enum, DateTime, Integer, Text, JSON, Index, UniqueConstraint
+from app.database import Base
+from app.utils.id_generator import generate_cuid
+
+
+class IngestJobKind(str, enum.Enum):
+    RESULTS = "RESULTS"  # RegisterPipelineResult JSON
+    REPORT = "REPORT"    # raw Cucumber JSON / JUnit XML report
+
+
+class IngestJobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class IngestJob(Base):
+    """Queued pipeline ingestion; the payload itself lives in the spool directory."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, default=generate_cuid)
+    kind = Column(Enum(IngestJobKind), nullable=False)
+    status = Column(Enum(IngestJobStatus), default=IngestJobStatus.QUEUED, nullable=False)
+    gitlab_project_id = Column(String(64), nullable=False)
+    gitlab_pipeline_id = Column(String(64), nullable=False)
+    payload_path = Column(String, nullable=False)
+    # Upload options (report format, branch, status...) for REPORT jobs
+    options = Column(JSON, default=dict, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ingest_jobs_status_created", "status", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<IngestJob {self.id} {self.status}>"
+
+
+class IngestReceipt(Base):
+    """
+    Response of a completed ingestion call, kept so that retries replay it.
+
+    Keyed by pipeline and either the client's Idempotency-Key or the
+    payload's content hash ("sha256:<hex>").
+    """
+    __tablename__ = "ingest_receipts"
+
+    id = Column(String, primary_key=True, default=generate_cuid)
+    gitlab_project_id = Column(String(64), nullable=False)
+    gitlab_pipeline_id = Column(String(64), nullable=False)
+    idempotency_key = Column(String(255), nullable=False)
+    payload_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(JSON, nullable=False)
+    # Set for async uploads; the receipt is dropped if the job fails so a retry re-queues it
+    ingest_job_id = Column(String(64), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("gitlab_project_id", "gitlab_pipeline_id", "idempotency_key", name="uq_ingest_receipt"),
+    )
+
+    def __repr__(self):
+        return f"<IngestReceipt {self.gitlab_project_id}/{self.gitlab_pipeline_id} {self.idempotency_key}>"
@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Integer, Text, UniqueConstraint
+from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Integer, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.utils.id_generator import generate_cuid
@@ -63,6 +63,11 @@ class TestCasePipelineResult(Base):
 
     __table_args__ = (
         UniqueConstraint("test_case_id", "pipeline_id", name="uq_test_case_pipeline"),
+        # Whole pipelines (diffs, retention): the unique key leads with test_case_id
+        Index(
+            "ix_test_case_pipeline_results_pipeline", "pipeline_id", "test_case_id",
+            mssql_include=["status", "duration"]
+        ),
     )
 
     def __repr__(self):
@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer
+from app.database import Base
+
+
+class ResultPurgeState(Base):
+    """Raw pipeline results of one project already purged by retention."""
+    __tablename__ = "result_purge_states"
+
+    gitlab_project_id = Column(String(64), primary_key=True)
+    # Newest created_at among the purged results: rollups of that day and
+    # earlier can no longer be rebuilt from raw rows
+    newest_result_at = Column(DateTime, nullable=False)
+    results = Column(Integer, default=0, nullable=False)  # results purged so far
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ResultPurgeState {self.gitlab_project_id} {self.newest_result_at}>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Enum, DateTime, Integer, BigInteger
+from app.database import Base
+from app.models.pipeline import TestCaseResultStatus
+
+
+class _ResultRollupColumns:
+    """Pipeline result counts per time bucket and (application, feature, test case, status)."""
+    bucket_start = Column(DateTime, primary_key=True)  # UTC, truncated to the bucket size
+    application_id = Column(String(64), primary_key=True, default="")
+    feature_id = Column(String(64), primary_key=True)
+    test_case_id = Column(String(64), primary_key=True)
+    status = Column(Enum(TestCaseResultStatus), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    # Sum and number of reported durations (seconds), for averages
+    duration_sum = Column(BigInteger, default=0, nullable=False)
+    duration_count = Column(Integer, default=0, nullable=False)
+
+
+class TestResultHourlyRollup(_ResultRollupColumns, Base):
+    __tablename__ = "test_result_rollups_hourly"
+
+    def __repr__(self):
+        return f"<TestResultHourlyRollup {self.bucket_start} {self.test_case_id} {self.status}>"
+
+
+class TestResultDailyRollup(_ResultRollupColumns, Base):
+    __tablename__ = "test_result_rollups_daily"
+
+    def __repr__(self):
+        return f"<TestResultDailyRollup {self.bucket_start} {self.test_case_id} {self.status}>"
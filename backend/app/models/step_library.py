@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, Index
+from app.database import Base
+
+
+class StepLibraryEntry(Base):
+    """A step text with its parameters replaced by placeholders, and how many steps use it."""
+    __tablename__ = "step_library"
+
+    key = Column(String(64), primary_key=True)  # SHA-256 of the folded template
+    template = Column(String, nullable=False)
+    # Entries are kept at 0 so incremental index refreshes see the removal
+    usage_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_step_library_updated_at", "updated_at"),
+    )
+
+    def __repr__(self):
+        return f"<StepLibraryEntry {self.template[:30]} x{self.usage_count}>"
@@ -1,9 +1,10 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Integer, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Integer, Text, JSON, Index, event, inspect
+from sqlalchemy.orm import relationship, Session, deferred
 from app.database import Base
 from app.utils.id_generator import generate_cuid
+from app.utils.normalization import normalize_scenario_name, SCENARIO_KEY_MAX_LENGTH
 
 
 class TestCaseType(str, enum.Enum):
@@ -53,6 +54,15 @@ class TestCase(Base):
     # En PostgreSQL se usaba ARRAY(String); para mejor compatibilidad entre motores usamos JSON
     tags = Column(JSON, default=list, nullable=False)
     scenario_name = Column(String, nullable=True)
+    # Normalized scenario_name (see normalize_scenario_name), kept in sync on write
+    scenario_key = Column(String(SCENARIO_KEY_MAX_LENGTH), nullable=True, index=True)
+    # Copy of feature.application_id so scenario keys can be unique per application
+    application_id = Column(String(64), nullable=True)
+    # Steps and sub-steps as the API serves them (serialize_steps), rewritten
+    # whenever they change so single reads need no joins. NULL until written
+    # or backfilled (cli.py backfill-steps-documents); the step tables stay
+    # authoritative. Deferred: list queries don't need it
+    steps_document = deferred(Column(JSON(none_as_null=True), nullable=True))
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -63,10 +73,62 @@ class TestCase(Base):
     pipeline_results = relationship("TestCasePipelineResult", back_populates="test_case", cascade="all, delete-orphan")
     test_requests = relationship("TestRequest", back_populates="generated_test_case")
 
+    __table_args__ = (
+        # Filtered so that test cases without a scenario don't collide
+        Index(
+            "uq_test_case_scenario_key", "application_id", "scenario_key", unique=True,
+            mssql_where=scenario_key.isnot(None),
+            postgresql_where=scenario_key.isnot(None),
+            sqlite_where=scenario_key.isnot(None)
+        ),
+    )
+
     def __repr__(self):
         return f"<TestCase {self.name}>"
 
 
+@event.listens_for(TestCase.scenario_name, "set")
+def _set_scenario_key(target, value, oldvalue, initiator):
+    target.scenario_key = normalize_scenario_name(value)
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_scenario_scope(session, flush_context, instances):
+    """Keep TestCase.application_id in step with the test case's feature."""
+    from app.models.feature import Feature
+
+    pending = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, TestCase) and (
+            obj.application_id is None or _changed(obj, "feature_id")
+        )
+    ]
+    if pending:
+        feature_ids = {tc.feature_id for tc in pending if tc.feature_id}
+        with session.no_autoflush:
+            applications = dict(
+                session.query(Feature.id, Feature.application_id).filter(Feature.id.in_(feature_ids))
+            ) if feature_ids else {}
+        for tc in pending:
+            feature = tc.__dict__.get("feature")
+            if feature is not None and tc.feature_id in (None, feature.id):
+                # Assigned through the relationship, possibly before the feature has an ID
+                tc.application_id = feature.application_id
+            else:
+                tc.application_id = applications.get(tc.feature_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Feature) and _changed(obj, "application_id"):
+            with session.no_autoflush:
+                session.query(TestCase).filter(TestCase.feature_id == obj.id).update(
+                    {TestCase.application_id: obj.application_id}, synchronize_session=False
+                )
+
+
+def _changed(obj, attribute: str) -> bool:
+    return inspect(obj).attrs[attribute].history.has_changes()
+
+
 class GherkinStep(Base):
     __tablename__ = "gherkin_steps"
 
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Integer, Float
+from app.database import Base
+from app.models.pipeline import TestCaseResultStatus
+
+
+class TestCaseHealth(Base):
+    """Flakiness metrics over a test case's recent PASSED/FAILED results (see flaky_service)."""
+    __tablename__ = "test_case_health"
+
+    test_case_id = Column(String, ForeignKey("test_cases.id", ondelete="CASCADE"), primary_key=True)
+    application_id = Column(String(64), nullable=True, index=True)
+    runs = Column(Integer, default=0, nullable=False)
+    failures = Column(Integer, default=0, nullable=False)
+    # PASSED <-> FAILED changes between consecutive runs on the same branch
+    flips = Column(Integer, default=0, nullable=False)
+    flip_rate = Column(Float, default=0.0, nullable=False)
+    failure_rate = Column(Float, default=0.0, nullable=False)
+    score = Column(Float, default=0.0, nullable=False, index=True)
+    # Seconds, over the same runs; used to balance CI shards
+    duration_p90 = Column(Float, nullable=True)
+    last_status = Column(Enum(TestCaseResultStatus), nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<TestCaseHealth {self.test_case_id} score={self.score:.2f}>"
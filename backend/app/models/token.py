@@ -0,0 +1,44 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base
+from app.utils.id_generator import generate_cuid
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String, primary_key=True, default=generate_cuid)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # sha256 hex, never the raw token
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    user = relationship("User", back_populates="refresh_tokens")
+
+    def __repr__(self):
+        return f"<RefreshToken user={self.user_id}>"
+
+
+class RevokedToken(Base):
+    """
+    Access token revocation list.
+
+    An entry either revokes a single token (`jti`) or every token issued to
+    `user_id` before `revoked_before`. Entries are only needed until
+    `expires_at`, when every token they cover has expired on its own.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(String, primary_key=True, default=generate_cuid)
+    jti = Column(String, nullable=True, index=True)
+    user_id = Column(String, nullable=True, index=True)
+    revoked_before = Column(Float, nullable=True)  # unix timestamp compared against the token's iat
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<RevokedToken jti={self.jti} user={self.user_id}>"
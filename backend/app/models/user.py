@@ -33,6 +33,7 @@ class User(Base):
     subscriptions = relationship("GroupSubscription", back_populates="user", cascade="all, delete-orphan")
     test_requests = relationship("TestRequest", foreign_keys="TestRequest.requester_id", back_populates="requester")
     assigned_requests = relationship("TestRequest", foreign_keys="TestRequest.assignee_id", back_populates="assignee")
+    refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<User {self.email}>"
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import ApiKey
+from app.schemas.api_key import ApiKeyCreate
+from app.services.api_key_service import create_api_key, revoke_api_key, API_KEY_SCOPES
+from app.middleware.auth import get_current_admin_user, AuthUser
+
+router = APIRouter(prefix="/api-keys", tags=["api-keys"])
+
+
+def _serialize(api_key: ApiKey) -> dict:
+    return {
+        "id": api_key.id,
+        "name": api_key.name,
+        "keyPrefix": api_key.key_prefix,
+        "scopes": api_key.scopes or [],
+        "gitlabProjectIds": api_key.gitlab_project_ids or [],
+        "expiresAt": api_key.expires_at.isoformat() if api_key.expires_at else None,
+        "revokedAt": api_key.revoked_at.isoformat() if api_key.revoked_at else None,
+        "createdAt": api_key.created_at.isoformat(),
+        "createdBy": {
+            "id": api_key.created_by.id,
+            "email": api_key.created_by.email
+        } if api_key.created_by else None
+    }
+
+
+@router.get("")
+def get_api_keys(
+    current_user: AuthUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Get all API keys (admin only)."""
+    api_keys = db.query(ApiKey).order_by(ApiKey.created_at.desc()).all()
+    
+    return {
+        "success": True,
+        "data": [_serialize(api_key) for api_key in api_keys]
+    }
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+def create_key(
+    key_data: ApiKeyCreate,
+    current_user: AuthUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Create an API key (admin only). The key is only returned here."""
+    invalid = [scope for scope in key_data.scopes if scope not in API_KEY_SCOPES]
+    if invalid or not key_data.scopes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Scopes inválidos: {', '.join(invalid) or 'ninguno'}"
+        )
+    
+    api_key, raw_key = create_api_key(
+        db,
+        name=key_data.name,
+        scopes=key_data.scopes,
+        gitlab_project_ids=key_data.gitlab_project_ids or [],
+        created_by_id=current_user.id,
+        expires_in_days=key_data.expires_in_days
+    )
+    db.commit()
+    db.refresh(api_key)
+    
+    return {
+        "success": True,
+        "data": {**_serialize(api_key), "key": raw_key}
+    }
+
+
+@router.delete("/{api_key_id}")
+def delete_key(
+    api_key_id: str,
+    current_user: AuthUser = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Revoke an API key (admin only)."""
+    api_key = db.query(ApiKey).filter(ApiKey.id == api_key_id).first()
+    
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API key no encontrada"
+        )
+    
+    if not api_key.revoked_at:
+        revoke_api_key(db, api_key)
+        db.commit()
+    
+    return {
+        "success": True,
+        "message": "API key revocada exitosamente"
+    }
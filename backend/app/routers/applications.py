@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, func
 from typing import Optional
 from math import ceil
+from tempfile import SpooledTemporaryFile
+from app.config import settings
 from app.database import get_db
-from app.models import Application, Group, Feature, TestRequest, TestCase
+from app.models import Application, Group, Feature, TestRequest, TestCase, DurationSketchScope
 from app.schemas.application import ApplicationCreate, ApplicationUpdate
 from app.middleware.auth import get_current_user, AuthUser
+from app.services.duration_sketch_service import duration_percentiles
+from app.services.result_matrix_service import build_result_matrix
+from app.services.feature_file_service import (
+    import_feature_files, iter_application_zip, read_zip, FeatureFileError, FEATURE_FILE_SUFFIX
+)
+from app.services.gherkin_parser import LANGUAGES
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
@@ -354,3 +364,133 @@ def get_application_stats(
         }
     }
 
+
+@router.get("/{app_id}/durations")
+def get_application_durations(
+    app_id: str,
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Duration percentiles (seconds) of every result reported for the application."""
+    app = db.query(Application.id).filter(Application.id == app_id).first()
+    
+    if not app:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aplicación no encontrada"
+        )
+    
+    return {
+        "success": True,
+        "data": duration_percentiles(db, DurationSketchScope.APPLICATION, app_id)
+    }
+
+
+@router.get("/{app_id}/result-matrix")
+def get_application_result_matrix(
+    app_id: str,
+    last: int = Query(50, ge=1, le=200),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Results of every test case of the application in its last `last`
+    pipelines, as a 2-bit-per-cell bitmap (base64). See
+    result_matrix_service for the encoding.
+    """
+    app = db.query(Application.id).filter(Application.id == app_id).first()
+    
+    if not app:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aplicación no encontrada"
+        )
+    
+    return {
+        "success": True,
+        "data": build_result_matrix(db, app_id, last)
+    }
+
+
+def _ensure_application(db: Session, app_id: str) -> None:
+    if not db.query(Application.id).filter(Application.id == app_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aplicación no encontrada"
+        )
+
+
+@router.post("/{app_id}/feature-files")
+async def import_application_feature_files(
+    app_id: str,
+    request: Request,
+    path: Optional[str] = None,
+    force: bool = False,
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import .feature files into the application.
+
+    The request body is a zip of .feature files (paths inside the zip
+    identify the features) or a single .feature file, whose path is given
+    with ?path=. Files unchanged since their last import are skipped unless
+    ?force=true. See feature_file_service for how files are matched.
+    """
+    _ensure_application(db, app_id)
+    
+    with SpooledTemporaryFile(max_size=settings.FEATURE_IMPORT_SPOOL_MEMORY_MB * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        is_zip = spool.read(2) == b"PK"
+        spool.seek(0)
+        
+        if not is_zip and not (path and path.endswith(FEATURE_FILE_SUFFIX)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Envíe un zip de archivos .feature, o un archivo .feature indicando ?path="
+            )
+        
+        def run_import():
+            files = read_zip(spool) if is_zip else [(path.strip("/"), spool.read())]
+            summary = import_feature_files(db, app_id, files, force)
+            db.commit()
+            return summary
+        
+        try:
+            summary = await run_in_threadpool(run_import)
+        except FeatureFileError as exc:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc)
+            )
+    
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+@router.get("/{app_id}/feature-files")
+def export_application_feature_files(
+    app_id: str,
+    language: str = "en",
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The application's features as .feature files in a zip, streamed one file at a time."""
+    _ensure_application(db, app_id)
+    
+    if language not in LANGUAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idioma no soportado, use uno de: {', '.join(LANGUAGES)}"
+        )
+    
+    return StreamingResponse(
+        iter_application_zip(app_id, language),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="features-{app_id}.zip"'}
+    )
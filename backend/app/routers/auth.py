@@ -1,18 +1,32 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User, UserStatus
-from app.schemas.user import UserLogin, UserCreate, ChangePassword
-from app.services.auth_service import hash_password, verify_password, create_access_token
-from app.middleware.auth import get_current_user, AuthUser
+from app.schemas.user import UserLogin, UserCreate, ChangePassword, RefreshTokenRequest, LogoutRequest
+from app.services.auth_service import decode_token, ACCESS_TOKEN_TYPE
+from app.services.password_hasher import password_hasher
+from app.services.token_service import (
+    issue_tokens, rotate_refresh_token, revoke_refresh_token, revoke_access_token
+)
+from app.middleware.auth import get_current_user, invalidate_user, security, AuthUser
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _find_user(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email.lower()).first()
+
+
+# The routes that hash passwords are async so they can await the hasher
+# pool; their database work goes to the threadpool, off the event loop.
+
 @router.post("/login")
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """Login with email and password."""
-    user = db.query(User).filter(User.email == credentials.email.lower()).first()
+    user = await run_in_threadpool(_find_user, db, credentials.email)
     
     if not user:
         raise HTTPException(
@@ -26,33 +40,44 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Usuario inactivo. Contacte al administrador."
         )
     
-    if not verify_password(credentials.password, user.password):
+    valid, new_hash = await password_hasher.verify_and_update(credentials.password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas"
         )
     
-    token = create_access_token(user.id)
-    
-    return {
-        "success": True,
-        "data": {
-            "token": token,
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "firstName": user.first_name,
-                "lastName": user.last_name,
-                "role": user.role.value,
+    def sign_in():
+        # Transparently upgrade hashes made with a different BCRYPT_ROUNDS
+        if new_hash:
+            user.password = new_hash
+        
+        tokens = issue_tokens(db, user)
+        db.commit()
+        
+        return {
+            "success": True,
+            "data": {
+                "token": tokens["token"],
+                "refreshToken": tokens["refreshToken"],
+                "expiresIn": tokens["expiresIn"],
+                "user": {
+                    "id": user.id,
+                    "email": user.email,
+                    "firstName": user.first_name,
+                    "lastName": user.last_name,
+                    "role": user.role.value,
+                }
             }
         }
-    }
+    
+    return await run_in_threadpool(sign_in)
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
-    existing_user = db.query(User).filter(User.email == user_data.email.lower()).first()
+    existing_user = await run_in_threadpool(_find_user, db, user_data.email)
     
     if existing_user:
         raise HTTPException(
@@ -60,38 +85,96 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="El email ya está registrado"
         )
     
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     
-    new_user = User(
-        email=user_data.email.lower(),
-        password=hashed_password,
-        first_name=user_data.first_name,
-        last_name=user_data.last_name,
-        role=user_data.role or "USER",
-        status=user_data.status or "ACTIVE"
-    )
+    def create():
+        new_user = User(
+            email=user_data.email.lower(),
+            password=hashed_password,
+            first_name=user_data.first_name,
+            last_name=user_data.last_name,
+            role=user_data.role or "USER",
+            status=user_data.status or "ACTIVE"
+        )
+        
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        
+        tokens = issue_tokens(db, new_user)
+        db.commit()
+        
+        return {
+            "success": True,
+            "data": {
+                "token": tokens["token"],
+                "refreshToken": tokens["refreshToken"],
+                "expiresIn": tokens["expiresIn"],
+                "user": {
+                    "id": new_user.id,
+                    "email": new_user.email,
+                    "firstName": new_user.first_name,
+                    "lastName": new_user.last_name,
+                    "role": new_user.role.value,
+                }
+            }
+        }
     
-    db.add(new_user)
+    return await run_in_threadpool(create)
+
+
+@router.post("/refresh")
+def refresh(data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access/refresh token pair."""
+    rotated = rotate_refresh_token(db, data.refresh_token)
+    # Commit even on failure: reuse of a revoked token revokes the user's sessions
     db.commit()
-    db.refresh(new_user)
     
-    token = create_access_token(new_user.id)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión expirada. Inicie sesión nuevamente."
+        )
+    
+    user, tokens = rotated
     
     return {
         "success": True,
         "data": {
-            "token": token,
+            "token": tokens["token"],
+            "refreshToken": tokens["refreshToken"],
+            "expiresIn": tokens["expiresIn"],
             "user": {
-                "id": new_user.id,
-                "email": new_user.email,
-                "firstName": new_user.first_name,
-                "lastName": new_user.last_name,
-                "role": new_user.role.value,
+                "id": user.id,
+                "email": user.email,
+                "firstName": user.first_name,
+                "lastName": user.last_name,
+                "role": user.role.value,
             }
         }
     }
 
 
+@router.post("/logout")
+def logout(
+    data: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Revoke the current access token and, if given, its refresh token."""
+    payload = decode_token(credentials.credentials)
+    if payload and payload.get("type") == ACCESS_TOKEN_TYPE:
+        revoke_access_token(db, payload)
+    if data and data.refresh_token:
+        revoke_refresh_token(db, data.refresh_token)
+    db.commit()
+    
+    return {
+        "success": True,
+        "message": "Sesión cerrada exitosamente"
+    }
+
+
 @router.get("/me")
 def get_me(
     current_user: AuthUser = Depends(get_current_user),
@@ -126,25 +209,36 @@ def get_me(
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: ChangePassword,
     current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Change current user's password."""
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.id == current_user.id).first())
     
-    if not verify_password(data.current_password, user.password):
+    valid, _ = await password_hasher.verify_and_update(data.current_password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
         )
     
-    user.password = hash_password(data.new_password)
-    db.commit()
+    hashed_password = await password_hasher.hash(data.new_password)
+    
+    def save():
+        user.password = hashed_password
+        # Sign out every other session and hand this one a fresh token pair
+        invalidate_user(db, user.id, revoke_sessions=True)
+        tokens = issue_tokens(db, user)
+        db.commit()
+        return tokens
+    
+    tokens = await run_in_threadpool(save)
     
     return {
         "success": True,
-        "message": "Contraseña actualizada exitosamente"
+        "message": "Contraseña actualizada exitosamente",
+        "data": tokens
     }
 
@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from typing import Optional
 from datetime import datetime, timedelta
 from app.database import get_db
 from app.models import (
     Group, Application, Feature, TestCase, TestRequest,
-    GitlabPipeline, TestCasePipelineResult
+    GitlabPipeline
 )
 from app.middleware.auth import get_current_user, AuthUser
+from app.services.stats_service import count_breakdowns, scalar_counts
+from app.services.rollup_service import rollup_status_counts, rollup_series
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -19,48 +21,41 @@ def get_dashboard_stats(
     db: Session = Depends(get_db)
 ):
     """Get dashboard statistics."""
-    # Basic counts
-    total_groups = db.query(Group).count()
-    total_applications = db.query(Application).filter(Application.status == "ACTIVE").count()
-    total_features = db.query(Feature).count()
-    total_test_cases = db.query(TestCase).count()
-    total_requests = db.query(TestRequest).count()
-    pending_requests = db.query(TestRequest).filter(TestRequest.status == "NEW").count()
-    
-    # Recent pipelines (last 7 days)
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_pipelines = db.query(GitlabPipeline).filter(
-        GitlabPipeline.executed_at >= seven_days_ago
-    ).count()
     
-    # Test cases by status
-    test_cases_by_status = db.query(
-        TestCase.status, func.count(TestCase.id)
-    ).group_by(TestCase.status).all()
+    # Basic counts (one round trip)
+    counts = scalar_counts(
+        db,
+        groups=select(func.count(Group.id)),
+        applications=select(func.count(Application.id)).where(Application.status == "ACTIVE"),
+        features=select(func.count(Feature.id)),
+        recent_pipelines=select(func.count(GitlabPipeline.id)).where(
+            GitlabPipeline.executed_at >= seven_days_ago
+        ),
+    )
     
-    # Requests by status
-    requests_by_status = db.query(
-        TestRequest.status, func.count(TestRequest.id)
-    ).group_by(TestRequest.status).all()
+    # Test cases and requests by status, totals included
+    test_cases = count_breakdowns(
+        db, select(TestCase.id), {"status": TestCase.status}, TestCase.id
+    )
+    requests = count_breakdowns(
+        db, select(TestRequest.id), {"status": TestRequest.status}, TestRequest.id
+    )
     
     return {
         "success": True,
         "data": {
             "overview": {
-                "totalGroups": total_groups,
-                "totalApplications": total_applications,
-                "totalFeatures": total_features,
-                "totalTestCases": total_test_cases,
-                "totalRequests": total_requests,
-                "pendingRequests": pending_requests,
-                "recentPipelines": recent_pipelines
+                "totalGroups": counts["groups"],
+                "totalApplications": counts["applications"],
+                "totalFeatures": counts["features"],
+                "totalTestCases": test_cases.total,
+                "totalRequests": requests.total,
+                "pendingRequests": requests.get("status").get("NEW", 0),
+                "recentPipelines": counts["recent_pipelines"]
             },
-            "testCasesByStatus": [
-                {"status": s.value, "count": c} for s, c in test_cases_by_status
-            ],
-            "requestsByStatus": [
-                {"status": s.value, "count": c} for s, c in requests_by_status
-            ]
+            "testCasesByStatus": test_cases.as_list("status"),
+            "requestsByStatus": requests.as_list("status")
         }
     }
 
@@ -143,49 +138,26 @@ def get_test_cases_stats(
     db: Session = Depends(get_db)
 ):
     """Get test cases statistics by status, type, and priority."""
-    query = db.query(TestCase)
+    base = select(TestCase.id)
     
     if application_id:
-        query = query.join(Feature).filter(Feature.application_id == application_id)
+        base = base.join(Feature).where(Feature.application_id == application_id)
     elif group_id:
-        query = query.join(Feature).join(Application).filter(Application.group_id == group_id)
+        base = base.join(Feature).join(Application).where(Application.group_id == group_id)
     
-    # By status
-    by_status = db.query(
-        TestCase.status, func.count(TestCase.id)
+    breakdown = count_breakdowns(
+        db,
+        base,
+        {"status": TestCase.status, "type": TestCase.type, "priority": TestCase.priority},
+        TestCase.id
     )
-    if application_id:
-        by_status = by_status.join(Feature).filter(Feature.application_id == application_id)
-    elif group_id:
-        by_status = by_status.join(Feature).join(Application).filter(Application.group_id == group_id)
-    by_status = by_status.group_by(TestCase.status).all()
-    
-    # By type
-    by_type = db.query(
-        TestCase.type, func.count(TestCase.id)
-    )
-    if application_id:
-        by_type = by_type.join(Feature).filter(Feature.application_id == application_id)
-    elif group_id:
-        by_type = by_type.join(Feature).join(Application).filter(Application.group_id == group_id)
-    by_type = by_type.group_by(TestCase.type).all()
-    
-    # By priority
-    by_priority = db.query(
-        TestCase.priority, func.count(TestCase.id)
-    )
-    if application_id:
-        by_priority = by_priority.join(Feature).filter(Feature.application_id == application_id)
-    elif group_id:
-        by_priority = by_priority.join(Feature).join(Application).filter(Application.group_id == group_id)
-    by_priority = by_priority.group_by(TestCase.priority).all()
     
     return {
         "success": True,
         "data": {
-            "byStatus": [{"status": s.value, "count": c} for s, c in by_status],
-            "byType": [{"type": t.value, "count": c} for t, c in by_type],
-            "byPriority": [{"priority": p.value, "count": c} for p, c in by_priority]
+            "byStatus": breakdown.as_list("status"),
+            "byType": breakdown.as_list("type"),
+            "byPriority": breakdown.as_list("priority")
         }
     }
 
@@ -206,12 +178,10 @@ def get_pipeline_stats(
         GitlabPipeline.executed_at >= start_date
     ).group_by(GitlabPipeline.status).all()
     
-    # Test results by status
-    test_results_by_status = db.query(
-        TestCasePipelineResult.status, func.count(TestCasePipelineResult.id)
-    ).filter(
-        TestCasePipelineResult.created_at >= start_date
-    ).group_by(TestCasePipelineResult.status).all()
+    # Test results by status, from the rollups (cost grows with buckets, not executions)
+    test_results_by_status = [
+        (s, c) for s, c in rollup_status_counts(db, start_date).items() if c
+    ]
     
     # Recent pipelines
     recent_pipelines = db.query(GitlabPipeline).filter(
@@ -243,3 +213,32 @@ def get_pipeline_stats(
         }
     }
 
+
+@router.get("/result-trends")
+def get_result_trends(
+    days: int = Query(30, ge=1, le=365),
+    granularity: str = Query("day", pattern="^(day|hour)$"),
+    application_id: Optional[str] = Query(None, alias="applicationId"),
+    feature_id: Optional[str] = Query(None, alias="featureId"),
+    test_case_id: Optional[str] = Query(None, alias="testCaseId"),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Pipeline results per day or hour and status, from the rollup tables."""
+    if granularity == "hour":
+        days = min(days, 14)
+    start_date = datetime.utcnow() - timedelta(days=days)
+    
+    series = rollup_series(
+        db, start_date, granularity,
+        application_id=application_id, feature_id=feature_id, test_case_id=test_case_id
+    )
+    
+    return {
+        "success": True,
+        "data": {
+            "granularity": granularity,
+            "days": days,
+            "series": series
+        }
+    }
@@ -4,13 +4,29 @@ from sqlalchemy import or_
 from typing import Optional
 from math import ceil
 from app.database import get_db
-from app.models import Feature, Application, TestCase
+from app.models import Feature, Application, TestCase, DurationSketchScope
 from app.schemas.feature import FeatureCreate, FeatureUpdate
 from app.middleware.auth import get_current_user, AuthUser
+from app.services.duration_sketch_service import duration_percentiles
 
 router = APIRouter(prefix="/features", tags=["features"])
 
 
+def _ensure_scenarios_fit(db: Session, feature_id: str, application_id: str):
+    """Reject moving a feature whose scenarios are already used in the target application."""
+    clash = db.query(TestCase.id).filter(
+        TestCase.application_id == application_id,
+        TestCase.scenario_key.in_(
+            db.query(TestCase.scenario_key).filter(TestCase.feature_id == feature_id)
+        )
+    ).first()
+    if clash:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La aplicación destino ya tiene casos de prueba con los mismos escenarios"
+        )
+
+
 @router.get("")
 def get_features(
     application_id: Optional[str] = Query(None, alias="applicationId"),
@@ -215,6 +231,8 @@ def update_feature(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Aplicación no encontrada"
             )
+        if feature_data.application_id != feature.application_id:
+            _ensure_scenarios_fit(db, feature.id, feature_data.application_id)
         feature.application_id = feature_data.application_id
     
     db.commit()
@@ -330,3 +348,23 @@ def get_feature_test_cases(
         "data": result
     }
 
+
+@router.get("/{feature_id}/durations")
+def get_feature_durations(
+    feature_id: str,
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Duration percentiles (seconds) of every result reported for the feature."""
+    feature = db.query(Feature.id).filter(Feature.id == feature_id).first()
+    
+    if not feature:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Feature no encontrada"
+        )
+    
+    return {
+        "success": True,
+        "data": duration_percentiles(db, DurationSketchScope.FEATURE, feature_id)
+    }
@@ -1,13 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Path, Query, Request, Response, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional
+from typing import BinaryIO, Optional, Union
+import hashlib
+import json
+import os
 from math import ceil
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from app.config import settings
 from app.database import get_db
-from app.models import GitlabPipeline, TestCasePipelineResult, TestCase, PipelineStatus, TestCaseResultStatus
-from app.schemas.pipeline import RegisterPipelineResult
-from app.middleware.auth import get_current_user, AuthUser
+from app.models import (
+    GitlabPipeline, PipelineStatus, TestCaseResultStatus, IngestJob, IngestJobKind, IngestReceipt,
+    Application, Feature, GitlabSyncState
+)
+from app.schemas.pipeline import GITLAB_PROJECT_ID_PATTERN, RegisterPipelineResult, ShardPlanRequest
+from app.middleware.auth import (
+    get_current_user, get_pipeline_ingest_principal, ensure_project_access, AuthUser
+)
+from app.services.api_key_service import ApiKeyPrincipal
+from app.services.pipeline_ingest_service import (
+    ingest_pipeline_results, ingest_pipeline_report, serialize_ingested_pipeline
+)
+from app.services.ingest_queue_service import ingest_queue
+from app.services.shard_service import build_shard_plan
+from app.services.pipeline_diff_service import find_baseline, diff_pipelines
+from app.services.gitlab_sync_service import gitlab_configured, sync_gitlab_pipelines
+from app.services.idempotency_service import (
+    IngestRequestKey, find_replay, record_receipt, IDEMPOTENCY_HEADER, REPLAYED_HEADER
+)
+from app.services.report_parsers import (
+    open_report, detect_format, parse_report, ReportParseError, REPORT_FORMATS
+)
 
 router = APIRouter(prefix="/pipelines", tags=["pipelines"])
 
@@ -63,6 +87,46 @@ def get_pipelines(
     }
 
 
+@router.get("/ingest-jobs/{job_id}")
+def get_ingest_job(
+    job_id: str,
+    principal: Union[AuthUser, ApiKeyPrincipal] = Depends(get_pipeline_ingest_principal),
+    db: Session = Depends(get_db)
+):
+    """Status of an asynchronous ingestion job."""
+    job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trabajo de ingesta no encontrado"
+        )
+    ensure_project_access(principal, job.gitlab_project_id)
+    
+    return {"success": True, "data": _job_response(job)}
+
+
+@router.get("/sync-status")
+def get_sync_status(
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """GitLab sync progress of every project."""
+    states = db.query(GitlabSyncState).order_by(GitlabSyncState.gitlab_project_id).all()
+    return {
+        "success": True,
+        "data": [{
+            "gitlabProjectId": state.gitlab_project_id,
+            "status": state.status.value if state.status else None,
+            "updatedAfter": state.updated_after.isoformat() if state.updated_after else None,
+            "startedAt": state.started_at.isoformat() if state.started_at else None,
+            "finishedAt": state.finished_at.isoformat() if state.finished_at else None,
+            "pipelines": state.pipelines,
+            "error": state.error
+        } for state in states]
+    }
+
+
 @router.get("/{pipeline_id}")
 def get_pipeline(
     pipeline_id: str,
@@ -119,12 +183,35 @@ def get_pipeline(
 
 
 @router.post("/sync")
-def sync_pipelines(
-    project_id: str,
-    current_user: AuthUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def sync_pipelines(
+    background_tasks: BackgroundTasks,
+    project_id: Optional[str] = None,
+    wait: bool = False,
+    current_user: AuthUser = Depends(get_current_user)
 ):
-    """Sync pipelines from GitLab (placeholder)."""
+    """
+    Sync pipelines from GitLab, incrementally per project.
+
+    Without `project_id`, every project referenced by an application is
+    synced. Runs in the background unless `wait=true`; progress is visible
+    in GET /pipelines/sync-status.
+    """
+    if not gitlab_configured():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La integración con GitLab no está configurada"
+        )
+    projects = [project_id] if project_id else None
+    
+    if wait:
+        stats = await sync_gitlab_pipelines(projects)
+        return {
+            "success": True,
+            "message": "Sincronización de pipelines completada",
+            "data": stats
+        }
+    
+    background_tasks.add_task(sync_gitlab_pipelines, projects)
     return {
         "success": True,
         "message": "Sincronización de pipelines iniciada",
@@ -135,6 +222,127 @@ def sync_pipelines(
     }
 
 
+@router.post("/shard-plan")
+def create_shard_plan(
+    data: ShardPlanRequest,
+    principal: Union[AuthUser, ApiKeyPrincipal] = Depends(get_pipeline_ingest_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Split the automated scenarios of a project, application or set of
+    features into `shards` groups with balanced historical p90 duration.
+
+    Shard indexes are 1-based, like GitLab's CI_NODE_INDEX.
+    """
+    if not (data.gitlab_project_id or data.application_id or data.feature_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debe indicar un proyecto, una aplicación o una lista de features"
+        )
+    if data.shards > settings.SHARD_MAX_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El número de shards no puede superar {settings.SHARD_MAX_COUNT}"
+        )
+    
+    # API keys may be restricted to some GitLab projects
+    projects = set()
+    if data.gitlab_project_id:
+        projects.add(data.gitlab_project_id)
+    if data.application_id:
+        application = db.query(Application).filter(Application.id == data.application_id).first()
+        if not application:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Aplicación no encontrada"
+            )
+        projects.add(application.gitlab_project_id)
+    if data.feature_ids:
+        feature_ids = set(data.feature_ids)
+        rows = db.query(Feature.id, Application.gitlab_project_id).join(
+            Application, Application.id == Feature.application_id
+        ).filter(Feature.id.in_(feature_ids)).all()
+        if len(rows) != len(feature_ids):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Feature no encontrada"
+            )
+        projects.update(project_id for _, project_id in rows)
+    for project_id in projects:
+        ensure_project_access(principal, project_id)
+    
+    plan = build_shard_plan(
+        db, data.shards,
+        gitlab_project_id=data.gitlab_project_id,
+        application_id=data.application_id,
+        feature_ids=data.feature_ids
+    )
+    return {
+        "success": True,
+        "data": plan
+    }
+
+
+def _pipeline_summary(pipeline: GitlabPipeline) -> dict:
+    return {
+        "id": pipeline.id,
+        "gitlabProjectId": pipeline.gitlab_project_id,
+        "gitlabPipelineId": pipeline.gitlab_pipeline_id,
+        "branch": pipeline.branch,
+        "status": pipeline.status.value,
+        "webUrl": pipeline.web_url,
+        "executedAt": pipeline.executed_at.isoformat()
+    }
+
+
+@router.get("/{pipeline_id}/diff")
+def get_pipeline_diff(
+    pipeline_id: str,
+    against: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Compare a pipeline's results with another pipeline's.
+
+    Without `against`, the last passed pipeline of the same branch run
+    before it is used. Returns newly failing, newly passing, new, missing
+    and duration-regressed scenarios (at most `limit` of each, plus totals).
+    """
+    pipeline = db.query(GitlabPipeline).filter(GitlabPipeline.id == pipeline_id).first()
+    if not pipeline:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pipeline no encontrado"
+        )
+    
+    if against:
+        baseline = db.query(GitlabPipeline).filter(GitlabPipeline.id == against).first()
+        if not baseline:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pipeline de comparación no encontrado"
+            )
+    else:
+        baseline = find_baseline(db, pipeline)
+        if not baseline:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No hay un pipeline exitoso anterior en la misma rama para comparar"
+            )
+    
+    diff = diff_pipelines(db, pipeline.id, baseline.id, limit)
+    return {
+        "success": True,
+        "data": {
+            "pipeline": _pipeline_summary(pipeline),
+            "against": _pipeline_summary(baseline),
+            **diff
+        }
+    }
+
+
 @router.get("/{pipeline_id}/results")
 def get_pipeline_results(
     pipeline_id: str,
@@ -188,90 +396,184 @@ def get_pipeline_results(
     }
 
 
+def _job_response(job: IngestJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind.value,
+        "status": job.status.value,
+        "gitlabProjectId": job.gitlab_project_id,
+        "gitlabPipelineId": job.gitlab_pipeline_id,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+        "createdAt": job.created_at.isoformat(),
+        "startedAt": job.started_at.isoformat() if job.started_at else None,
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def _replay(response: Response, receipt: IngestReceipt) -> dict:
+    response.status_code = receipt.status_code
+    response.headers[REPLAYED_HEADER] = "true"
+    return receipt.response
+
+
+async def _receive_body(request: Request, target: BinaryIO, hasher) -> None:
+    async for chunk in request.stream():
+        target.write(chunk)
+        hasher.update(chunk)
+
+
 @router.post("/results")
 def register_pipeline_result(
     data: RegisterPipelineResult,
-    current_user: AuthUser = Depends(get_current_user),
+    response: Response,
+    async_mode: bool = Query(False, alias="async"),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    principal: Union[AuthUser, ApiKeyPrincipal] = Depends(get_pipeline_ingest_principal),
     db: Session = Depends(get_db)
 ):
-    """Register pipeline result from CI/CD."""
-    # Find or create pipeline
-    pipeline = db.query(GitlabPipeline).filter(
-        GitlabPipeline.gitlab_project_id == data.gitlab_project_id,
-        GitlabPipeline.gitlab_pipeline_id == data.gitlab_pipeline_id
-    ).first()
+    """
+    Register pipeline result from CI/CD (user token or API key).
+
+    With ?async=true the payload is queued and a 202 with the ingest job
+    is returned instead. A retry with the same Idempotency-Key (or, without
+    one, the same payload) returns the stored response without re-ingesting.
+    """
+    ensure_project_access(principal, data.gitlab_project_id)
     
-    if pipeline:
-        # Update existing pipeline
-        pipeline.status = data.pipeline_status or PipelineStatus.PASSED
-        pipeline.branch = data.branch or "main"
-        if data.web_url:
-            pipeline.web_url = data.web_url
-    else:
-        # Create new pipeline
-        pipeline = GitlabPipeline(
-            gitlab_project_id=data.gitlab_project_id,
-            gitlab_pipeline_id=data.gitlab_pipeline_id,
-            branch=data.branch or "main",
-            status=data.pipeline_status or PipelineStatus.PASSED,
-            web_url=data.web_url,
-            executed_at=data.executed_at or datetime.utcnow()
+    payload = data.model_dump_json(by_alias=True)
+    key = IngestRequestKey(
+        data.gitlab_project_id, data.gitlab_pipeline_id,
+        hashlib.sha256(payload.encode("utf-8")).hexdigest(), idempotency_key
+    )
+    receipt = find_replay(db, key)
+    if receipt:
+        return _replay(response, receipt)
+    
+    if async_mode:
+        ingest_queue.check_capacity(db)
+        payload_path = ingest_queue.new_payload_path()
+        with open(payload_path, "w", encoding="utf-8") as payload_file:
+            payload_file.write(payload)
+        job = ingest_queue.enqueue(
+            db, IngestJobKind.RESULTS, data.gitlab_project_id, data.gitlab_pipeline_id, payload_path
         )
-        db.add(pipeline)
-        db.commit()
-        db.refresh(pipeline)
+        body = {"success": True, "data": _job_response(job)}
+        record_receipt(db, key, status.HTTP_202_ACCEPTED, body, ingest_job_id=job.id)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return body
+    
+    pipeline, summary = ingest_pipeline_results(db, data)
     
-    # Register test results
-    if data.test_results:
-        for result_data in data.test_results:
-            test_case = None
+    body = {"success": True, "data": serialize_ingested_pipeline(pipeline, summary)}
+    record_receipt(db, key, status.HTTP_200_OK, body)
+    return body
+
+
+@router.post("/{project_id}/{pipeline_id}/reports")
+async def upload_pipeline_report(
+    request: Request,
+    response: Response,
+    project_id: str = Path(..., pattern=GITLAB_PROJECT_ID_PATTERN),
+    pipeline_id: str = Path(...),
+    report_format: Optional[str] = Query(None, alias="format"),
+    branch: Optional[str] = "main",
+    pipeline_status: Optional[PipelineStatus] = Query(None, alias="pipelineStatus"),
+    web_url: Optional[str] = Query(None, alias="webUrl"),
+    executed_at: Optional[datetime] = Query(None, alias="executedAt"),
+    async_mode: bool = Query(False, alias="async"),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    principal: Union[AuthUser, ApiKeyPrincipal] = Depends(get_pipeline_ingest_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Register a pipeline from a raw Cucumber JSON or JUnit XML report.
+
+    The request body is the report itself, optionally gzip-compressed.
+    It is spooled to a temporary file and parsed incrementally; results
+    are written in batches of PIPELINE_REPORT_BATCH_SIZE. With
+    ?async=true the report is spooled and a 202 with the ingest job is
+    returned instead. Retries are replayed as in POST /pipelines/results;
+    the content hash covers the report and the query options.
+    """
+    ensure_project_access(principal, project_id)
+    
+    if report_format and report_format not in REPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado, use uno de: {', '.join(REPORT_FORMATS)}"
+        )
+    
+    data = RegisterPipelineResult(
+        gitlab_project_id=project_id,
+        gitlab_pipeline_id=pipeline_id,
+        branch=branch,
+        pipeline_status=pipeline_status,
+        web_url=web_url,
+        executed_at=executed_at
+    )
+    options = data.model_dump(mode="json", by_alias=True, exclude={"test_results"})
+    options["format"] = report_format
+    hasher = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8"))
+    
+    if async_mode:
+        payload_path = ingest_queue.new_payload_path()
+        try:
+            with open(payload_path, "wb") as payload:
+                await _receive_body(request, payload, hasher)
+            key = IngestRequestKey(project_id, pipeline_id, hasher.hexdigest(), idempotency_key)
             
-            if result_data.test_case_id:
-                test_case = db.query(TestCase).filter(TestCase.id == result_data.test_case_id).first()
-            elif result_data.scenario_name:
-                test_case = db.query(TestCase).filter(
-                    func.lower(TestCase.scenario_name) == result_data.scenario_name.lower()
-                ).first()
+            def admit():
+                receipt = find_replay(db, key)
+                if receipt is None:
+                    ingest_queue.check_capacity(db)
+                return receipt
             
-            if test_case:
-                # Find or create result
-                existing_result = db.query(TestCasePipelineResult).filter(
-                    TestCasePipelineResult.test_case_id == test_case.id,
-                    TestCasePipelineResult.pipeline_id == pipeline.id
-                ).first()
-                
-                if existing_result:
-                    existing_result.status = result_data.status or TestCaseResultStatus.NOT_EXECUTED
-                    if result_data.details:
-                        existing_result.details = result_data.details
-                    if result_data.log_url:
-                        existing_result.log_url = result_data.log_url
-                    if result_data.duration:
-                        existing_result.duration = result_data.duration
-                else:
-                    new_result = TestCasePipelineResult(
-                        test_case_id=test_case.id,
-                        pipeline_id=pipeline.id,
-                        status=result_data.status or TestCaseResultStatus.NOT_EXECUTED,
-                        details=result_data.details,
-                        log_url=result_data.log_url,
-                        duration=result_data.duration
-                    )
-                    db.add(new_result)
+            receipt = await run_in_threadpool(admit)
+            if receipt:
+                os.remove(payload_path)
+                return _replay(response, receipt)
+        except BaseException:
+            if os.path.exists(payload_path):
+                os.remove(payload_path)
+            raise
+        
+        def enqueue():
+            job = ingest_queue.enqueue(db, IngestJobKind.REPORT, project_id, pipeline_id, payload_path, options)
+            body = {"success": True, "data": _job_response(job)}
+            record_receipt(db, key, status.HTTP_202_ACCEPTED, body, ingest_job_id=job.id)
+            return body
+        
+        body = await run_in_threadpool(enqueue)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return body
     
-    db.commit()
-    db.refresh(pipeline)
+    with SpooledTemporaryFile(max_size=settings.PIPELINE_REPORT_SPOOL_MEMORY_MB * 1024 * 1024) as spool:
+        await _receive_body(request, spool, hasher)
+        key = IngestRequestKey(project_id, pipeline_id, hasher.hexdigest(), idempotency_key)
+        receipt = await run_in_threadpool(find_replay, db, key)
+        if receipt:
+            return _replay(response, receipt)
+        spool.seek(0)
+        
+        def ingest():
+            report = open_report(spool)
+            results = parse_report(report, report_format or detect_format(report))
+            return ingest_pipeline_report(db, data, results, settings.PIPELINE_REPORT_BATCH_SIZE)
+        
+        try:
+            pipeline, summary = await run_in_threadpool(ingest)
+        except (ReportParseError, UnicodeDecodeError, OSError, EOFError) as exc:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Reporte inválido: {exc}"
+            )
     
-    return {
-        "success": True,
-        "data": {
-            "id": pipeline.id,
-            "gitlabProjectId": pipeline.gitlab_project_id,
-            "gitlabPipelineId": pipeline.gitlab_pipeline_id,
-            "branch": pipeline.branch,
-            "status": pipeline.status.value,
-            "webUrl": pipeline.web_url,
-            "executedAt": pipeline.executed_at.isoformat()
-        }
-    }
-
+    def store():
+        body = {"success": True, "data": serialize_ingested_pipeline(pipeline, summary)}
+        record_receipt(db, key, status.HTTP_200_OK, body)
+        return body
+    
+    return await run_in_threadpool(store)
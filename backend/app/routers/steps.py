@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from math import ceil
+from app.database import get_db
+from app.models import StepLibraryEntry
+from app.middleware.auth import get_current_user, AuthUser
+from app.services.step_library_service import step_index
+
+router = APIRouter(prefix="/steps", tags=["steps"])
+
+
+@router.get("")
+def get_steps(
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the step library, most used steps first."""
+    query = db.query(StepLibraryEntry).filter(StepLibraryEntry.usage_count > 0)
+    if search:
+        query = query.filter(StepLibraryEntry.template.ilike(f"%{search}%"))
+
+    total = query.count()
+    total_pages = ceil(total / limit)
+
+    entries = query.order_by(
+        StepLibraryEntry.usage_count.desc(), StepLibraryEntry.template.asc()
+    ).offset((page - 1) * limit).limit(limit).all()
+
+    return {
+        "success": True,
+        "data": [
+            {"key": entry.key, "template": entry.template, "usageCount": entry.usage_count}
+            for entry in entries
+        ],
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "totalPages": total_pages
+        }
+    }
+
+
+@router.get("/suggest")
+def suggest_steps(
+    q: str = Query(..., min_length=1, max_length=1000),
+    limit: int = Query(10, ge=1, le=50),
+    min_similarity: float = Query(0.5, ge=0, le=1, alias="minSimilarity"),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Library steps similar to `q`, for autocomplete: `similarity` is the
+    share of the text's trigrams found in the step.
+    """
+    step_index.refresh(db)
+    return {
+        "success": True,
+        "data": step_index.suggest(q, limit, min_similarity)
+    }
+
+
+@router.get("/duplicates")
+def get_duplicate_steps(
+    threshold: float = Query(0.8, ge=0.3, le=1),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Pairs of library steps that are near-duplicates (trigram similarity at least `threshold`)."""
+    step_index.refresh(db)
+    return {
+        "success": True,
+        "data": step_index.similar_pairs(threshold, limit)
+    }
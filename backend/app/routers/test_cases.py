@@ -1,16 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, joinedload, undefer
 from sqlalchemy import or_
 from typing import Optional
 from math import ceil
+from datetime import datetime
 from app.database import get_db
-from app.models import TestCase, Feature, GherkinStep, GherkinSubStep
-from app.schemas.test_case import TestCaseCreate, TestCaseUpdate, UpdateStepsRequest
+from app.models import (
+    TestCase, Feature, Application, GitlabPipeline, TestCasePipelineResult,
+    GherkinStep, TestCaseHealth, DurationSketch, DurationSketchScope,
+    DuplicateCluster, DuplicateClusterMember, DuplicateClusterStatus
+)
+from app.schemas.test_case import (
+    TestCaseCreate, BulkTestCaseCreate, TestCaseUpdate, UpdateStepsRequest, DuplicateClusterReview
+)
 from app.middleware.auth import get_current_user, AuthUser
+from app.services.duration_sketch_service import duration_percentiles, serialize_percentiles
+from app.services.step_library_service import StepLibraryDeltas, apply_step_deltas
+from app.services.test_case_steps_service import update_steps, build_steps_documents
+from app.services.test_case_create_service import create_test_cases
+from app.config import settings
+from app.utils.normalization import normalize_scenario_name
 
 router = APIRouter(prefix="/test-cases", tags=["test-cases"])
 
 
+def _ensure_unique_scenario(db: Session, application_id: str, scenario_name: Optional[str], exclude_id: Optional[str] = None):
+    """Reject a scenario name already used by another test case of the application."""
+    key = normalize_scenario_name(scenario_name)
+    if not key:
+        return
+    query = db.query(TestCase.id).filter(
+        TestCase.application_id == application_id,
+        TestCase.scenario_key == key
+    )
+    if exclude_id:
+        query = query.filter(TestCase.id != exclude_id)
+    if query.first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya existe un caso de prueba con ese escenario en la aplicación"
+        )
+
+
 @router.get("")
 def get_test_cases(
     feature_id: Optional[str] = Query(None, alias="featureId"),
@@ -116,6 +147,281 @@ def get_test_cases(
     }
 
 
+@router.get("/by-scenario")
+def get_test_cases_by_scenario(
+    name: str = Query(..., min_length=1),
+    application_id: Optional[str] = Query(None, alias="applicationId"),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Find test cases by scenario name (ignoring case, accents and extra spaces)."""
+    key = normalize_scenario_name(name)
+    if not key:
+        return {"success": True, "data": []}
+    
+    query = db.query(TestCase).filter(TestCase.scenario_key == key)
+    if application_id:
+        query = query.filter(TestCase.application_id == application_id)
+    
+    result = []
+    for tc in query.order_by(TestCase.created_at).all():
+        result.append({
+            "id": tc.id,
+            "name": tc.name,
+            "status": tc.status.value,
+            "featureId": tc.feature_id,
+            "scenarioName": tc.scenario_name,
+            "feature": {
+                "id": tc.feature.id,
+                "name": tc.feature.name,
+                "application": {
+                    "id": tc.feature.application.id,
+                    "name": tc.feature.application.name
+                }
+            }
+        })
+    
+    return {"success": True, "data": result}
+
+
+@router.get("/flaky")
+def get_flaky_test_cases(
+    application_id: Optional[str] = Query(None, alias="applicationId"),
+    feature_id: Optional[str] = Query(None, alias="featureId"),
+    min_score: Optional[float] = Query(None, alias="minScore", ge=0, le=1),
+    min_runs: int = Query(1, alias="minRuns", ge=1),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Test cases ranked by flakiness score.
+
+    Served from `test_case_health`, refreshed by `python cli.py refresh-test-health`.
+    """
+    if min_score is None:
+        min_score = settings.FLAKY_SCORE_THRESHOLD
+    query = db.query(TestCaseHealth, TestCase).join(
+        TestCase, TestCase.id == TestCaseHealth.test_case_id
+    ).filter(
+        TestCaseHealth.score >= min_score,
+        TestCaseHealth.runs >= min_runs
+    )
+    if application_id:
+        query = query.filter(TestCaseHealth.application_id == application_id)
+    if feature_id:
+        query = query.filter(TestCase.feature_id == feature_id)
+    
+    total = query.count()
+    rows = query.order_by(
+        TestCaseHealth.score.desc(), TestCaseHealth.test_case_id
+    ).offset((page - 1) * limit).limit(limit).all()
+    
+    result = []
+    for health, tc in rows:
+        result.append({
+            "testCase": {
+                "id": tc.id,
+                "name": tc.name,
+                "scenarioName": tc.scenario_name,
+                "featureId": tc.feature_id,
+                "applicationId": tc.application_id
+            },
+            "runs": health.runs,
+            "failures": health.failures,
+            "flips": health.flips,
+            "flipRate": round(health.flip_rate, 4),
+            "failureRate": round(health.failure_rate, 4),
+            "score": round(health.score, 4),
+            "lastStatus": health.last_status.value if health.last_status else None,
+            "lastRunAt": health.last_run_at.isoformat() if health.last_run_at else None,
+            "computedAt": health.computed_at.isoformat()
+        })
+    
+    return {
+        "success": True,
+        "data": result,
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "totalPages": ceil(total / limit)
+        }
+    }
+
+
+@router.get("/durations")
+def get_test_case_durations(
+    application_id: Optional[str] = Query(None, alias="applicationId"),
+    feature_id: Optional[str] = Query(None, alias="featureId"),
+    sort: str = Query("p90", pattern="^(p50|p90|p99|regression)$"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Slowest test cases by all-time duration percentile.
+
+    `recentP90` is the p90 over the last runs (test_case_health);
+    sort=regression ranks by recentP90 / p90, i.e. scenarios getting slower.
+    """
+    query = db.query(DurationSketch, TestCase, TestCaseHealth.duration_p90).join(
+        TestCase, TestCase.id == DurationSketch.scope_id
+    ).outerjoin(
+        TestCaseHealth, TestCaseHealth.test_case_id == TestCase.id
+    ).filter(DurationSketch.scope == DurationSketchScope.TEST_CASE)
+    if application_id:
+        query = query.filter(TestCase.application_id == application_id)
+    if feature_id:
+        query = query.filter(TestCase.feature_id == feature_id)
+    
+    if sort == "regression":
+        query = query.filter(DurationSketch.p90 > 0, TestCaseHealth.duration_p90.isnot(None)).order_by(
+            (TestCaseHealth.duration_p90 / DurationSketch.p90).desc(), TestCase.id
+        )
+    else:
+        query = query.filter(getattr(DurationSketch, sort).isnot(None)).order_by(
+            getattr(DurationSketch, sort).desc(), TestCase.id
+        )
+    
+    result = []
+    for sketch, tc, recent_p90 in query.limit(limit).all():
+        result.append({
+            "testCase": {
+                "id": tc.id,
+                "name": tc.name,
+                "scenarioName": tc.scenario_name,
+                "featureId": tc.feature_id,
+                "applicationId": tc.application_id
+            },
+            **serialize_percentiles(sketch),
+            "recentP90": recent_p90
+        })
+    
+    return {"success": True, "data": result}
+
+
+def _serialize_cluster(cluster: DuplicateCluster, members: list) -> dict:
+    return {
+        "id": cluster.id,
+        "status": cluster.status.value,
+        "size": cluster.size,
+        "applicationCount": cluster.application_count,
+        "featureCount": cluster.feature_count,
+        "similarity": round(cluster.similarity, 4),
+        "reviewedById": cluster.reviewed_by_id,
+        "reviewedAt": cluster.reviewed_at.isoformat() if cluster.reviewed_at else None,
+        "createdAt": cluster.created_at.isoformat(),
+        "computedAt": cluster.computed_at.isoformat(),
+        "members": [
+            {
+                "testCase": {
+                    "id": tc.id,
+                    "name": tc.name,
+                    "scenarioName": tc.scenario_name,
+                    "featureId": tc.feature_id,
+                    "featureName": feature_name,
+                    "applicationId": tc.application_id
+                },
+                "similarity": round(member.similarity, 4)
+            }
+            for member, tc, feature_name in members
+        ]
+    }
+
+
+def _cluster_members(db: Session, cluster_ids: list) -> dict:
+    members = {cluster_id: [] for cluster_id in cluster_ids}
+    rows = db.query(DuplicateClusterMember, TestCase, Feature.name).join(
+        TestCase, TestCase.id == DuplicateClusterMember.test_case_id
+    ).join(
+        Feature, Feature.id == TestCase.feature_id
+    ).filter(
+        DuplicateClusterMember.cluster_id.in_(cluster_ids)
+    ).order_by(DuplicateClusterMember.similarity.desc(), TestCase.id).all()
+    for row in rows:
+        members[row[0].cluster_id].append(row)
+    return members
+
+
+@router.get("/duplicates")
+def get_duplicate_clusters(
+    status_filter: Optional[DuplicateClusterStatus] = Query(DuplicateClusterStatus.OPEN, alias="status"),
+    application_id: Optional[str] = Query(None, alias="applicationId"),
+    cross_application: bool = Query(False, alias="crossApplication"),
+    min_similarity: float = Query(0, alias="minSimilarity", ge=0, le=1),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Clusters of near-duplicate test cases for review, most similar first.
+
+    Served from `duplicate_clusters`, refreshed by `python cli.py find-duplicates`.
+    """
+    query = db.query(DuplicateCluster).filter(DuplicateCluster.similarity >= min_similarity)
+    if status_filter:
+        query = query.filter(DuplicateCluster.status == status_filter)
+    if cross_application:
+        query = query.filter(DuplicateCluster.application_count > 1)
+    if application_id:
+        query = query.filter(DuplicateCluster.id.in_(
+            db.query(DuplicateClusterMember.cluster_id).join(
+                TestCase, TestCase.id == DuplicateClusterMember.test_case_id
+            ).filter(TestCase.application_id == application_id)
+        ))
+    
+    total = query.count()
+    clusters = query.order_by(
+        DuplicateCluster.similarity.desc(), DuplicateCluster.size.desc(), DuplicateCluster.id
+    ).offset((page - 1) * limit).limit(limit).all()
+    members = _cluster_members(db, [cluster.id for cluster in clusters])
+    
+    return {
+        "success": True,
+        "data": [_serialize_cluster(cluster, members[cluster.id]) for cluster in clusters],
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "totalPages": ceil(total / limit)
+        }
+    }
+
+
+@router.patch("/duplicates/{cluster_id}")
+def review_duplicate_cluster(
+    cluster_id: str,
+    review: DuplicateClusterReview,
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark a duplicate cluster as confirmed or dismissed (or reopen it)."""
+    cluster = db.query(DuplicateCluster).filter(DuplicateCluster.id == cluster_id).first()
+    
+    if not cluster:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Grupo de duplicados no encontrado"
+        )
+    
+    cluster.status = review.status
+    if review.status == DuplicateClusterStatus.OPEN:
+        cluster.reviewed_by_id = None
+        cluster.reviewed_at = None
+    else:
+        cluster.reviewed_by_id = current_user.id
+        cluster.reviewed_at = datetime.utcnow()
+    db.commit()
+    
+    return {
+        "success": True,
+        "data": _serialize_cluster(cluster, _cluster_members(db, [cluster.id])[cluster.id])
+    }
+
+
 @router.get("/{test_case_id}")
 def get_test_case(
     test_case_id: str,
@@ -123,7 +429,10 @@ def get_test_case(
     db: Session = Depends(get_db)
 ):
     """Get a specific test case."""
-    tc = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    tc = db.query(TestCase).options(
+        undefer(TestCase.steps_document),
+        joinedload(TestCase.feature).joinedload(Feature.application).joinedload(Application.group)
+    ).filter(TestCase.id == test_case_id).first()
     
     if not tc:
         raise HTTPException(
@@ -131,24 +440,22 @@ def get_test_case(
             detail="Caso de prueba no encontrado"
         )
     
-    # Build steps with sub-steps
-    steps = []
-    for step in sorted(tc.steps, key=lambda x: x.order):
-        sub_steps = [
-            {"id": sub.id, "text": sub.text, "order": sub.order}
-            for sub in sorted(step.sub_steps, key=lambda x: x.order)
-        ]
-        steps.append({
-            "id": step.id,
-            "type": step.type.value,
-            "text": step.text,
-            "order": step.order,
-            "subSteps": sub_steps
-        })
+    # Stored document; test cases not backfilled yet are read from the step tables
+    steps = tc.steps_document
+    if steps is None:
+        steps = build_steps_documents(db, [tc.id])[tc.id]
+    
+    # Build pipeline results (latest 10)
+    latest_results = db.query(TestCasePipelineResult).join(
+        GitlabPipeline, TestCasePipelineResult.pipeline_id == GitlabPipeline.id
+    ).options(
+        contains_eager(TestCasePipelineResult.pipeline)
+    ).filter(
+        TestCasePipelineResult.test_case_id == tc.id
+    ).order_by(TestCasePipelineResult.created_at.desc()).limit(10).all()
     
-    # Build pipeline results
     pipeline_results = []
-    for pr in sorted(tc.pipeline_results, key=lambda x: x.created_at, reverse=True)[:10]:
+    for pr in latest_results:
         pipeline_results.append({
             "id": pr.id,
             "status": pr.status.value,
@@ -207,90 +514,64 @@ def create_test_case(
     current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create a new test case."""
-    feature = db.query(Feature).filter(Feature.id == tc_data.feature_id).first()
+    """Create a new test case (with its steps) in one transaction."""
+    created = create_test_cases(db, [tc_data])
+    db.commit()
+    new_tc = created.test_cases[0]
+    feature = created.features[new_tc["feature_id"]]
     
-    if not feature:
+    return {
+        "success": True,
+        "data": {
+            "id": new_tc["id"],
+            "name": new_tc["name"],
+            "description": new_tc["description"],
+            "type": new_tc["type"].value,
+            "priority": new_tc["priority"].value,
+            "status": new_tc["status"].value,
+            "featureId": new_tc["feature_id"],
+            "tags": new_tc["tags"],
+            "scenarioName": new_tc["scenario_name"],
+            "createdAt": new_tc["created_at"].isoformat(),
+            "feature": {"id": feature.id, "name": feature.name},
+            "steps": new_tc["steps_document"]
+        }
+    }
+
+
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+def create_test_cases_bulk(
+    bulk_data: BulkTestCaseCreate,
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many test cases (with steps) in one transaction. Nothing is
+    created if any of them is invalid.
+    """
+    if len(bulk_data.test_cases) > settings.TEST_CASE_BULK_MAX_ITEMS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Feature no encontrada"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se permiten como máximo {settings.TEST_CASE_BULK_MAX_ITEMS} casos por solicitud"
         )
     
-    new_tc = TestCase(
-        name=tc_data.name,
-        description=tc_data.description,
-        type=tc_data.type,
-        priority=tc_data.priority,
-        status=tc_data.status,
-        feature_id=tc_data.feature_id,
-        azure_user_story_id=tc_data.azure_user_story_id,
-        azure_user_story_url=tc_data.azure_user_story_url,
-        azure_test_case_id=tc_data.azure_test_case_id,
-        azure_test_case_url=tc_data.azure_test_case_url,
-        tags=tc_data.tags or [],
-        scenario_name=tc_data.scenario_name
-    )
-    
-    db.add(new_tc)
+    created = create_test_cases(db, bulk_data.test_cases)
     db.commit()
-    db.refresh(new_tc)
-    
-    # Create steps if provided
-    if tc_data.steps:
-        for idx, step_data in enumerate(tc_data.steps):
-            step = GherkinStep(
-                test_case_id=new_tc.id,
-                type=step_data.type,
-                text=step_data.text,
-                order=step_data.order or idx + 1
-            )
-            db.add(step)
-            db.commit()
-            db.refresh(step)
-            
-            if step_data.sub_steps:
-                for sub_idx, sub_data in enumerate(step_data.sub_steps):
-                    sub_step = GherkinSubStep(
-                        step_id=step.id,
-                        text=sub_data.text,
-                        order=sub_data.order or sub_idx + 1
-                    )
-                    db.add(sub_step)
-        
-        db.commit()
-    
-    # Reload to get steps
-    db.refresh(new_tc)
-    
-    steps = []
-    for step in sorted(new_tc.steps, key=lambda x: x.order):
-        sub_steps = [
-            {"id": sub.id, "text": sub.text, "order": sub.order}
-            for sub in sorted(step.sub_steps, key=lambda x: x.order)
-        ]
-        steps.append({
-            "id": step.id,
-            "type": step.type.value,
-            "text": step.text,
-            "order": step.order,
-            "subSteps": sub_steps
-        })
     
     return {
         "success": True,
         "data": {
-            "id": new_tc.id,
-            "name": new_tc.name,
-            "description": new_tc.description,
-            "type": new_tc.type.value,
-            "priority": new_tc.priority.value,
-            "status": new_tc.status.value,
-            "featureId": new_tc.feature_id,
-            "tags": new_tc.tags or [],
-            "scenarioName": new_tc.scenario_name,
-            "createdAt": new_tc.created_at.isoformat(),
-            "feature": {"id": feature.id, "name": feature.name},
-            "steps": steps
+            "created": len(created.test_cases),
+            "testCases": [
+                {
+                    "id": tc["id"],
+                    "name": tc["name"],
+                    "scenarioName": tc["scenario_name"],
+                    "featureId": tc["feature_id"],
+                    "steps": len(created.steps[tc["id"]])
+                }
+                for tc in created.test_cases
+            ]
         }
     }
 
@@ -329,6 +610,7 @@ def update_test_case(
                 detail="Feature no encontrada"
             )
         tc.feature_id = tc_data.feature_id
+        tc.application_id = feature.application_id
     if tc_data.azure_user_story_id is not None:
         tc.azure_user_story_id = tc_data.azure_user_story_id
     if tc_data.azure_user_story_url is not None:
@@ -341,6 +623,8 @@ def update_test_case(
         tc.tags = tc_data.tags
     if tc_data.scenario_name is not None:
         tc.scenario_name = tc_data.scenario_name
+    if tc_data.scenario_name is not None or tc_data.feature_id:
+        _ensure_unique_scenario(db, tc.application_id, tc.scenario_name, exclude_id=tc.id)
     
     db.commit()
     db.refresh(tc)
@@ -382,6 +666,10 @@ def delete_test_case(
             detail="Caso de prueba no encontrado"
         )
     
+    deltas = StepLibraryDeltas()
+    for (text,) in db.query(GherkinStep.text).filter(GherkinStep.test_case_id == test_case_id):
+        deltas.add(text, -1)
+    apply_step_deltas(db, deltas)
     db.delete(tc)
     db.commit()
     
@@ -398,7 +686,7 @@ def get_test_case_steps(
     db: Session = Depends(get_db)
 ):
     """Get all steps of a test case."""
-    tc = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    tc = db.query(TestCase.id, TestCase.steps_document).filter(TestCase.id == test_case_id).first()
     
     if not tc:
         raise HTTPException(
@@ -406,19 +694,9 @@ def get_test_case_steps(
             detail="Caso de prueba no encontrado"
         )
     
-    steps = []
-    for step in sorted(tc.steps, key=lambda x: x.order):
-        sub_steps = [
-            {"id": sub.id, "text": sub.text, "order": sub.order}
-            for sub in sorted(step.sub_steps, key=lambda x: x.order)
-        ]
-        steps.append({
-            "id": step.id,
-            "type": step.type.value,
-            "text": step.text,
-            "order": step.order,
-            "subSteps": sub_steps
-        })
+    steps = tc.steps_document
+    if steps is None:
+        steps = build_steps_documents(db, [test_case_id])[test_case_id]
     
     return {
         "success": True,
@@ -433,8 +711,11 @@ def update_test_case_steps(
     current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Update all steps of a test case."""
-    tc = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    """
+    Update the steps of a test case. Steps and sub-steps are matched by
+    ID (or position) and only the differences are written.
+    """
+    tc = db.query(TestCase.id).filter(TestCase.id == test_case_id).first()
     
     if not tc:
         raise HTTPException(
@@ -442,53 +723,33 @@ def update_test_case_steps(
             detail="Caso de prueba no encontrado"
         )
     
-    # Delete existing steps
-    db.query(GherkinStep).filter(GherkinStep.test_case_id == test_case_id).delete()
-    db.commit()
-    
-    # Create new steps
-    for idx, step_data in enumerate(steps_data.steps):
-        step = GherkinStep(
-            test_case_id=test_case_id,
-            type=step_data.type,
-            text=step_data.text,
-            order=step_data.order or idx + 1
-        )
-        db.add(step)
-        db.commit()
-        db.refresh(step)
-        
-        if step_data.sub_steps:
-            for sub_idx, sub_data in enumerate(step_data.sub_steps):
-                sub_step = GherkinSubStep(
-                    step_id=step.id,
-                    text=sub_data.text,
-                    order=sub_data.order or sub_idx + 1
-                )
-                db.add(sub_step)
-    
+    steps = update_steps(db, test_case_id, steps_data.steps)
     db.commit()
     
-    # Get updated steps
-    db.refresh(tc)
+    return {
+        "success": True,
+        "data": steps
+    }
+
+
+@router.get("/{test_case_id}/durations")
+def get_test_case_duration_stats(
+    test_case_id: str,
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Duration percentiles (seconds) of every result reported for the test case."""
+    tc = db.query(TestCase.id).filter(TestCase.id == test_case_id).first()
     
-    steps = []
-    for step in sorted(tc.steps, key=lambda x: x.order):
-        sub_steps = [
-            {"id": sub.id, "text": sub.text, "order": sub.order}
-            for sub in sorted(step.sub_steps, key=lambda x: x.order)
-        ]
-        steps.append({
-            "id": step.id,
-            "type": step.type.value,
-            "text": step.text,
-            "order": step.order,
-            "subSteps": sub_steps
-        })
+    if not tc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Caso de prueba no encontrado"
+        )
     
     return {
         "success": True,
-        "data": steps
+        "data": duration_percentiles(db, DurationSketchScope.TEST_CASE, test_case_id)
     }
 
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import Optional
@@ -6,8 +7,8 @@ from math import ceil
 from app.database import get_db
 from app.models import User, Group, GroupSubscription, UserRole, UserStatus
 from app.schemas.user import UserCreate, UserUpdate
-from app.services.auth_service import hash_password
-from app.middleware.auth import get_current_user, get_current_admin_user, AuthUser
+from app.services.password_hasher import password_hasher
+from app.middleware.auth import get_current_user, get_current_admin_user, invalidate_user, AuthUser
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -227,13 +228,16 @@ def get_user(
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user_data: UserCreate,
     current_user: AuthUser = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Create a new user (admin only)."""
-    existing_user = db.query(User).filter(User.email == user_data.email.lower()).first()
+    # Async to await the hasher pool; database work runs in the threadpool
+    existing_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == user_data.email.lower()).first()
+    )
     
     if existing_user:
         raise HTTPException(
@@ -241,89 +245,106 @@ def create_user(
             detail="El email ya está registrado"
         )
     
-    hashed_password = hash_password(user_data.password)
-    
-    new_user = User(
-        email=user_data.email.lower(),
-        password=hashed_password,
-        first_name=user_data.first_name,
-        last_name=user_data.last_name,
-        role=user_data.role or UserRole.USER,
-        status=user_data.status or UserStatus.ACTIVE
-    )
-    
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    hashed_password = await password_hasher.hash(user_data.password)
     
-    return {
-        "success": True,
-        "data": {
-            "id": new_user.id,
-            "email": new_user.email,
-            "firstName": new_user.first_name,
-            "lastName": new_user.last_name,
-            "role": new_user.role.value,
-            "status": new_user.status.value,
-            "createdAt": new_user.created_at.isoformat()
+    def create():
+        new_user = User(
+            email=user_data.email.lower(),
+            password=hashed_password,
+            first_name=user_data.first_name,
+            last_name=user_data.last_name,
+            role=user_data.role or UserRole.USER,
+            status=user_data.status or UserStatus.ACTIVE
+        )
+        
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        
+        return {
+            "success": True,
+            "data": {
+                "id": new_user.id,
+                "email": new_user.email,
+                "firstName": new_user.first_name,
+                "lastName": new_user.last_name,
+                "role": new_user.role.value,
+                "status": new_user.status.value,
+                "createdAt": new_user.created_at.isoformat()
+            }
         }
-    }
+    
+    return await run_in_threadpool(create)
 
 
 @router.put("/{user_id}")
-def update_user(
+async def update_user(
     user_id: str,
     user_data: UserUpdate,
     current_user: AuthUser = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Update a user (admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuario no encontrado"
-        )
-    
-    if user_data.email:
-        existing = db.query(User).filter(
-            User.email == user_data.email.lower(),
-            User.id != user_id
-        ).first()
-        if existing:
+    # Async to await the hasher pool; database work runs in the threadpool
+    def load():
+        user = db.query(User).filter(User.id == user_id).first()
+        
+        if not user:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El email ya está en uso"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuario no encontrado"
             )
-        user.email = user_data.email.lower()
-    
-    if user_data.first_name:
-        user.first_name = user_data.first_name
-    if user_data.last_name:
-        user.last_name = user_data.last_name
-    if user_data.role:
-        user.role = user_data.role
-    if user_data.status:
-        user.status = user_data.status
-    if user_data.password:
-        user.password = hash_password(user_data.password)
-    
-    db.commit()
-    db.refresh(user)
-    
-    return {
-        "success": True,
-        "data": {
-            "id": user.id,
-            "email": user.email,
-            "firstName": user.first_name,
-            "lastName": user.last_name,
-            "role": user.role.value,
-            "status": user.status.value,
-            "updatedAt": user.updated_at.isoformat()
+        
+        if user_data.email:
+            existing = db.query(User).filter(
+                User.email == user_data.email.lower(),
+                User.id != user_id
+            ).first()
+            if existing:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="El email ya está en uso"
+                )
+        return user
+    
+    user = await run_in_threadpool(load)
+    hashed_password = await password_hasher.hash(user_data.password) if user_data.password else None
+    
+    def save():
+        if user_data.email:
+            user.email = user_data.email.lower()
+        if user_data.first_name:
+            user.first_name = user_data.first_name
+        if user_data.last_name:
+            user.last_name = user_data.last_name
+        if user_data.role:
+            user.role = user_data.role
+        if user_data.status:
+            user.status = user_data.status
+        if hashed_password:
+            user.password = hashed_password
+        
+        invalidate_user(
+            db, user.id,
+            revoke_sessions=bool(user_data.password) or user.status != UserStatus.ACTIVE
+        )
+        db.commit()
+        db.refresh(user)
+        
+        return {
+            "success": True,
+            "data": {
+                "id": user.id,
+                "email": user.email,
+                "firstName": user.first_name,
+                "lastName": user.last_name,
+                "role": user.role.value,
+                "status": user.status.value,
+                "updatedAt": user.updated_at.isoformat()
+            }
         }
-    }
+    
+    return await run_in_threadpool(save)
 
 
 @router.delete("/{user_id}")
@@ -341,6 +362,7 @@ def delete_user(
             detail="Usuario no encontrado"
         )
     
+    invalidate_user(db, user.id)
     db.delete(user)
     db.commit()
     
@@ -1,6 +1,7 @@
 from app.schemas.user import (
     UserCreate, UserUpdate, UserResponse, UserListResponse,
-    UserLogin, LoginResponse, ChangePassword
+    UserLogin, LoginResponse, ChangePassword,
+    RefreshTokenRequest, LogoutRequest
 )
 from app.schemas.group import (
     GroupCreate, GroupUpdate, GroupResponse, GroupListResponse,
@@ -24,11 +25,13 @@ from app.schemas.test_request import (
     TestRequestCreate, TestRequestUpdate, TestRequestResponse,
     TestRequestListResponse, TestRequestStatusUpdate
 )
+from app.schemas.api_key import ApiKeyCreate
 from app.schemas.common import PaginationResponse, MessageResponse
 
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "UserListResponse",
     "UserLogin", "LoginResponse", "ChangePassword",
+    "RefreshTokenRequest", "LogoutRequest",
     "GroupCreate", "GroupUpdate", "GroupResponse", "GroupListResponse",
     "GroupSubscriptionResponse",
     "ApplicationCreate", "ApplicationUpdate", "ApplicationResponse", "ApplicationListResponse",
@@ -39,6 +42,7 @@ __all__ = [
     "PipelineResultResponse", "RegisterPipelineResult",
     "TestRequestCreate", "TestRequestUpdate", "TestRequestResponse",
     "TestRequestListResponse", "TestRequestStatusUpdate",
+    "ApiKeyCreate",
     "PaginationResponse", "MessageResponse",
 ]
 
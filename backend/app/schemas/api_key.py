@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from app.services.api_key_service import SCOPE_PIPELINES_WRITE
+
+
+class ApiKeyCreate(BaseModel):
+    name: str
+    scopes: List[str] = [SCOPE_PIPELINES_WRITE]
+    gitlab_project_ids: Optional[List[str]] = Field(None, alias="gitlabProjectIds")
+    expires_in_days: Optional[int] = Field(None, alias="expiresInDays", ge=1)
+
+    class Config:
+        populate_by_name = True
@@ -3,6 +3,9 @@ from typing import Optional, List
 from datetime import datetime
 from app.models.pipeline import PipelineStatus, TestCaseResultStatus
 
+# Numeric ID or namespaced path ("group/project"); every segment starts with a word character
+GITLAB_PROJECT_ID_PATTERN = r"^\w[\w.-]*(/\w[\w.-]*)*$"
+
 
 class TestResultInput(BaseModel):
     test_case_id: Optional[str] = Field(None, alias="testCaseId")
@@ -17,7 +20,7 @@ class TestResultInput(BaseModel):
 
 
 class RegisterPipelineResult(BaseModel):
-    gitlab_project_id: str = Field(..., alias="gitlabProjectId")
+    gitlab_project_id: str = Field(..., alias="gitlabProjectId", pattern=GITLAB_PROJECT_ID_PATTERN)
     gitlab_pipeline_id: str = Field(..., alias="gitlabPipelineId")
     branch: Optional[str] = "main"
     pipeline_status: Optional[PipelineStatus] = Field(None, alias="pipelineStatus")
@@ -29,6 +32,16 @@ class RegisterPipelineResult(BaseModel):
         populate_by_name = True
 
 
+class ShardPlanRequest(BaseModel):
+    gitlab_project_id: Optional[str] = Field(None, alias="gitlabProjectId")
+    application_id: Optional[str] = Field(None, alias="applicationId")
+    feature_ids: Optional[List[str]] = Field(None, alias="featureIds")
+    shards: int = Field(..., ge=1)
+
+    class Config:
+        populate_by_name = True
+
+
 class PipelineCounts(BaseModel):
     test_case_results: int = Field(..., alias="testCaseResults")
 
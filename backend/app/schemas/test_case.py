@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from app.models.test_case import TestCaseType, TestCasePriority, TestCaseStatus, GherkinStepType
+from app.models.duplicate_cluster import DuplicateClusterStatus
 
 
 class GherkinSubStepCreate(BaseModel):
@@ -62,6 +63,13 @@ class TestCaseCreate(TestCaseBase):
     steps: Optional[List[GherkinStepCreate]] = None
 
 
+class BulkTestCaseCreate(BaseModel):
+    test_cases: List[TestCaseCreate] = Field(..., alias="testCases")
+
+    class Config:
+        populate_by_name = True
+
+
 class TestCaseUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -80,8 +88,23 @@ class TestCaseUpdate(BaseModel):
         populate_by_name = True
 
 
+class GherkinSubStepUpdate(GherkinSubStepCreate):
+    # Existing sub-step to update; without it, matched by position
+    id: Optional[str] = None
+
+
+class GherkinStepUpdate(GherkinStepCreate):
+    # Existing step to update; without it, matched by position
+    id: Optional[str] = None
+    sub_steps: Optional[List[GherkinSubStepUpdate]] = Field(None, alias="subSteps")
+
+
 class UpdateStepsRequest(BaseModel):
-    steps: List[GherkinStepCreate]
+    steps: List[GherkinStepUpdate]
+
+
+class DuplicateClusterReview(BaseModel):
+    status: DuplicateClusterStatus
 
 
 class GroupSimple(BaseModel):
@@ -36,6 +36,20 @@ class UserLogin(BaseModel):
     password: str
 
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str = Field(..., alias="refreshToken")
+
+    class Config:
+        populate_by_name = True
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = Field(None, alias="refreshToken")
+
+    class Config:
+        populate_by_name = True
+
+
 class ChangePassword(BaseModel):
     current_password: str = Field(..., alias="currentPassword")
     new_password: str = Field(..., min_length=6, alias="newPassword")
@@ -0,0 +1,100 @@
+import secrets
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ApiKey
+from app.services.auth_service import hash_token
+from app.services.cache_service import VersionedSnapshot, bump_cache_version
+
+API_KEYS_CACHE = "api_keys"
+API_KEY_PREFIX = "ddk_"
+
+# Scopes an API key can be granted
+SCOPE_PIPELINES_WRITE = "pipelines:write"
+API_KEY_SCOPES = {SCOPE_PIPELINES_WRITE}
+
+
+class ApiKeyPrincipal:
+    """Caller authenticated with an API key."""
+    def __init__(self, id: str, name: str, scopes: List[str], gitlab_project_ids: List[str],
+                 expires_at: Optional[datetime]):
+        self.id = id
+        self.name = name
+        self.scopes = set(scopes or [])
+        self.gitlab_project_ids = set(gitlab_project_ids or [])
+        self.expires_at = expires_at
+
+    def has_scope(self, scope: str) -> bool:
+        return scope in self.scopes
+
+    def can_access_project(self, gitlab_project_id: str) -> bool:
+        return not self.gitlab_project_ids or str(gitlab_project_id) in self.gitlab_project_ids
+
+
+def _load_api_keys(db: Session) -> Dict[str, ApiKeyPrincipal]:
+    keys = db.query(ApiKey).filter(ApiKey.revoked_at.is_(None)).all()
+    return {
+        key.key_hash: ApiKeyPrincipal(
+            id=key.id,
+            name=key.name,
+            scopes=key.scopes,
+            gitlab_project_ids=key.gitlab_project_ids,
+            expires_at=key.expires_at
+        )
+        for key in keys
+    }
+
+
+# Hash -> principal for every active key, shared by the requests of this worker
+api_key_cache = VersionedSnapshot(API_KEYS_CACHE, _load_api_keys, settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
+
+
+def is_api_key(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(API_KEY_PREFIX)
+
+
+def authenticate_api_key(db: Session, raw_key: str) -> Optional[ApiKeyPrincipal]:
+    """Resolve a raw API key to its principal, or None if unknown, revoked or expired."""
+    principal = api_key_cache.get(db).get(hash_token(raw_key))
+    if principal is None:
+        return None
+    if principal.expires_at and principal.expires_at <= datetime.utcnow():
+        return None
+    return principal
+
+
+def _keys_changed(db: Session) -> None:
+    bump_cache_version(db, API_KEYS_CACHE)
+    event.listen(db, "after_commit", lambda session: api_key_cache.expire(), once=True)
+
+
+def create_api_key(
+    db: Session,
+    name: str,
+    scopes: List[str],
+    gitlab_project_ids: List[str],
+    created_by_id: Optional[str],
+    expires_in_days: Optional[int] = None
+) -> Tuple[ApiKey, str]:
+    """Create a key and return it with its raw value, which is never stored. The caller must commit."""
+    raw_key = API_KEY_PREFIX + secrets.token_urlsafe(32)
+    api_key = ApiKey(
+        name=name,
+        key_prefix=raw_key[:12],
+        key_hash=hash_token(raw_key),
+        scopes=scopes,
+        gitlab_project_ids=[str(p) for p in gitlab_project_ids],
+        created_by_id=created_by_id,
+        expires_at=datetime.utcnow() + timedelta(days=expires_in_days) if expires_in_days else None
+    )
+    db.add(api_key)
+    _keys_changed(db)
+    return api_key, raw_key
+
+
+def revoke_api_key(db: Session, api_key: ApiKey) -> None:
+    """Revoke a key. The caller must commit."""
+    api_key.revoked_at = datetime.utcnow()
+    _keys_changed(db)
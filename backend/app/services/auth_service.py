@@ -1,11 +1,22 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from uuid import uuid4
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import settings
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost than BCRYPT_ROUNDS are flagged for rehash
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+ACCESS_TOKEN_TYPE = "access"
 
 
 def hash_password(password: str) -> str:
@@ -18,15 +29,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None) -> str:
-    """Create a JWT access token."""
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash uses an outdated cost, return a new
+    hash to store in its place (None otherwise).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def create_access_token(user, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create a short-lived JWT access token.
+
+    The token embeds the user's role, email and names so requests can be
+    authenticated without a database lookup.
+    """
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(days=settings.JWT_EXPIRES_IN_DAYS)
+        expire = now + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRES_MINUTES)
     
     to_encode = {
-        "userId": user_id,
+        "type": ACCESS_TOKEN_TYPE,
+        "jti": uuid4().hex,
+        "userId": user.id,
+        "email": user.email,
+        "role": user.role.value if hasattr(user.role, "value") else user.role,
+        "firstName": user.first_name,
+        "lastName": user.last_name,
+        # Sub-second precision so revocations don't catch tokens issued right after them
+        "iat": time.time(),
         "exp": expire
     }
     
@@ -39,6 +72,16 @@ def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None)
     return encoded_jwt
 
 
+def generate_refresh_token() -> str:
+    """Generate an opaque refresh token."""
+    return secrets.token_urlsafe(48)
+
+
+def hash_token(token: str) -> str:
+    """Hash an opaque token for storage."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 def decode_token(token: str) -> Optional[dict]:
     """Decode and validate a JWT token."""
     try:
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import CacheVersion
+
+
+def get_cache_version(db: Session, name: str) -> int:
+    """Read the shared version stamp of a cache."""
+    version = db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar()
+    return version or 0
+
+
+def bump_cache_version(db: Session, name: str) -> None:
+    """
+    Increment the shared version stamp of a cache.
+
+    Runs inside the caller's transaction, so other workers only see the
+    new version once the change that caused it is committed.
+    """
+    bump = (
+        update(CacheVersion)
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+    )
+    if db.execute(bump).rowcount:
+        return
+    savepoint = db.begin_nested()
+    try:
+        db.add(CacheVersion(name=name, version=1))
+        savepoint.commit()
+    except IntegrityError:
+        # A concurrent first bump created the row meanwhile
+        savepoint.rollback()
+        db.execute(bump)
+
+
+class VersionedCache:
+    """
+    Bounded, TTL-based in-process cache kept coherent across workers.
+
+    Each worker polls the shared version stamp (see `bump_cache_version`)
+    at most every `version_check_seconds` and drops all entries when it
+    changed. Entries also expire after `ttl_seconds`, which bounds
+    staleness for changes made outside the application.
+    """
+    def __init__(self, name: str, ttl_seconds: int, max_size: int, version_check_seconds: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.version_check_seconds = version_check_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def _sync_version(self, db: Session) -> None:
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < self.version_check_seconds:
+            return
+        version = get_cache_version(db, self.name)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._version_checked_at = now
+
+    def get(self, db: Session, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss. None is not cached."""
+        if not self.enabled:
+            return loader()
+
+        self._sync_version(db)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (value, now + self.ttl_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class VersionedSnapshot:
+    """
+    Whole-table in-process copy, rebuilt when its shared version stamp changes.
+
+    Suited to small tables read on every request (revocation lists, API
+    keys): a lookup costs a dictionary access plus, at most every
+    `version_check_seconds`, one query for the version stamp.
+    """
+    def __init__(self, name: str, loader: Callable[[Session], Any], version_check_seconds: int):
+        self.name = name
+        self.loader = loader
+        self.version_check_seconds = version_check_seconds
+        self._value: Any = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> Any:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.version_check_seconds:
+            return self._value
+        version = get_cache_version(db, self.name)
+        if version != self._version:
+            value = self.loader(db)
+            with self._lock:
+                self._value, self._version = value, version
+        self._checked_at = now
+        return self._value
+
+    def expire(self) -> None:
+        """Force a version check on the next lookup."""
+        self._checked_at = 0.0
@@ -0,0 +1,199 @@
+"""
+Duration percentiles per test case, feature and application.
+
+Each scope keeps one DDSketch of every duration ever reported, stored as
+bytes in `duration_sketches`. Ingestion records the durations it adds
+(and retracts, when a result is re-reported) as small delta sketches and
+merges them into the stored ones in the same transaction. Stored rows
+are read with an update lock, so concurrent ingestions wait for each
+other instead of overwriting each other's merges. A retracted duration
+is removed from the feature and application it was added to, even if the
+test case moved since. p50/p90/p99 are served from these rows without
+touching raw results, and survive retention like the rollups; since they
+cover all history, they can only be rebuilt while nothing was purged.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import and_, or_, insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import TestCase, TestCasePipelineResult, DurationSketch, DurationSketchScope
+from app.services.retention_service import PurgedHistoryError, purged_through
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.ddsketch import DDSketch
+
+SketchKey = Tuple[DurationSketchScope, str]
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+_MAX_ATTEMPTS = 3
+
+
+class SketchDeltas:
+    """Pending duration changes, one delta sketch per scope."""
+    def __init__(self):
+        self.sketches: Dict[SketchKey, DDSketch] = defaultdict(DDSketch)
+
+    def add(
+        self,
+        application_id: Optional[str],
+        feature_id: str,
+        test_case_id: str,
+        duration: Optional[int],
+        sign: int = 1
+    ) -> None:
+        if duration is None:
+            return
+        self.sketches[(DurationSketchScope.TEST_CASE, test_case_id)].add(duration, sign)
+        self.sketches[(DurationSketchScope.FEATURE, feature_id)].add(duration, sign)
+        if application_id:
+            self.sketches[(DurationSketchScope.APPLICATION, application_id)].add(duration, sign)
+
+    def __bool__(self) -> bool:
+        return bool(self.sketches)
+
+
+def _row_values(sketch: DDSketch) -> dict:
+    values = {"sketch": sketch.to_bytes(), "count": sketch.count}
+    for name, q in PERCENTILES.items():
+        values[name] = sketch.quantile(q)
+    return values
+
+
+def _apply(db: Session, deltas: Dict[SketchKey, DDSketch]) -> None:
+    stored: Dict[SketchKey, bytes] = {}
+    by_scope = defaultdict(list)
+    for scope, scope_id in deltas:
+        by_scope[scope].append(scope_id)
+    for scope, scope_ids in by_scope.items():
+        for batch in chunked(scope_ids, MAX_IN_PARAMS):
+            # FOR UPDATE elsewhere; SQL Server ignores it and takes the hint instead
+            rows = db.query(DurationSketch.scope_id, DurationSketch.sketch).filter(
+                DurationSketch.scope == scope, DurationSketch.scope_id.in_(batch)
+            ).with_for_update().with_hint(DurationSketch, "WITH (UPDLOCK, ROWLOCK)", "mssql")
+            stored.update({(scope, scope_id): data for scope_id, data in rows})
+
+    now = datetime.utcnow()
+    updates = []
+    inserts = []
+    for key, delta in sorted(deltas.items()):
+        scope, scope_id = key
+        if key in stored:
+            sketch = DDSketch.from_bytes(stored[key])
+            sketch.merge(delta)
+            values = _row_values(sketch)
+            updates.append({
+                "k_scope": scope, "k_scope_id": scope_id,
+                "v_sketch": values["sketch"], "v_count": values["count"],
+                "v_p50": values["p50"], "v_p90": values["p90"], "v_p99": values["p99"], "v_updated_at": now
+            })
+        else:
+            inserts.append({"scope": scope, "scope_id": scope_id, "updated_at": now, **_row_values(delta)})
+
+    if updates:
+        table = DurationSketch.__table__
+        db.execute(
+            update(table).where(
+                table.c.scope == bindparam("k_scope"),
+                table.c.scope_id == bindparam("k_scope_id")
+            ).values(
+                sketch=bindparam("v_sketch"), count=bindparam("v_count"),
+                p50=bindparam("v_p50"), p90=bindparam("v_p90"), p99=bindparam("v_p99"),
+                updated_at=bindparam("v_updated_at")
+            ),
+            updates
+        )
+    if inserts:
+        db.execute(insert(DurationSketch.__table__), inserts)
+
+
+def apply_sketch_deltas(db: Session, deltas: SketchDeltas) -> None:
+    """
+    Merge pending deltas into the stored sketches, in the caller's
+    transaction (not committed).
+
+    If a concurrent ingestion inserted one of the new scopes first, the
+    savepoint is rolled back and the merge is retried from fresh rows.
+    """
+    if not deltas:
+        return
+    for attempt in range(_MAX_ATTEMPTS):
+        savepoint = db.begin_nested()
+        try:
+            _apply(db, deltas.sketches)
+            savepoint.commit()
+            return
+        except IntegrityError:
+            savepoint.rollback()
+            if attempt == _MAX_ATTEMPTS - 1:
+                raise
+
+
+def backfill_duration_sketches(db: Session, batch_size: int = 5000) -> int:
+    """
+    Rebuild every sketch from the raw results.
+
+    Sketches cover all history, so once retention has purged any result
+    the rebuild would lose its durations: PurgedHistoryError is raised and
+    the stored sketches are left untouched. Commits per batch; returns how
+    many raw results with a duration were read.
+    """
+    newest_purged = purged_through(db)
+    if newest_purged is not None:
+        raise PurgedHistoryError(
+            f"La retención ya purgó resultados (hasta el {newest_purged.date()}); "
+            "los percentiles de duración no se pueden reconstruir"
+        )
+    db.query(DurationSketch).delete(synchronize_session=False)
+    db.commit()
+
+    total = 0
+    last: Optional[Tuple[datetime, str]] = None
+    while True:
+        query = db.query(
+            TestCasePipelineResult.created_at, TestCasePipelineResult.id, TestCasePipelineResult.test_case_id,
+            TestCasePipelineResult.duration, TestCase.application_id, TestCase.feature_id
+        ).join(TestCase, TestCase.id == TestCasePipelineResult.test_case_id).filter(
+            TestCasePipelineResult.duration.isnot(None)
+        )
+        if last is not None:
+            # Keyset pagination on (created_at, id)
+            query = query.filter(or_(
+                TestCasePipelineResult.created_at > last[0],
+                and_(TestCasePipelineResult.created_at == last[0], TestCasePipelineResult.id > last[1])
+            ))
+        rows = query.order_by(TestCasePipelineResult.created_at, TestCasePipelineResult.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        deltas = SketchDeltas()
+        for _, _, test_case_id, duration, application_id, feature_id in rows:
+            deltas.add(application_id, feature_id, test_case_id, duration)
+        apply_sketch_deltas(db, deltas)
+        db.commit()
+
+        total += len(rows)
+        last = (rows[-1][0], rows[-1][1])
+    return total
+
+
+def duration_percentiles(db: Session, scope: DurationSketchScope, scope_id: str) -> dict:
+    """Count and p50/p90/p99 (seconds) of one scope; None values when nothing was reported."""
+    row = db.query(DurationSketch).filter(
+        DurationSketch.scope == scope, DurationSketch.scope_id == scope_id
+    ).first()
+    return serialize_percentiles(row)
+
+
+def serialize_percentiles(row: Optional[DurationSketch]) -> dict:
+    if row is None:
+        return {"count": 0, "p50": None, "p90": None, "p99": None}
+    return {
+        "count": row.count,
+        "p50": _round(row.p50),
+        "p90": _round(row.p90),
+        "p99": _round(row.p99),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
@@ -0,0 +1,495 @@
+"""
+Import and export of .feature files.
+
+An import writes a whole set of files (a directory or a zip) in one
+transaction with a fixed number of statements per thousand rows: the
+application's features and test cases are loaded once and matched in
+memory (features by file path, then by name; test cases by scenario_key,
+so a scenario can move between files), and the differences go out as
+executemany INSERTs and UPDATEs. Steps are only rewritten for test cases
+whose steps changed. Each feature stores the SHA-256 of its last imported
+file, and files with the same hash are skipped before being parsed; edits
+made in DocuCase after an import are not part of that hash, so use
+force to re-apply such a file.
+
+Scenarios missing from an imported file are counted, not deleted: their
+test cases may carry results and requests a file cannot express.
+
+For a checkout that is synced repeatedly (cli.py sync-features),
+scan_feature_files first compares each file's mtime and size with a
+manifest of the previous scan, so unchanged files are not even read.
+
+Files are mapped onto the model as described in gherkin_parser.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Feature, FeatureStatus, GherkinStep, GherkinSubStep, TestCase, TestCaseType, TestCasePriority, TestCaseStatus
+from app.services.gherkin_parser import (
+    ParsedFeature, GherkinParseError, parse_feature, scenario_from_model, serialize_feature
+)
+from app.services.step_library_service import StepLibraryDeltas, apply_step_deltas
+from app.services.test_case_create_service import build_step_rows, insert_rows
+from app.services.test_case_steps_service import serialize_step_rows, write_steps_documents
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.id_generator import generate_cuid
+from app.utils.normalization import normalize_scenario_name
+
+FEATURE_FILE_SUFFIX = ".feature"
+
+
+class FeatureFileError(ValueError):
+    """The uploaded archive cannot be imported."""
+
+
+def file_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _walk_feature_files(root: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """(path relative to `root` with "/" separators, entry) of every .feature file below it; dot directories are skipped."""
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.endswith(FEATURE_FILE_SUFFIX) and entry.is_file():
+                    yield os.path.relpath(entry.path, root).replace(os.sep, "/"), entry
+
+
+def read_directory(root: str) -> Iterator[Tuple[str, bytes]]:
+    """(path relative to `root`, content) of every .feature file below it, by path."""
+    for path, entry in sorted(_walk_feature_files(root), key=lambda item: item[0]):
+        with open(entry.path, "rb") as feature_file:
+            yield path, feature_file.read()
+
+
+def load_manifest(manifest_path: str, application_id: str, root: str) -> Dict[str, dict]:
+    """
+    Files recorded by the last scan_feature_files of `root` into the
+    application: {path: {"mtime", "size", "hash"}}. Empty when there is
+    no manifest or it belongs to another application or directory.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("applicationId") != application_id or manifest.get("root") != os.path.abspath(root):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(manifest_path: str, application_id: str, root: str, files: Dict[str, dict]) -> None:
+    """Write the manifest atomically, so an interrupted sync leaves the previous one."""
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"applicationId": application_id, "root": os.path.abspath(root), "files": files}
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, separators=(",", ":"), sort_keys=True)
+        os.replace(temp_path, manifest_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def scan_feature_files(root: str, manifest: Dict[str, dict]) -> Tuple[List[Tuple[str, bytes]], Dict[str, dict], List[str]]:
+    """
+    Compare the .feature files below `root` with `manifest` (see
+    load_manifest). Files whose mtime and size match are not opened; the
+    others are read and hashed, and only those whose content changed are
+    returned. Returns (changed [(path, content)], the updated manifest
+    files, paths no longer present).
+    """
+    changed = []
+    files = {}
+    for path, entry in _walk_feature_files(root):
+        stat = entry.stat()
+        recorded = manifest.get(path)
+        if recorded is not None and recorded["mtime"] == stat.st_mtime_ns and recorded["size"] == stat.st_size:
+            files[path] = recorded
+            continue
+        with open(entry.path, "rb") as feature_file:
+            content = feature_file.read()
+        digest = file_hash(content)
+        files[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest}
+        # A touched file (checkout, rebase) keeps its hash and is not re-imported
+        if recorded is None or recorded["hash"] != digest:
+            changed.append((path, content))
+    changed.sort(key=lambda item: item[0])
+    return changed, files, sorted(set(manifest) - set(files))
+
+
+def read_zip(fileobj: BinaryIO) -> Iterator[Tuple[str, bytes]]:
+    """(path, content) of every .feature file in a zip archive."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as exc:
+        raise FeatureFileError(f"Archivo zip inválido: {exc}")
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename.endswith(FEATURE_FILE_SUFFIX)
+        and not info.filename.startswith("__MACOSX/")
+    ]
+    if sum(info.file_size for info in entries) > settings.FEATURE_IMPORT_MAX_MB * 1024 * 1024:
+        raise FeatureFileError(f"Los archivos .feature superan {settings.FEATURE_IMPORT_MAX_MB} MB")
+    with archive:
+        for info in entries:
+            yield info.filename.lstrip("/"), archive.read(info)
+
+
+def _steps_signature(steps) -> Tuple:
+    """Comparable form of steps: (type, text, (sub-step texts)) in order."""
+    return tuple((step.type, step.text, tuple(sub.text for sub in step.sub_steps)) for step in steps)
+
+
+def _stored_steps_signatures(db: Session, test_case_ids: Iterable[str]) -> Dict[str, Tuple]:
+    """_steps_signature of the stored steps of each test case."""
+    steps: Dict[str, list] = {}
+    sub_steps: Dict[str, list] = {}
+    for batch in chunked(test_case_ids, MAX_IN_PARAMS):
+        for step_id, test_case_id, step_type, text, _ in db.execute(
+            select(GherkinStep.id, GherkinStep.test_case_id, GherkinStep.type, GherkinStep.text, GherkinStep.order)
+            .where(GherkinStep.test_case_id.in_(batch))
+            .order_by(GherkinStep.test_case_id, GherkinStep.order, GherkinStep.id)
+        ):
+            steps.setdefault(test_case_id, []).append((step_id, step_type, text))
+        for step_id, text in db.execute(
+            select(GherkinSubStep.step_id, GherkinSubStep.text)
+            .join(GherkinStep, GherkinStep.id == GherkinSubStep.step_id)
+            .where(GherkinStep.test_case_id.in_(batch))
+            .order_by(GherkinSubStep.step_id, GherkinSubStep.order, GherkinSubStep.id)
+        ):
+            sub_steps.setdefault(step_id, []).append(text)
+    return {
+        test_case_id: tuple((step_type, text, tuple(sub_steps.get(step_id, ()))) for step_id, step_type, text in rows)
+        for test_case_id, rows in steps.items()
+    }
+
+
+def _execute_updates(db: Session, table, keys: Tuple[str, ...], values: Tuple[str, ...], rows: List[dict]) -> None:
+    """executemany UPDATE of `values` by `keys`; rows use k_/v_ prefixed names."""
+    if not rows:
+        return
+    stmt = update(table).where(
+        *(table.c[key] == bindparam(f"k_{key}") for key in keys)
+    ).values({value: bindparam(f"v_{value}") for value in values})
+    db.execute(stmt, rows)
+
+
+def import_feature_files(
+    db: Session,
+    application_id: str,
+    files: Iterable[Tuple[str, bytes]],
+    force: bool = False,
+    removed_paths: Iterable[str] = ()
+) -> Dict[str, object]:
+    """
+    Import .feature files into the application (not committed).
+
+    `files` are (path, content). Files that cannot be parsed, or that
+    clash with another file, are reported in "errors" and left out; the
+    rest is imported. With `force`, unchanged files are imported too.
+    A feature imported from one of `removed_paths` (files deleted from the
+    checkout) moves to the new file that declares its name, as after a
+    rename.
+    """
+    summary = {
+        "files": 0,
+        "unchanged": 0,
+        "features": {"created": 0, "updated": 0},
+        "testCases": {"created": 0, "updated": 0, "unchanged": 0, "missing": 0},
+        "errors": []
+    }
+
+    features = db.execute(
+        select(Feature.id, Feature.name, Feature.description, Feature.feature_file_path, Feature.feature_file_hash)
+        .where(Feature.application_id == application_id)
+    ).all()
+    by_path = {row.feature_file_path: row for row in features if row.feature_file_path}
+    by_name = {row.name: row for row in features}
+    removed_paths = set(removed_paths)
+
+    # Parse and validate every file first; nothing is written until all are known
+    parsed: List[Tuple[str, str, Optional[object], ParsedFeature]] = []
+    claimed_names: Dict[str, str] = {}
+    claimed_scenarios: Dict[str, str] = {}
+    for path, content in files:
+        summary["files"] += 1
+        digest = file_hash(content)
+        stored = by_path.get(path)
+        if stored is not None and stored.feature_file_hash == digest and not force:
+            summary["unchanged"] += 1
+            continue
+        try:
+            feature = parse_feature(content.decode("utf-8-sig"))
+        except (GherkinParseError, UnicodeDecodeError) as exc:
+            summary["errors"].append({"path": path, "message": str(exc)})
+            continue
+
+        named = by_name.get(feature.name)
+        if (
+            stored is None and named is not None
+            and named.feature_file_path not in (None, path) and named.feature_file_path not in removed_paths
+        ):
+            # Same feature name as a feature imported from another file
+            message = f"La feature '{feature.name}' ya se importó desde {named.feature_file_path}"
+        elif stored is not None and named is not None and named.id != stored.id:
+            message = f"Ya existe otra feature llamada '{feature.name}'"
+        elif feature.name in claimed_names:
+            message = f"La feature '{feature.name}' también está en {claimed_names[feature.name]}"
+        else:
+            message = None
+            keys = {}
+            for scenario in feature.scenarios:
+                key = normalize_scenario_name(scenario.name)
+                other = keys.get(key) or claimed_scenarios.get(key)
+                if other is not None:
+                    message = f"Escenario repetido '{scenario.name}' (también en {other})"
+                    break
+                keys[key] = path
+        if message:
+            summary["errors"].append({"path": path, "message": message})
+            continue
+
+        claimed_names[feature.name] = path
+        claimed_scenarios.update(keys)
+        parsed.append((path, digest, stored or named, feature))
+
+    if not parsed:
+        return summary
+
+    now = datetime.utcnow()
+    stored_cases = {
+        row.scenario_key: row for row in db.execute(
+            select(
+                TestCase.id, TestCase.feature_id, TestCase.scenario_key, TestCase.name,
+                TestCase.scenario_name, TestCase.description, TestCase.tags
+            ).where(TestCase.application_id == application_id, TestCase.scenario_key.isnot(None))
+        )
+    }
+    matched_ids = [stored_cases[key].id for key in claimed_scenarios if key in stored_cases]
+    stored_steps = _stored_steps_signatures(db, matched_ids)
+
+    feature_inserts, feature_updates = [], []
+    case_inserts, case_updates = [], []
+    rewrite_documents: Dict[str, List[dict]] = {}
+    step_rows, sub_step_rows = [], []
+    missing: Dict[str, int] = {}
+    for key, row in stored_cases.items():
+        if key not in claimed_scenarios:
+            missing[row.feature_id] = missing.get(row.feature_id, 0) + 1
+    for path, digest, stored, feature in parsed:
+        if stored is None:
+            feature_id = generate_cuid()
+            feature_inserts.append({
+                "id": feature_id,
+                "name": feature.name,
+                "description": feature.description,
+                "feature_file_path": path,
+                "feature_file_hash": digest,
+                "status": FeatureStatus.PLANNED,
+                "application_id": application_id,
+                "created_at": now,
+                "updated_at": now
+            })
+        else:
+            feature_id = stored.id
+            feature_updates.append({
+                "k_id": feature_id,
+                "v_name": feature.name,
+                "v_description": feature.description,
+                "v_feature_file_path": path,
+                "v_feature_file_hash": digest,
+                "v_updated_at": now
+            })
+            # Test cases of this feature that are no longer in its file
+            summary["testCases"]["missing"] += missing.get(feature_id, 0)
+
+        for scenario in feature.scenarios:
+            key = normalize_scenario_name(scenario.name)
+            row = stored_cases.get(key)
+            values = {
+                "name": scenario.name,
+                "scenario_name": scenario.name,
+                "description": scenario.description,
+                "tags": scenario.tags,
+                "feature_id": feature_id
+            }
+            if row is None:
+                test_case_id = generate_cuid()
+                case_inserts.append({
+                    "id": test_case_id,
+                    "type": TestCaseType.AUTOMATED,
+                    "priority": TestCasePriority.MEDIUM,
+                    "status": TestCaseStatus.PLANNED,
+                    "scenario_key": key,
+                    "application_id": application_id,
+                    "created_at": now,
+                    "updated_at": now,
+                    **values
+                })
+                summary["testCases"]["created"] += 1
+            else:
+                test_case_id = row.id
+                fields_changed = any(getattr(row, name) != value for name, value in values.items())
+                steps_changed = stored_steps.get(test_case_id, ()) != _steps_signature(scenario.steps)
+                if not (fields_changed or steps_changed):
+                    summary["testCases"]["unchanged"] += 1
+                    continue
+                if fields_changed:
+                    case_updates.append({
+                        "k_id": test_case_id, "v_updated_at": now,
+                        **{f"v_{name}": value for name, value in values.items()}
+                    })
+                summary["testCases"]["updated"] += 1
+                if not steps_changed:
+                    continue
+
+            steps, subs = build_step_rows(test_case_id, scenario.steps, now)
+            if row is None:
+                case_inserts[-1]["steps_document"] = serialize_step_rows(steps, subs)
+            else:
+                rewrite_documents[test_case_id] = serialize_step_rows(steps, subs)
+            step_rows.extend(steps)
+            for rows in subs.values():
+                sub_step_rows.extend(rows)
+
+    # Test cases whose steps changed get theirs replaced (sub-steps first)
+    # and their steps document rewritten
+    deltas = StepLibraryDeltas()
+    for test_case_id in rewrite_documents:
+        for _, text, _ in stored_steps.get(test_case_id, ()):
+            deltas.add(text, -1)
+    for step in step_rows:
+        deltas.add(step["text"])
+    touched = {row["k_id"] for row in case_updates}
+    _execute_updates(db, TestCase.__table__, ("id",), ("updated_at",), [
+        {"k_id": test_case_id, "v_updated_at": now} for test_case_id in rewrite_documents if test_case_id not in touched
+    ])
+    write_steps_documents(db, rewrite_documents)
+    for batch in chunked(rewrite_documents, MAX_IN_PARAMS):
+        db.execute(delete(GherkinSubStep.__table__).where(
+            GherkinSubStep.step_id.in_(select(GherkinStep.id).where(GherkinStep.test_case_id.in_(batch)))
+        ))
+        db.execute(delete(GherkinStep.__table__).where(GherkinStep.test_case_id.in_(batch)))
+
+    if feature_inserts:
+        db.execute(insert(Feature.__table__), feature_inserts)
+    _execute_updates(
+        db, Feature.__table__, ("id",),
+        ("name", "description", "feature_file_path", "feature_file_hash", "updated_at"), feature_updates
+    )
+    _execute_updates(
+        db, TestCase.__table__, ("id",),
+        ("name", "scenario_name", "description", "tags", "feature_id", "updated_at"), case_updates
+    )
+    insert_rows(db, case_inserts, step_rows, sub_step_rows)
+    apply_step_deltas(db, deltas)
+
+    summary["features"]["created"] = len(feature_inserts)
+    summary["features"]["updated"] = len(feature_updates)
+    return summary
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^\w]+", "_", name.lower(), flags=re.UNICODE).strip("_") or "feature"
+
+
+def _feature_files(db: Session, application_id: str, language: str) -> Iterator[Tuple[str, str]]:
+    """(path, content) of each feature of the application, by name."""
+    features = db.execute(
+        select(Feature.id, Feature.name, Feature.description, Feature.feature_file_path)
+        .where(Feature.application_id == application_id).order_by(Feature.name)
+    ).all()
+    used_paths = set()
+    for feature_id, name, description, path in features:
+        cases = db.execute(
+            select(TestCase.id, TestCase.name, TestCase.scenario_name, TestCase.description, TestCase.tags)
+            .where(TestCase.feature_id == feature_id).order_by(TestCase.created_at, TestCase.id)
+        ).all()
+        steps: Dict[str, list] = {}
+        for step_id, test_case_id, step_type, text in db.execute(
+            select(GherkinStep.id, GherkinStep.test_case_id, GherkinStep.type, GherkinStep.text)
+            .join(TestCase, TestCase.id == GherkinStep.test_case_id)
+            .where(TestCase.feature_id == feature_id).order_by(GherkinStep.order, GherkinStep.id)
+        ):
+            steps.setdefault(test_case_id, []).append((step_id, step_type, text))
+        sub_steps: Dict[str, list] = {}
+        for step_id, text in db.execute(
+            select(GherkinSubStep.step_id, GherkinSubStep.text)
+            .join(GherkinStep, GherkinStep.id == GherkinSubStep.step_id)
+            .join(TestCase, TestCase.id == GherkinStep.test_case_id)
+            .where(TestCase.feature_id == feature_id).order_by(GherkinSubStep.order, GherkinSubStep.id)
+        ):
+            sub_steps.setdefault(step_id, []).append(text)
+
+        parsed = ParsedFeature()
+        parsed.name = name
+        parsed.description_lines = (description or "").splitlines()
+        for test_case_id, tc_name, scenario_name, tc_description, tags in cases:
+            parsed.scenarios.append(scenario_from_model(
+                scenario_name or tc_name, tc_description, tags,
+                [(step_type, text, sub_steps.get(step_id, [])) for step_id, step_type, text in steps.get(test_case_id, [])]
+            ))
+
+        path = path or f"{_slug(name)}{FEATURE_FILE_SUFFIX}"
+        base, index = path, 1
+        while path in used_paths:
+            index += 1
+            path = f"{base[:-len(FEATURE_FILE_SUFFIX)]}_{index}{FEATURE_FILE_SUFFIX}"
+        used_paths.add(path)
+        yield path, serialize_feature(parsed, language)
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable sink for ZipFile whose written bytes are taken out as they come."""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_application_zip(
+    application_id: str, language: str = "en", session_factory: Callable[[], Session] = SessionLocal
+) -> Iterator[bytes]:
+    """
+    Zip of the application's features as .feature files, yielded one
+    file at a time. Uses its own session, since it runs while the
+    response is being sent.
+    """
+    db = session_factory()
+    try:
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path, content in _feature_files(db, application_id, language):
+                archive.writestr(path, content.encode("utf-8"))
+                yield stream.take()
+        yield stream.take()
+    finally:
+        db.close()
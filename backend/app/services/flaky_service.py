@@ -0,0 +1,211 @@
+"""
+Flaky-test detection over recent pipeline history.
+
+The last FLAKY_WINDOW_RUNS PASSED/FAILED results of each test case are
+ranked in SQL and read in bulk, a chunk of test cases at a time, into flat
+NumPy arrays. All metrics are then computed with sorts and bincounts, with
+no per-test-case Python loop:
+
+- failure_rate: failed runs / runs
+- flip_rate: PASSED <-> FAILED changes between consecutive runs on the
+  same branch / consecutive pairs on the same branch
+- score: flip rate with each flip weighted by the recency of its newer
+  run (FLAKY_HALF_LIFE_RUNS), scaled down below FLAKY_MIN_RUNS runs
+
+A test that always fails has no flips and scores 0: it is broken, not flaky.
+The p90 duration over the same runs is stored too, for shard planning.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import select, delete, insert, func, case, type_coerce, String
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import (
+    TestCase, GitlabPipeline, TestCasePipelineResult, TestCaseResultStatus, TestCaseHealth
+)
+from app.utils.batching import chunked
+
+SCORED_STATUSES = (TestCaseResultStatus.PASSED, TestCaseResultStatus.FAILED)
+
+
+def score_histories(
+    case_codes: np.ndarray,
+    branch_codes: np.ndarray,
+    ranks: np.ndarray,
+    failed: np.ndarray,
+    n_cases: int,
+    min_runs: int,
+    half_life: float
+) -> Dict[str, np.ndarray]:
+    """
+    Compute per-test-case metrics from one row per result.
+
+    `case_codes` and `branch_codes` are small integer codes, `ranks` is the
+    result's position in its test case's history (1 = newest) and `failed`
+    is a boolean array. Returns arrays of length `n_cases`.
+    """
+    # Chronological order within each (test case, branch); one packed int64
+    # key sorts several times faster than np.lexsort over three keys
+    n_branches = int(branch_codes.max()) + 1 if len(branch_codes) else 1
+    max_rank = int(ranks.max()) if len(ranks) else 0
+    key = (case_codes.astype(np.int64) * n_branches + branch_codes) * (max_rank + 1) + (max_rank - ranks)
+    order = np.argsort(key, kind="stable")
+    cases = case_codes[order]
+    branches = branch_codes[order]
+    fails = failed[order]
+    newer_ranks = ranks[order][1:]
+
+    runs = np.bincount(cases, minlength=n_cases)
+    failures = np.bincount(cases, weights=fails, minlength=n_cases)
+
+    pair_cases = cases[1:]
+    same = (pair_cases == cases[:-1]) & (branches[1:] == branches[:-1])
+    flip = same & (fails[1:] != fails[:-1])
+    pairs = np.bincount(pair_cases, weights=same, minlength=n_cases)
+    flips = np.bincount(pair_cases, weights=flip, minlength=n_cases)
+
+    weights = 0.5 ** ((newer_ranks - 1) / half_life)
+    weighted_pairs = np.bincount(pair_cases, weights=weights * same, minlength=n_cases)
+    weighted_flips = np.bincount(pair_cases, weights=weights * flip, minlength=n_cases)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        flip_rate = np.where(pairs > 0, flips / pairs, 0.0)
+        failure_rate = np.where(runs > 0, failures / runs, 0.0)
+        recent_flip_rate = np.where(weighted_pairs > 0, weighted_flips / weighted_pairs, 0.0)
+    confidence = np.minimum(1.0, runs / max(min_runs, 1))
+
+    return {
+        "runs": runs,
+        "failures": failures.astype(np.int64),
+        "flips": flips.astype(np.int64),
+        "flip_rate": flip_rate,
+        "failure_rate": failure_rate,
+        "score": recent_flip_rate * confidence,
+    }
+
+
+def duration_quantile(case_codes: np.ndarray, durations: np.ndarray, n_cases: int, q: float) -> np.ndarray:
+    """
+    Nearest-rank quantile of `durations` per test case code.
+
+    NaN durations are ignored; test cases without any get NaN.
+    """
+    valid = ~np.isnan(durations)
+    cases = case_codes[valid]
+    values = durations[valid]
+    order = np.lexsort((values, cases))
+    values = values[order]
+    counts = np.bincount(cases, minlength=n_cases)
+    starts = np.cumsum(counts) - counts
+    result = np.full(n_cases, np.nan)
+    present = counts > 0
+    result[present] = values[starts[present] + np.ceil(q * counts[present]).astype(np.int64) - 1]
+    return result
+
+
+def _history_query(first_id: str, last_id: str, window: int):
+    rank = func.row_number().over(
+        partition_by=TestCasePipelineResult.test_case_id,
+        order_by=(GitlabPipeline.executed_at.desc(), GitlabPipeline.id.desc())
+    )
+    ranked = select(
+        TestCasePipelineResult.test_case_id,
+        GitlabPipeline.branch,
+        # Raw strings: skips enum conversion for every row
+        type_coerce(TestCasePipelineResult.status, String).label("status"),
+        TestCasePipelineResult.duration,
+        GitlabPipeline.executed_at,
+        rank.label("rank")
+    ).join(
+        GitlabPipeline, GitlabPipeline.id == TestCasePipelineResult.pipeline_id
+    ).where(
+        TestCasePipelineResult.test_case_id.between(first_id, last_id),
+        TestCasePipelineResult.status.in_(SCORED_STATUSES)
+    ).subquery()
+    return select(
+        ranked.c.test_case_id,
+        ranked.c.branch,
+        ranked.c.status,
+        ranked.c.rank,
+        ranked.c.duration,
+        # Only the newest run's timestamp is needed
+        case((ranked.c.rank == 1, ranked.c.executed_at), else_=None)
+    ).where(ranked.c.rank <= window)
+
+
+def _refresh_chunk(db: Session, chunk: List[tuple], window: int, computed_at: datetime) -> Dict[str, int]:
+    first_id, last_id = chunk[0][0], chunk[-1][0]
+    # Core connection: plain rows, without the ORM result machinery
+    rows = db.connection().execute(_history_query(first_id, last_id, window)).all()
+
+    db.execute(delete(TestCaseHealth).where(TestCaseHealth.test_case_id.between(first_id, last_id)))
+    if not rows:
+        db.commit()
+        return {"results": 0, "scored": 0, "flaky": 0}
+
+    test_case_ids, branches, statuses, ranks, durations, executed = zip(*rows)
+    case_ids, case_codes = np.unique(np.array(test_case_ids, dtype=object), return_inverse=True)
+    _, branch_codes = np.unique(np.array(branches, dtype=object), return_inverse=True)
+    status_array = np.array(statuses, dtype=object)
+    ranks = np.array(ranks, dtype=np.int64)
+    metrics = score_histories(
+        case_codes, branch_codes, ranks, status_array == TestCaseResultStatus.FAILED.value,
+        len(case_ids), settings.FLAKY_MIN_RUNS, settings.FLAKY_HALF_LIFE_RUNS
+    )
+    # None becomes NaN
+    duration_p90 = duration_quantile(case_codes, np.array(durations, dtype=float), len(case_ids), 0.9)
+
+    newest = np.flatnonzero(ranks == 1)
+    last_status = dict(zip(np.array(test_case_ids, dtype=object)[newest], status_array[newest]))
+    last_run_at = {test_case_ids[i]: executed[i] for i in newest}
+    applications = dict(chunk)
+
+    records = []
+    for code, test_case_id in enumerate(case_ids.tolist()):
+        records.append({
+            "test_case_id": test_case_id,
+            "application_id": applications.get(test_case_id),
+            "runs": int(metrics["runs"][code]),
+            "failures": int(metrics["failures"][code]),
+            "flips": int(metrics["flips"][code]),
+            "flip_rate": float(metrics["flip_rate"][code]),
+            "failure_rate": float(metrics["failure_rate"][code]),
+            "score": float(metrics["score"][code]),
+            "duration_p90": None if np.isnan(duration_p90[code]) else float(duration_p90[code]),
+            "last_status": last_status.get(test_case_id),
+            "last_run_at": last_run_at.get(test_case_id),
+            "computed_at": computed_at,
+        })
+    db.execute(insert(TestCaseHealth), records)
+    db.commit()
+    return {
+        "results": len(rows),
+        "scored": len(records),
+        "flaky": int(np.count_nonzero(metrics["score"] >= settings.FLAKY_SCORE_THRESHOLD)),
+    }
+
+
+def refresh_test_case_health(
+    db: Session,
+    window: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Recompute `test_case_health` for every test case with scored results.
+
+    Works through test cases in key order, FLAKY_CHUNK_SIZE at a time, each
+    chunk replaced in its own transaction. Returns totals.
+    """
+    window = window or settings.FLAKY_WINDOW_RUNS
+    chunk_size = chunk_size or settings.FLAKY_CHUNK_SIZE
+    computed_at = datetime.utcnow()
+
+    # Key order as the database sees it, so BETWEEN ranges match the chunks
+    test_cases = db.execute(select(TestCase.id, TestCase.application_id).order_by(TestCase.id)).all()
+    totals = {"testCases": len(test_cases), "results": 0, "scored": 0, "flaky": 0}
+    for chunk in chunked([tuple(row) for row in test_cases], chunk_size):
+        stats = _refresh_chunk(db, chunk, window, computed_at)
+        for key, value in stats.items():
+            totals[key] += value
+    return totals
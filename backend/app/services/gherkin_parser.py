@@ -0,0 +1,359 @@
+"""
+Gherkin (.feature) parser and serializer.
+
+Maps a feature file onto the DocuCase model:
+
+- Feature name and description -> Feature.
+- Each Scenario / Scenario Outline -> TestCase (name and scenario_name are
+  the scenario title; tags include those inherited from the Feature and
+  Rule). Rule headers are flattened away.
+- Background steps are prepended to every scenario of their feature or
+  rule, which is how they run.
+- Steps -> GherkinStep ("*" counts as AND). Their arguments become
+  sub-steps: one per data table row ("| a | b |") and one per doc string
+  (delimiters included). Sub-steps that are neither are written as
+  "# - text" comments right below the step and read back from them.
+- An outline's Examples blocks are kept verbatim at the end of the test
+  case description (from the "Examples:" line), which is where the
+  serializer takes them back from.
+
+Keywords are read in English or Spanish ("# language: es"); output is in
+either language.
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+from app.models import GherkinStepType
+
+DOC_STRING_DELIMITERS = ('"""', "```")
+SUB_STEP_COMMENT = "# - "
+
+KEYWORDS = {
+    "en": {
+        "feature": ["Feature", "Business Need", "Ability"],
+        "background": ["Background"],
+        "rule": ["Rule"],
+        "scenario": ["Scenario", "Example"],
+        "outline": ["Scenario Outline", "Scenario Template"],
+        "examples": ["Examples", "Scenarios"],
+        "steps": {
+            GherkinStepType.GIVEN: ["Given"],
+            GherkinStepType.WHEN: ["When"],
+            GherkinStepType.THEN: ["Then"],
+            GherkinStepType.AND: ["And"],
+            GherkinStepType.BUT: ["But"],
+        },
+    },
+    "es": {
+        "feature": ["Característica", "Necesidad del negocio", "Requisito"],
+        "background": ["Antecedentes"],
+        "rule": ["Regla de negocio", "Regla"],
+        "scenario": ["Escenario", "Ejemplo"],
+        "outline": ["Esquema del escenario"],
+        "examples": ["Ejemplos"],
+        "steps": {
+            GherkinStepType.GIVEN: ["Dado", "Dada", "Dados", "Dadas"],
+            GherkinStepType.WHEN: ["Cuando"],
+            GherkinStepType.THEN: ["Entonces"],
+            GherkinStepType.AND: ["Y", "E"],
+            GherkinStepType.BUT: ["Pero"],
+        },
+    },
+}
+LANGUAGES = tuple(KEYWORDS)
+
+_LANGUAGE_HEADER = re.compile(r"^#\s*language\s*:\s*([\w-]+)\s*$")
+_EXAMPLES_LINE = re.compile(
+    r"^(?:%s):" % "|".join(re.escape(k) for lang in KEYWORDS.values() for k in lang["examples"])
+)
+
+
+class GherkinParseError(ValueError):
+    """The feature file is malformed."""
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(f"línea {line}: {message}" if line else message)
+        self.line = line
+
+
+class ParsedSubStep:
+    def __init__(self, text: str, order: Optional[int] = None):
+        self.text = text
+        self.order = order
+
+
+class ParsedStep:
+    """Same attributes as GherkinStepCreate, so both can be written alike."""
+    def __init__(self, type: GherkinStepType, text: str):
+        self.type = type
+        self.text = text
+        self.order: Optional[int] = None
+        self.sub_steps: List[ParsedSubStep] = []
+
+
+class ParsedScenario:
+    def __init__(self, name: str, tags: List[str], line: int):
+        self.name = name
+        self.tags = tags
+        self.line = line
+        self.description_lines: List[str] = []
+        self.steps: List[ParsedStep] = []
+        self.examples_lines: List[str] = []
+
+    @property
+    def description(self) -> Optional[str]:
+        """Scenario description, followed by the Examples blocks of an outline."""
+        parts = []
+        description = "\n".join(self.description_lines).strip()
+        if description:
+            parts.append(description)
+        if self.examples_lines:
+            parts.append("\n".join(self.examples_lines))
+        return "\n\n".join(parts) or None
+
+
+class ParsedFeature:
+    def __init__(self):
+        self.name: Optional[str] = None
+        self.description_lines: List[str] = []
+        self.scenarios: List[ParsedScenario] = []
+        self.language = "en"
+
+    @property
+    def description(self) -> Optional[str]:
+        return "\n".join(self.description_lines).strip() or None
+
+
+def _keyword_table(language: str) -> List[Tuple[str, str, object]]:
+    """(prefix, kind, step type) sorted longest first so "Scenario Outline" beats "Scenario"."""
+    keywords = KEYWORDS[language]
+    table = []
+    for kind in ("feature", "background", "rule", "outline", "scenario", "examples"):
+        table.extend((f"{word}:", kind, None) for word in keywords[kind])
+    for step_type, words in keywords["steps"].items():
+        table.extend((f"{word} ", "step", step_type) for word in words)
+    table.append(("* ", "step", GherkinStepType.AND))
+    return sorted(table, key=lambda entry: -len(entry[0]))
+
+
+def _merge_tags(*groups: List[str]) -> List[str]:
+    seen = []
+    for group in groups:
+        for tag in group:
+            if tag not in seen:
+                seen.append(tag)
+    return seen
+
+
+def _table_row(line: str) -> str:
+    """Normalise cell spacing: "|a|  b |" -> "| a | b |" (escaped pipes kept)."""
+    cells = re.split(r"(?<!\\)\|", line.strip())[1:-1]
+    return "| " + " | ".join(cell.strip() for cell in cells) + " |"
+
+
+def parse_feature(text: str) -> ParsedFeature:
+    """Parse the content of a .feature file."""
+    feature = ParsedFeature()
+    lines = text.lstrip("﻿").splitlines()
+    keywords = _keyword_table("en")
+
+    pending_tags: List[str] = []
+    feature_tags: List[str] = []
+    rule_tags: List[str] = []
+    feature_background: List[ParsedStep] = []
+    rule_background: List[ParsedStep] = []
+    in_rule = False
+    scenario: Optional[ParsedScenario] = None
+    described = True  # whether free text can no longer be the scenario description
+    steps_target: Optional[List[ParsedStep]] = None  # where steps go: background or scenario
+    section = None  # "feature", "background", "rule", "scenario", "examples"
+    doc_string: Optional[Tuple[str, int, List[str], int]] = None  # opening line, indent, lines, start line
+
+    for number, raw in enumerate(lines, start=1):
+        if doc_string is not None:
+            opening, indent, content, _ = doc_string
+            if raw.strip() == opening[:3]:
+                body = "\n".join([opening] + content + [opening[:3]])
+                steps_target[-1].sub_steps.append(ParsedSubStep(body))
+                doc_string = None
+            else:
+                # Strip the opening delimiter's indentation, as Gherkin does
+                content.append((raw[indent:] if not raw[:indent].strip() else raw.lstrip()).rstrip())
+            continue
+
+        line = raw.strip()
+        if not line:
+            continue
+
+        if line.startswith("#"):
+            header = _LANGUAGE_HEADER.match(line)
+            if header and feature.name is None and not feature.scenarios:
+                language = header.group(1).lower()
+                if language not in KEYWORDS:
+                    raise GherkinParseError(f"Idioma no soportado: {language}", number)
+                feature.language = language
+                keywords = _keyword_table(language)
+            elif line.startswith(SUB_STEP_COMMENT) and steps_target and section in ("background", "scenario"):
+                steps_target[-1].sub_steps.append(ParsedSubStep(line[len(SUB_STEP_COMMENT):].strip()))
+            continue
+
+        if line.startswith("@"):
+            pending_tags.extend(tag[1:] for tag in line.split("#", 1)[0].split() if tag.startswith("@") and len(tag) > 1)
+            continue
+
+        if line.startswith(DOC_STRING_DELIMITERS):
+            if not steps_target or section not in ("background", "scenario"):
+                raise GherkinParseError("Doc string fuera de un paso", number)
+            doc_string = (line, len(raw) - len(raw.lstrip()), [], number)
+            continue
+
+        if line.startswith("|"):
+            if section == "examples":
+                scenario.examples_lines.append("  " + _table_row(line))
+            elif steps_target and section in ("background", "scenario"):
+                steps_target[-1].sub_steps.append(ParsedSubStep(_table_row(line)))
+            else:
+                raise GherkinParseError("Tabla fuera de un paso", number)
+            continue
+
+        match = next((entry for entry in keywords if line.startswith(entry[0])), None)
+        if match is None:
+            # Free text: descriptions
+            if section == "feature":
+                feature.description_lines.append(line)
+            elif section == "scenario" and not described:
+                scenario.description_lines.append(line)
+            elif section == "examples":
+                scenario.examples_lines.append(line)
+            elif section in ("rule", "background"):
+                pass
+            else:
+                raise GherkinParseError(f"Línea no reconocida: {line[:60]}", number)
+            continue
+
+        prefix, kind, step_type = match
+        value = line[len(prefix):].strip()
+
+        if kind == "feature":
+            if feature.name is not None:
+                raise GherkinParseError("Más de una Feature en el archivo", number)
+            feature.name = value
+            feature_tags, pending_tags = pending_tags, []
+            section = "feature"
+            continue
+
+        if feature.name is None:
+            raise GherkinParseError("Se esperaba 'Feature:'", number)
+
+        if kind == "background":
+            steps_target = rule_background if in_rule else feature_background
+            steps_target.clear()
+            section, scenario, pending_tags = "background", None, []
+        elif kind == "rule":
+            in_rule = True
+            rule_tags, pending_tags = pending_tags, []
+            rule_background = []
+            section, scenario, steps_target = "rule", None, None
+        elif kind in ("scenario", "outline"):
+            if not value:
+                raise GherkinParseError("Escenario sin nombre", number)
+            scenario = ParsedScenario(value, _merge_tags(feature_tags, rule_tags if in_rule else [], pending_tags), number)
+            pending_tags = []
+            for background_step in feature_background + (rule_background if in_rule else []):
+                copy = ParsedStep(background_step.type, background_step.text)
+                copy.sub_steps = [ParsedSubStep(sub.text) for sub in background_step.sub_steps]
+                scenario.steps.append(copy)
+            feature.scenarios.append(scenario)
+            steps_target, described = scenario.steps, False
+            section = "scenario"
+        elif kind == "examples":
+            if scenario is None:
+                raise GherkinParseError("Examples fuera de un escenario", number)
+            if scenario.examples_lines:
+                scenario.examples_lines.append("")
+            if pending_tags:
+                scenario.examples_lines.append(" ".join(f"@{tag}" for tag in pending_tags))
+                pending_tags = []
+            # Stored with the English keyword; the serializer translates it
+            scenario.examples_lines.append(f"Examples:{' ' + value if value else ''}")
+            section = "examples"
+        elif kind == "step":
+            if section not in ("background", "scenario") or steps_target is None:
+                raise GherkinParseError("Paso fuera de un escenario", number)
+            if not value:
+                raise GherkinParseError("Paso vacío", number)
+            steps_target.append(ParsedStep(step_type, value))
+            described = True
+
+    if doc_string is not None:
+        raise GherkinParseError("Doc string sin cerrar", doc_string[3])
+    if feature.name is None:
+        raise GherkinParseError("No se encontró 'Feature:'")
+    return feature
+
+
+def split_examples(description: Optional[str]) -> Tuple[Optional[str], List[str]]:
+    """Split a stored test case description into its own text and an outline's Examples lines."""
+    if not description:
+        return None, []
+    lines = description.splitlines()
+    for index, line in enumerate(lines):
+        if _EXAMPLES_LINE.match(line.strip()):
+            # Tags of the first Examples block sit on the line before it
+            if index > 0 and lines[index - 1].strip().startswith("@"):
+                index -= 1
+            text = "\n".join(lines[:index]).strip()
+            return text or None, lines[index:]
+    return description.strip() or None, []
+
+
+def scenario_from_model(name: str, description: Optional[str], tags: Sequence[str], steps: Sequence) -> ParsedScenario:
+    """
+    ParsedScenario for a stored test case. `steps` are (type, text,
+    [sub-step texts]) in order.
+    """
+    scenario = ParsedScenario(name, list(tags or []), 0)
+    text, scenario.examples_lines = split_examples(description)
+    scenario.description_lines = text.splitlines() if text else []
+    for step_type, step_text, sub_texts in steps:
+        step = ParsedStep(GherkinStepType(step_type), step_text)
+        step.sub_steps = [ParsedSubStep(sub) for sub in sub_texts]
+        scenario.steps.append(step)
+    return scenario
+
+
+def serialize_feature(feature: ParsedFeature, language: str = "en") -> str:
+    """Render a feature as .feature file content (ends with a newline)."""
+    keywords = KEYWORDS[language]
+    step_words = {step_type: words[0] for step_type, words in keywords["steps"].items()}
+    lines = []
+    if language != "en":
+        lines.append(f"# language: {language}")
+    lines.append(f"{keywords['feature'][0]}: {feature.name}")
+    lines.extend(f"  {line}" if line.strip() else "" for line in (feature.description or "").splitlines())
+
+    for scenario in feature.scenarios:
+        lines.append("")
+        if scenario.tags:
+            lines.append("  " + " ".join(f"@{tag}" for tag in scenario.tags))
+        keyword = keywords["outline"][0] if scenario.examples_lines else keywords["scenario"][0]
+        lines.append(f"  {keyword}: {scenario.name}")
+        lines.extend(f"    {line}" if line.strip() else "" for line in scenario.description_lines)
+        for step in scenario.steps:
+            lines.append(f"    {step_words[step.type]} {step.text}")
+            for sub in step.sub_steps:
+                if sub.text.startswith("|"):
+                    lines.append(f"      {sub.text}")
+                elif sub.text.startswith(DOC_STRING_DELIMITERS):
+                    lines.extend(f"      {line}" if line else "" for line in sub.text.split("\n"))
+                else:
+                    lines.append(f"      {SUB_STEP_COMMENT}{sub.text}")
+        if scenario.examples_lines:
+            lines.append("")
+            for line in scenario.examples_lines:
+                line = line.strip()
+                if _EXAMPLES_LINE.match(line):
+                    lines.append(f"    {keywords['examples'][0]}:{line.split(':', 1)[1]}")
+                elif line.startswith("@"):
+                    lines.append(f"    {line}")
+                else:
+                    lines.append(f"      {line}" if line else "")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,410 @@
+"""
+Incremental sync of GitLab pipelines into `gitlab_pipelines`.
+
+Every project referenced by an application is paged through the GitLab
+pipelines API in `updated_at` order, starting at its stored watermark
+(`gitlab_sync_states.updated_after`). Each page is upserted in bulk and
+the watermark is advanced in the same transaction, so an interrupted
+sync resumes where it stopped. With GITLAB_SYNC_FETCH_JOBS, a pipeline's
+jobs are read too, and its execution time is when its first job started.
+
+All requests share one pooled async client. A semaphore keeps at most
+GITLAB_SYNC_CONCURRENCY requests in flight across every project. 429 and
+5xx responses are retried with backoff, honouring Retry-After. When
+GitLab reports that the rate limit is exhausted (RateLimit-Remaining: 0),
+every request waits until RateLimit-Reset.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+import httpx
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Application, GitlabPipeline, PipelineStatus, GitlabSyncState, GitlabSyncStatus
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.id_generator import generate_cuid
+
+GITLAB_STATUSES = {
+    "created": PipelineStatus.PENDING,
+    "waiting_for_resource": PipelineStatus.PENDING,
+    "preparing": PipelineStatus.PENDING,
+    "pending": PipelineStatus.PENDING,
+    "scheduled": PipelineStatus.PENDING,
+    "manual": PipelineStatus.PENDING,
+    "running": PipelineStatus.RUNNING,
+    "success": PipelineStatus.PASSED,
+    "failed": PipelineStatus.FAILED,
+    "canceled": PipelineStatus.CANCELED,
+    "skipped": PipelineStatus.SKIPPED,
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GitlabSyncError(Exception):
+    """GitLab answered with an error that retrying will not fix."""
+
+
+def parse_gitlab_datetime(value: Optional[str]) -> Optional[datetime]:
+    """GitLab ISO 8601 timestamp as naive UTC."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class GitlabClient:
+    """Pooled async GitLab API client with bounded concurrency and retries."""
+    def __init__(
+        self,
+        base_url: str,
+        token: Optional[str],
+        concurrency: int,
+        timeout: float,
+        max_retries: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/api/v4",
+            headers={"PRIVATE-TOKEN": token} if token else {},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._max_retries = max_retries
+        self._paused_until = 0.0
+        self.requests = 0
+
+    async def __aenter__(self) -> "GitlabClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.aclose()
+
+    async def _wait_for_rate_limit(self) -> None:
+        delay = self._paused_until - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _note_rate_limit(self, response: httpx.Response) -> None:
+        if response.headers.get("RateLimit-Remaining") == "0":
+            reset = response.headers.get("RateLimit-Reset")
+            if reset and reset.isdigit():
+                self._paused_until = max(self._paused_until, float(reset))
+
+    @staticmethod
+    def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        # Exponential backoff with jitter: 0.5 s, 1 s, 2 s... capped at 30 s
+        return min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        for attempt in range(self._max_retries + 1):
+            await self._wait_for_rate_limit()
+            response = None
+            async with self._semaphore:
+                try:
+                    self.requests += 1
+                    response = await self._client.get(path, params=params)
+                except httpx.TransportError:
+                    if attempt == self._max_retries:
+                        raise
+            if response is not None:
+                self._note_rate_limit(response)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 400:
+                        raise GitlabSyncError(f"GitLab {response.status_code} en {path}: {response.text[:200]}")
+                    return response
+                if attempt == self._max_retries:
+                    raise GitlabSyncError(f"GitLab {response.status_code} en {path} tras {attempt + 1} intentos")
+            # Sleep outside the semaphore so other requests keep going
+            await asyncio.sleep(self._retry_delay(response, attempt))
+        raise GitlabSyncError(f"GitLab no respondió en {path}")
+
+    async def paginate(self, path: str, params: Dict[str, Any]) -> AsyncIterator[List[dict]]:
+        """Yield each page of a list endpoint, following X-Next-Page."""
+        page = 1
+        while True:
+            response = await self.get(path, {**params, "page": page})
+            items = response.json()
+            if items:
+                yield items
+            next_page = response.headers.get("X-Next-Page")
+            if not next_page or not items:
+                return
+            page = int(next_page)
+
+
+def project_ids(db: Session) -> List[str]:
+    """GitLab projects referenced by applications."""
+    rows = db.query(Application.gitlab_project_id).filter(
+        Application.gitlab_project_id.isnot(None), Application.gitlab_project_id != ""
+    ).distinct()
+    return sorted(row[0] for row in rows)
+
+
+def claim_project(db: Session, gitlab_project_id: str) -> Optional[GitlabSyncState]:
+    """
+    Mark a project's sync as running, unless another run holds it.
+
+    Runs older than GITLAB_SYNC_LOCK_MINUTES are considered dead. Returns
+    the state (committed) or None when the project is busy.
+    """
+    now = datetime.utcnow()
+    state = db.query(GitlabSyncState).filter(GitlabSyncState.gitlab_project_id == gitlab_project_id).first()
+    if state is None:
+        try:
+            db.add(GitlabSyncState(
+                gitlab_project_id=gitlab_project_id, status=GitlabSyncStatus.RUNNING, started_at=now, pipelines=0
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+    else:
+        claimed = db.query(GitlabSyncState).filter(
+            GitlabSyncState.gitlab_project_id == gitlab_project_id,
+            (GitlabSyncState.status != GitlabSyncStatus.RUNNING)
+            | (GitlabSyncState.started_at < now - timedelta(minutes=settings.GITLAB_SYNC_LOCK_MINUTES))
+        ).update({
+            GitlabSyncState.status: GitlabSyncStatus.RUNNING,
+            GitlabSyncState.started_at: now,
+            GitlabSyncState.pipelines: 0,
+            GitlabSyncState.error: None
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+    return db.query(GitlabSyncState).filter(GitlabSyncState.gitlab_project_id == gitlab_project_id).first()
+
+
+def _write_pipelines(db: Session, gitlab_project_id: str, rows: List[dict]) -> Tuple[int, int]:
+    existing: Dict[str, tuple] = {}
+    for batch in chunked([row["gitlab_pipeline_id"] for row in rows], MAX_IN_PARAMS):
+        found = db.query(
+            GitlabPipeline.gitlab_pipeline_id, GitlabPipeline.id, GitlabPipeline.branch,
+            GitlabPipeline.status, GitlabPipeline.web_url
+        ).filter(
+            GitlabPipeline.gitlab_project_id == gitlab_project_id,
+            GitlabPipeline.gitlab_pipeline_id.in_(batch)
+        )
+        existing.update({row[0]: row[1:] for row in found})
+
+    now = datetime.utcnow()
+    inserts = []
+    updates = []
+    for row in rows:
+        current = existing.get(row["gitlab_pipeline_id"])
+        if current is None:
+            inserts.append({**row, "id": generate_cuid(), "gitlab_project_id": gitlab_project_id, "created_at": now})
+        elif current[1:] != (row["branch"], row["status"], row["web_url"]):
+            # executed_at is kept: results ingested from CI may have set it
+            updates.append({"id": current[0], "branch": row["branch"], "status": row["status"], "web_url": row["web_url"]})
+    if inserts:
+        db.execute(insert(GitlabPipeline), inserts)
+    if updates:
+        db.execute(update(GitlabPipeline), updates)
+    return len(inserts), len(updates)
+
+
+def upsert_gitlab_pipelines(
+    db: Session,
+    gitlab_project_id: str,
+    rows: List[dict],
+    watermark: Optional[datetime]
+) -> Tuple[int, int]:
+    """
+    Insert new pipelines and update changed ones, then advance the
+    project's watermark; one transaction (committed here).
+
+    A pipeline created meanwhile by result ingestion makes the insert
+    fail; the page is then written again against fresh rows.
+    Returns (created, updated).
+    """
+    for attempt in range(3):
+        try:
+            created, updated = _write_pipelines(db, gitlab_project_id, rows)
+            values = {GitlabSyncState.pipelines: GitlabSyncState.pipelines + len(rows)}
+            if watermark is not None:
+                values[GitlabSyncState.updated_after] = watermark
+            db.query(GitlabSyncState).filter(
+                GitlabSyncState.gitlab_project_id == gitlab_project_id
+            ).update(values, synchronize_session=False)
+            db.commit()
+            return created, updated
+        except IntegrityError:
+            db.rollback()
+            if attempt == 2:
+                raise
+    return 0, 0
+
+
+def finish_project(db: Session, gitlab_project_id: str, error: Optional[str]) -> None:
+    db.query(GitlabSyncState).filter(GitlabSyncState.gitlab_project_id == gitlab_project_id).update({
+        GitlabSyncState.status: GitlabSyncStatus.FAILED if error else GitlabSyncStatus.OK,
+        GitlabSyncState.finished_at: datetime.utcnow(),
+        GitlabSyncState.error: error
+    }, synchronize_session=False)
+    db.commit()
+
+
+class GitlabSync:
+    """Sync of several projects over one client; DB work runs in worker threads."""
+    def __init__(
+        self,
+        client: GitlabClient,
+        session_factory: Callable[[], Session] = SessionLocal,
+        fetch_jobs: bool = True,
+        per_page: int = 100
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.fetch_jobs = fetch_jobs
+        self.per_page = per_page
+
+    def _in_session(self, fn, *args):
+        db = self.session_factory()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    async def _db(self, fn, *args):
+        return await asyncio.to_thread(self._in_session, fn, *args)
+
+    async def _first_job_start(self, project_path: str, pipeline_id: int) -> Optional[datetime]:
+        first = None
+        async for jobs in self.client.paginate(
+            f"/projects/{project_path}/pipelines/{pipeline_id}/jobs",
+            {"per_page": self.per_page, "include_retried": "true"}
+        ):
+            for job in jobs:
+                started = parse_gitlab_datetime(job.get("started_at"))
+                if started and (first is None or started < first):
+                    first = started
+        return first
+
+    async def sync_project(self, gitlab_project_id: str) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"pipelines": 0, "created": 0, "updated": 0, "status": GitlabSyncStatus.OK.value}
+        state = await self._db(claim_project, gitlab_project_id)
+        if state is None:
+            stats["status"] = GitlabSyncStatus.RUNNING.value
+            return stats
+
+        since = state.updated_after or datetime.utcnow() - timedelta(days=settings.GITLAB_SYNC_INITIAL_DAYS)
+        project_path = quote(str(gitlab_project_id), safe="")
+        params = {
+            "updated_after": since.isoformat() + "Z",
+            "order_by": "updated_at",
+            "sort": "asc",
+            "per_page": self.per_page,
+        }
+        error = None
+        try:
+            async for page in self.client.paginate(f"/projects/{project_path}/pipelines", params):
+                starts = [None] * len(page)
+                if self.fetch_jobs:
+                    starts = await asyncio.gather(*[self._first_job_start(project_path, p["id"]) for p in page])
+                rows = []
+                watermark = None
+                for pipeline, started in zip(page, starts):
+                    created_at = parse_gitlab_datetime(pipeline.get("created_at")) or datetime.utcnow()
+                    updated_at = parse_gitlab_datetime(pipeline.get("updated_at"))
+                    rows.append({
+                        "gitlab_pipeline_id": str(pipeline["id"]),
+                        "branch": pipeline.get("ref") or "main",
+                        "status": GITLAB_STATUSES.get(pipeline.get("status"), PipelineStatus.PENDING),
+                        "web_url": pipeline.get("web_url"),
+                        "executed_at": started or created_at,
+                    })
+                    if updated_at and (watermark is None or updated_at > watermark):
+                        watermark = updated_at
+                # Last report of a pipeline listed twice (updated while paging) wins
+                rows = list({row["gitlab_pipeline_id"]: row for row in rows}.values())
+                created, updated = await self._db(upsert_gitlab_pipelines, gitlab_project_id, rows, watermark)
+                stats["pipelines"] += len(page)
+                stats["created"] += created
+                stats["updated"] += updated
+        except (GitlabSyncError, httpx.HTTPError) as exc:
+            error = str(exc) or exc.__class__.__name__
+            stats["status"] = GitlabSyncStatus.FAILED.value
+            stats["error"] = error
+        except BaseException as exc:
+            # Anything else (a bug, a database error, cancellation) still
+            # marks the project failed, then propagates
+            error = str(exc) or exc.__class__.__name__
+            raise
+        finally:
+            await self._db(finish_project, gitlab_project_id, error)
+        return stats
+
+    async def sync_projects(self, gitlab_project_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        results = await asyncio.gather(
+            *[self.sync_project(project_id) for project_id in gitlab_project_ids], return_exceptions=True
+        )
+        projects = {}
+        for project_id, result in zip(gitlab_project_ids, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                # One project's failure does not lose the other projects' stats
+                result = {
+                    "pipelines": 0, "created": 0, "updated": 0,
+                    "status": GitlabSyncStatus.FAILED.value, "error": str(result) or result.__class__.__name__
+                }
+            projects[project_id] = result
+        return projects
+
+
+def gitlab_configured() -> bool:
+    return bool(settings.GITLAB_URL)
+
+
+async def sync_gitlab_pipelines(
+    gitlab_project_ids: Optional[List[str]] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Dict[str, Any]:
+    """
+    Sync the given projects (default: every application's project) from
+    settings.GITLAB_URL. Returns per-project stats and the request count.
+    """
+    if gitlab_project_ids is None:
+        def load():
+            db = session_factory()
+            try:
+                return project_ids(db)
+            finally:
+                db.close()
+        
+        gitlab_project_ids = await asyncio.to_thread(load)
+
+    start = time.perf_counter()
+    async with GitlabClient(
+        settings.GITLAB_URL,
+        settings.GITLAB_TOKEN,
+        concurrency=settings.GITLAB_SYNC_CONCURRENCY,
+        timeout=settings.GITLAB_SYNC_TIMEOUT_SECONDS,
+        max_retries=settings.GITLAB_SYNC_MAX_RETRIES,
+        transport=transport,
+    ) as client:
+        sync = GitlabSync(
+            client, session_factory, fetch_jobs=settings.GITLAB_SYNC_FETCH_JOBS, per_page=settings.GITLAB_SYNC_PER_PAGE
+        )
+        projects = await sync.sync_projects(gitlab_project_ids)
+        return {
+            "projects": projects,
+            "requests": client.requests,
+            "seconds": round(time.perf_counter() - start, 2),
+        }
@@ -0,0 +1,83 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import IngestReceipt
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+CONTENT_KEY_PREFIX = "sha256:"
+
+
+class IngestRequestKey:
+    """Identifies one ingestion request for replay detection."""
+    def __init__(self, gitlab_project_id: str, gitlab_pipeline_id: str, payload_hash: str, idempotency_key: Optional[str] = None):
+        self.gitlab_project_id = gitlab_project_id
+        self.gitlab_pipeline_id = gitlab_pipeline_id
+        self.payload_hash = payload_hash
+        # Without a client key, identical payloads are treated as retries
+        self.idempotency_key = idempotency_key or f"{CONTENT_KEY_PREFIX}{payload_hash}"
+        self.content_keyed = not idempotency_key
+
+
+def find_replay(db: Session, key: IngestRequestKey) -> Optional[IngestReceipt]:
+    """
+    Return the stored receipt if this request was already processed.
+
+    Reusing an Idempotency-Key with a different payload is a client error (409).
+    A content-hash receipt only replays while it is the pipeline's newest
+    one: after A, B, A the second A is a new upload, not a retry of the first.
+    """
+    receipts = db.query(IngestReceipt).filter(
+        IngestReceipt.gitlab_project_id == key.gitlab_project_id,
+        IngestReceipt.gitlab_pipeline_id == key.gitlab_pipeline_id
+    )
+    receipt = receipts.filter(IngestReceipt.idempotency_key == key.idempotency_key).first()
+    if receipt and receipt.payload_hash != key.payload_hash:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La Idempotency-Key ya fue usada con un contenido distinto"
+        )
+    if receipt and key.content_keyed:
+        newest = receipts.order_by(IngestReceipt.created_at.desc()).first()
+        if newest.id != receipt.id:
+            return None
+    return receipt
+
+
+def record_receipt(
+    db: Session,
+    key: IngestRequestKey,
+    status_code: int,
+    response: dict,
+    ingest_job_id: Optional[str] = None
+) -> None:
+    """Store the response for future replays (committed here)."""
+    if key.content_keyed:
+        # Replaces the stale receipt of an earlier upload with the same content
+        db.query(IngestReceipt).filter(
+            IngestReceipt.gitlab_project_id == key.gitlab_project_id,
+            IngestReceipt.gitlab_pipeline_id == key.gitlab_pipeline_id,
+            IngestReceipt.idempotency_key == key.idempotency_key
+        ).delete(synchronize_session=False)
+    db.add(IngestReceipt(
+        gitlab_project_id=key.gitlab_project_id,
+        gitlab_pipeline_id=key.gitlab_pipeline_id,
+        idempotency_key=key.idempotency_key,
+        payload_hash=key.payload_hash,
+        status_code=status_code,
+        response=response,
+        ingest_job_id=ingest_job_id
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry recorded it first; its response is equivalent
+        db.rollback()
+
+
+def forget_job_receipts(db: Session, ingest_job_id: str) -> None:
+    """Drop the receipts pointing at a failed job. The caller must commit."""
+    db.query(IngestReceipt).filter(
+        IngestReceipt.ingest_job_id == ingest_job_id
+    ).delete(synchronize_session=False)
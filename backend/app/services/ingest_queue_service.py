@@ -0,0 +1,222 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import IngestJob, IngestJobKind, IngestJobStatus
+from app.schemas.pipeline import RegisterPipelineResult
+from app.services.pipeline_ingest_service import (
+    ingest_pipeline_results, ingest_pipeline_report, serialize_ingested_pipeline
+)
+from app.services.idempotency_service import forget_job_receipts
+from app.services.report_parsers import open_report, detect_format, parse_report
+from app.utils.id_generator import generate_cuid
+
+MAX_ERROR_LENGTH = 4000
+
+
+class IngestQueue:
+    """
+    Durable queue for pipeline ingestion.
+
+    Payloads are written to the spool directory and jobs to the
+    `ingest_jobs` table, so queued work survives restarts. Each process
+    runs a small pool of worker threads; a job is claimed with a
+    conditional UPDATE, so several processes can share the queue.
+    Jobs left RUNNING longer than INGEST_JOB_TIMEOUT_MINUTES (e.g. the
+    process died) are re-queued until INGEST_MAX_ATTEMPTS is reached.
+    """
+    def __init__(self, spool_dir: str, workers: int, max_depth: int, poll_seconds: float):
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.max_depth = max_depth
+        self.poll_seconds = poll_seconds
+        self._threads = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._failed = 0
+        self._last_stale_check = datetime.min
+
+    # -------------------------------------------------------------- producer
+
+    def depth(self, db: Session) -> int:
+        return db.query(IngestJob).filter(
+            IngestJob.status.in_([IngestJobStatus.QUEUED, IngestJobStatus.RUNNING])
+        ).count()
+
+    def check_capacity(self, db: Session) -> None:
+        """Reject new jobs with a 503 while the queue is at INGEST_QUEUE_MAX_DEPTH."""
+        if self.depth(db) >= self.max_depth:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Cola de ingesta llena, intente nuevamente más tarde",
+                headers={"Retry-After": str(max(1, int(self.poll_seconds * 5)))},
+            )
+
+    def new_payload_path(self) -> str:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        return os.path.join(self.spool_dir, f"{generate_cuid()}.payload")
+
+    def enqueue(
+        self,
+        db: Session,
+        kind: IngestJobKind,
+        gitlab_project_id: str,
+        gitlab_pipeline_id: str,
+        payload_path: str,
+        options: Optional[dict] = None
+    ) -> IngestJob:
+        """Record a job for an already spooled payload (committed here)."""
+        job = IngestJob(
+            kind=kind,
+            gitlab_project_id=gitlab_project_id,
+            gitlab_pipeline_id=gitlab_pipeline_id,
+            payload_path=payload_path,
+            options=options or {}
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._wake.set()
+        return job
+
+    # -------------------------------------------------------------- workers
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_pending(limit=1)
+            except Exception as exc:  # noqa: BLE001
+                print(f"Ingest worker error: {exc}")
+                processed = 0
+            if not processed:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_pending(self, limit: Optional[int] = None) -> int:
+        """Claim and process queued jobs; returns how many were processed."""
+        count = 0
+        while limit is None or count < limit:
+            db = SessionLocal()
+            try:
+                self._requeue_stale(db)
+                job = self._claim(db)
+                if job is None:
+                    return count
+                self._process(db, job)
+                count += 1
+            finally:
+                db.close()
+        return count
+
+    def _claim(self, db: Session) -> Optional[IngestJob]:
+        candidates = db.query(IngestJob.id).filter(
+            IngestJob.status == IngestJobStatus.QUEUED
+        ).order_by(IngestJob.created_at).limit(max(self.workers, 1) * 2).all()
+        for (job_id,) in candidates:
+            claimed = db.query(IngestJob).filter(
+                IngestJob.id == job_id,
+                IngestJob.status == IngestJobStatus.QUEUED
+            ).update({
+                IngestJob.status: IngestJobStatus.RUNNING,
+                IngestJob.started_at: datetime.utcnow(),
+                IngestJob.attempts: IngestJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return db.query(IngestJob).filter(IngestJob.id == job_id).first()
+        return None
+
+    def _requeue_stale(self, db: Session) -> None:
+        now = datetime.utcnow()
+        if now - self._last_stale_check < timedelta(minutes=1):
+            return
+        self._last_stale_check = now
+        stale = db.query(IngestJob).filter(
+            IngestJob.status == IngestJobStatus.RUNNING,
+            IngestJob.started_at < now - timedelta(minutes=settings.INGEST_JOB_TIMEOUT_MINUTES)
+        )
+        stale.filter(IngestJob.attempts >= settings.INGEST_MAX_ATTEMPTS).update({
+            IngestJob.status: IngestJobStatus.FAILED,
+            IngestJob.error: "Tiempo de procesamiento agotado",
+            IngestJob.finished_at: now
+        }, synchronize_session=False)
+        stale.update({IngestJob.status: IngestJobStatus.QUEUED}, synchronize_session=False)
+        db.commit()
+
+    def _process(self, db: Session, job: IngestJob) -> None:
+        try:
+            if job.kind == IngestJobKind.RESULTS:
+                with open(job.payload_path, "rb") as payload:
+                    data = RegisterPipelineResult.model_validate_json(payload.read())
+                pipeline, summary = ingest_pipeline_results(db, data)
+            else:
+                options = dict(job.options or {})
+                report_format = options.pop("format", None)
+                data = RegisterPipelineResult.model_validate(options)
+                with open(job.payload_path, "rb") as payload:
+                    report = open_report(payload)
+                    results = parse_report(report, report_format or detect_format(report))
+                    pipeline, summary = ingest_pipeline_report(
+                        db, data, results, settings.PIPELINE_REPORT_BATCH_SIZE
+                    )
+            job.result = serialize_ingested_pipeline(pipeline, summary)
+            job.status = IngestJobStatus.DONE
+            job.error = None
+        except Exception as exc:  # noqa: BLE001
+            db.rollback()
+            job.status = IngestJobStatus.FAILED
+            job.error = str(exc)[:MAX_ERROR_LENGTH] or exc.__class__.__name__
+            forget_job_receipts(db, job.id)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        
+        with self._lock:
+            self._processed += 1
+            if job.status == IngestJobStatus.FAILED:
+                self._failed += 1
+        if job.status == IngestJobStatus.DONE:
+            # Failed payloads are kept for inspection
+            try:
+                os.remove(job.payload_path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, object]:
+        """Worker metrics of this process since startup."""
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "maxDepth": self.max_depth,
+                "processed": self._processed,
+                "failed": self._failed,
+            }
+
+
+ingest_queue = IngestQueue(
+    spool_dir=settings.INGEST_SPOOL_DIR,
+    workers=settings.INGEST_WORKERS,
+    max_depth=settings.INGEST_QUEUE_MAX_DEPTH,
+    poll_seconds=settings.INGEST_POLL_SECONDS,
+)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import settings
+from app.services.auth_service import hash_password, verify_and_update_password
+
+
+class PasswordHasher:
+    """
+    Dedicated, bounded pool for bcrypt work.
+
+    bcrypt releases the GIL, so a small thread pool hashes in parallel
+    without occupying the request threadpool or the event loop. At most
+    `max_pending` calls may be queued or running; beyond that callers get
+    a 503 instead of piling up behind a login storm.
+    """
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servicio ocupado, intente nuevamente en unos segundos",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self._submitted += 1
+        enqueued_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                wait = started_at - enqueued_at
+                self._wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_seconds += time.perf_counter() - started_at
+
+        def release(_):
+            # On completion, not when the caller stops waiting: a cancelled
+            # request leaves bcrypt running and its slot taken until it ends
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+        try:
+            future = self._get_executor().submit(task)
+        except BaseException:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update_password, password, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, object]:
+        """Queueing metrics since startup."""
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "maxPending": self.max_pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avgWaitMs": round(self._wait_seconds / completed * 1000, 2),
+                "maxWaitMs": round(self._max_wait_seconds * 1000, 2),
+                "avgRunMs": round(self._run_seconds / completed * 1000, 2),
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1),
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,129 @@
+"""
+Comparison of two pipelines' results, computed in the database.
+
+Both result sets are read with one range scan of the (pipeline_id,
+test_case_id) index and pivoted per test case with GROUP BY, which gives
+the full outer join of the two pipelines without a join plan that some
+engines run as nested loops. Every changed scenario is tagged with its
+category; regressed durations are added with UNION ALL (a scenario can be
+both newly failing and slower). The categories are then ranked and
+counted with window functions, so one statement returns the totals and
+the first `limit` scenarios of each category, and only those rows reach
+Python.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import select, case, and_, func, literal, union_all
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import GitlabPipeline, PipelineStatus, TestCase, TestCasePipelineResult, TestCaseResultStatus
+
+NEWLY_FAILING = "newlyFailing"
+NEWLY_PASSING = "newlyPassing"
+NEW = "new"
+MISSING = "missing"
+DURATION_REGRESSED = "durationRegressed"
+CATEGORIES = (NEWLY_FAILING, NEWLY_PASSING, NEW, MISSING, DURATION_REGRESSED)
+
+
+def find_baseline(db: Session, pipeline: GitlabPipeline) -> Optional[GitlabPipeline]:
+    """Last passed pipeline of the same project and branch executed before `pipeline`."""
+    return db.query(GitlabPipeline).filter(
+        GitlabPipeline.gitlab_project_id == pipeline.gitlab_project_id,
+        GitlabPipeline.branch == pipeline.branch,
+        GitlabPipeline.status == PipelineStatus.PASSED,
+        GitlabPipeline.executed_at < pipeline.executed_at,
+        GitlabPipeline.id != pipeline.id
+    ).order_by(GitlabPipeline.executed_at.desc()).first()
+
+
+def _pivot(pipeline_id: str, against_id: str):
+    """Per test case: status and duration in each pipeline (NULL when it did not run)."""
+    result = TestCasePipelineResult
+    is_current = result.pipeline_id == pipeline_id
+    is_previous = result.pipeline_id == against_id
+    return select(
+        result.test_case_id,
+        func.max(case((is_current, result.status))).label("status"),
+        func.max(case((is_previous, result.status))).label("previous_status"),
+        func.max(case((is_current, result.duration))).label("duration"),
+        func.max(case((is_previous, result.duration))).label("previous_duration")
+    ).where(
+        result.pipeline_id.in_([pipeline_id, against_id])
+    ).group_by(result.test_case_id).cte("pairs")
+
+
+def diff_pipelines(db: Session, pipeline_id: str, against_id: str, limit: int) -> Dict[str, object]:
+    """
+    Scenarios that changed between `against_id` (before) and `pipeline_id`.
+
+    Returns {"summary": {category: total}, category: [entries]} with at
+    most `limit` entries per category.
+    """
+    joined = _pivot(pipeline_id, against_id)
+
+    status_category = case(
+        (joined.c.previous_status.is_(None), NEW),
+        (joined.c.status.is_(None), MISSING),
+        (and_(
+            joined.c.status == TestCaseResultStatus.FAILED,
+            joined.c.previous_status != TestCaseResultStatus.FAILED
+        ), NEWLY_FAILING),
+        (and_(
+            joined.c.status == TestCaseResultStatus.PASSED,
+            joined.c.previous_status == TestCaseResultStatus.FAILED
+        ), NEWLY_PASSING),
+    )
+    columns = (
+        joined.c.test_case_id, joined.c.status, joined.c.previous_status,
+        joined.c.duration, joined.c.previous_duration
+    )
+    status_changes = select(status_category.label("category"), *columns).where(status_category.isnot(None))
+    regressions = select(literal(DURATION_REGRESSED).label("category"), *columns).where(
+        joined.c.duration > joined.c.previous_duration * (1 + settings.DIFF_DURATION_REGRESSION_RATIO),
+        joined.c.duration - joined.c.previous_duration >= settings.DIFF_DURATION_REGRESSION_MIN_SECONDS
+    )
+    changes = union_all(status_changes, regressions).subquery("changes")
+
+    increase = changes.c.duration - changes.c.previous_duration
+    ranked = select(
+        changes,
+        func.row_number().over(
+            partition_by=changes.c.category,
+            # Largest slowdowns first; other categories have no increase to sort by
+            order_by=(case((changes.c.category == DURATION_REGRESSED, increase)).desc(), changes.c.test_case_id)
+        ).label("rank"),
+        func.count().over(partition_by=changes.c.category).label("total")
+    ).subquery("ranked")
+
+    stmt = select(
+        ranked.c.category, ranked.c.test_case_id, ranked.c.status, ranked.c.previous_status,
+        ranked.c.duration, ranked.c.previous_duration, ranked.c.total,
+        TestCase.name, TestCase.scenario_name, TestCase.feature_id
+    ).join(
+        TestCase, TestCase.id == ranked.c.test_case_id
+    ).where(ranked.c.rank <= limit).order_by(ranked.c.category, ranked.c.rank)
+
+    diff: Dict[str, object] = {"summary": {category: 0 for category in CATEGORIES}}
+    entries: Dict[str, List[dict]] = {category: [] for category in CATEGORIES}
+    for row in db.execute(stmt):
+        diff["summary"][row.category] = row.total
+        entries[row.category].append({
+            "testCase": {
+                "id": row.test_case_id,
+                "name": row.name,
+                "scenarioName": row.scenario_name,
+                "featureId": row.feature_id
+            },
+            "status": _value(row.status),
+            "previousStatus": _value(row.previous_status),
+            "duration": row.duration,
+            "previousDuration": row.previous_duration
+        })
+    diff.update(entries)
+    return diff
+
+
+def _value(status) -> Optional[str]:
+    if status is None:
+        return None
+    return status.value if hasattr(status, "value") else status
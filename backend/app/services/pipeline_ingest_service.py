@@ -0,0 +1,295 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app.models import Application, GitlabPipeline, TestCasePipelineResult, TestCase, PipelineStatus, TestCaseResultStatus
+from app.schemas.pipeline import RegisterPipelineResult, TestResultInput
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.normalization import normalize_scenario_name
+from app.services.rollup_service import RollupDeltas, apply_rollup_deltas, counted_scopes, test_case_scopes
+from app.services.duration_sketch_service import SketchDeltas, apply_sketch_deltas
+
+
+class IngestSummary:
+    """Counts of what an ingestion call did."""
+    def __init__(self):
+        self.received = 0
+        self.matched = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "matched": self.matched,
+            "unmatched": self.received - self.matched,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged
+        }
+
+
+def serialize_ingested_pipeline(pipeline: GitlabPipeline, summary: IngestSummary) -> dict:
+    """Response payload of the ingestion endpoints (also stored on ingest jobs)."""
+    return {
+        "id": pipeline.id,
+        "gitlabProjectId": pipeline.gitlab_project_id,
+        "gitlabPipelineId": pipeline.gitlab_pipeline_id,
+        "branch": pipeline.branch,
+        "status": pipeline.status.value,
+        "webUrl": pipeline.web_url,
+        "executedAt": pipeline.executed_at.isoformat(),
+        "results": summary.as_dict()
+    }
+
+
+def upsert_pipeline(db: Session, data: RegisterPipelineResult) -> Tuple[GitlabPipeline, bool]:
+    """
+    Find the pipeline by its GitLab IDs and update it, or create it.
+
+    Returns the pipeline (flushed, not committed) and whether it is new.
+    """
+    pipeline = db.query(GitlabPipeline).filter(
+        GitlabPipeline.gitlab_project_id == data.gitlab_project_id,
+        GitlabPipeline.gitlab_pipeline_id == data.gitlab_pipeline_id
+    ).first()
+    created = pipeline is None
+    
+    if not created:
+        pipeline.status = data.pipeline_status or PipelineStatus.PASSED
+        pipeline.branch = data.branch or "main"
+        if data.web_url:
+            pipeline.web_url = data.web_url
+    else:
+        pipeline = GitlabPipeline(
+            gitlab_project_id=data.gitlab_project_id,
+            gitlab_pipeline_id=data.gitlab_pipeline_id,
+            branch=data.branch or "main",
+            status=data.pipeline_status or PipelineStatus.PASSED,
+            web_url=data.web_url,
+            executed_at=data.executed_at or datetime.utcnow()
+        )
+        db.add(pipeline)
+    db.flush()
+    return pipeline, created
+
+
+def resolve_test_cases(db: Session, gitlab_project_id: str, results: List[TestResultInput]) -> List[Optional[str]]:
+    """
+    Map each reported result to a test case ID (None when unmatched).
+
+    Results name their test case either by ID or by scenario name. Names
+    are matched on the indexed TestCase.scenario_key, within the
+    applications linked to the GitLab project (or across all applications
+    when none is linked). Both kinds are resolved with one IN query each,
+    chunked to stay under the driver's parameter limit.
+    """
+    ids = {r.test_case_id for r in results if r.test_case_id}
+    keys = {normalize_scenario_name(r.scenario_name) for r in results if not r.test_case_id}
+    keys.discard(None)
+    
+    known_ids = set()
+    for batch in chunked(ids, MAX_IN_PARAMS):
+        known_ids.update(
+            row[0] for row in db.query(TestCase.id).filter(TestCase.id.in_(batch))
+        )
+    
+    by_key: Dict[str, str] = {}
+    if keys:
+        application_ids = [
+            row[0] for row in db.query(Application.id).filter(Application.gitlab_project_id == gitlab_project_id)
+        ]
+        for batch in chunked(keys, MAX_IN_PARAMS):
+            query = db.query(TestCase.scenario_key, TestCase.id).filter(TestCase.scenario_key.in_(batch))
+            if application_ids:
+                query = query.filter(TestCase.application_id.in_(application_ids))
+            for key, test_case_id in query.order_by(TestCase.created_at):
+                by_key.setdefault(key, test_case_id)
+    
+    resolved = []
+    for r in results:
+        if r.test_case_id:
+            resolved.append(r.test_case_id if r.test_case_id in known_ids else None)
+        else:
+            resolved.append(by_key.get(normalize_scenario_name(r.scenario_name)))
+    return resolved
+
+
+def write_results(
+    db: Session,
+    pipeline_id: str,
+    results: Iterable[Tuple[str, TestResultInput]],
+    summary: IngestSummary,
+    pipeline_is_new: bool = False
+) -> None:
+    """
+    Insert or update the results of one pipeline with set-based statements.
+
+    `results` pairs resolved test case IDs with their reported result;
+    when a test case is reported twice the last report wins. Existing rows
+    are fetched with one query and written with one executemany each for
+    inserts and updates; rows whose reported values match what is stored
+    are not written at all. The hourly and daily rollups are adjusted in
+    the same transaction, and so are the duration sketches.
+    """
+    latest: Dict[str, TestResultInput] = {}
+    for test_case_id, result in results:
+        latest[test_case_id] = result
+    if not latest:
+        return
+    
+    existing: Dict[str, tuple] = {}
+    if not pipeline_is_new:
+        for batch in chunked(latest.keys(), MAX_IN_PARAMS):
+            rows = db.query(
+                TestCasePipelineResult.test_case_id,
+                TestCasePipelineResult.id,
+                TestCasePipelineResult.status,
+                TestCasePipelineResult.details,
+                TestCasePipelineResult.log_url,
+                TestCasePipelineResult.duration,
+                TestCasePipelineResult.created_at
+            ).filter(
+                TestCasePipelineResult.pipeline_id == pipeline_id,
+                TestCasePipelineResult.test_case_id.in_(batch)
+            )
+            existing.update({row[0]: row[1:] for row in rows})
+    
+    now = datetime.utcnow()
+    inserts = []
+    updates = []
+    # (test_case_id, created_at, old status, old duration, new status, new duration)
+    rollup_changes = []
+    for test_case_id, result in latest.items():
+        status = result.status or TestCaseResultStatus.NOT_EXECUTED
+        current = existing.get(test_case_id)
+        if current:
+            result_id, current_status, current_details, current_log_url, current_duration, created_at = current
+            # Optional fields are only overwritten when reported
+            values = {"id": result_id, "status": status}
+            if result.details:
+                values["details"] = result.details
+            if result.log_url:
+                values["log_url"] = result.log_url
+            if result.duration:
+                values["duration"] = result.duration
+            if (
+                status == current_status
+                and values.get("details", current_details) == current_details
+                and values.get("log_url", current_log_url) == current_log_url
+                and values.get("duration", current_duration) == current_duration
+            ):
+                summary.unchanged += 1
+                continue
+            updates.append(values)
+            new_duration = values.get("duration", current_duration)
+            if status != current_status or new_duration != current_duration:
+                rollup_changes.append(
+                    (test_case_id, created_at, current_status, current_duration, status, new_duration)
+                )
+        else:
+            inserts.append({
+                "test_case_id": test_case_id,
+                "pipeline_id": pipeline_id,
+                "status": status,
+                "details": result.details,
+                "log_url": result.log_url,
+                "duration": result.duration,
+                "created_at": now
+            })
+            rollup_changes.append((test_case_id, now, None, None, status, result.duration))
+    
+    if inserts:
+        db.execute(insert(TestCasePipelineResult), inserts)
+    # Group updates by the set of columns they touch so each group is one executemany
+    by_columns: Dict[tuple, list] = {}
+    for values in updates:
+        by_columns.setdefault(tuple(sorted(values)), []).append(values)
+    for rows in by_columns.values():
+        db.execute(update(TestCasePipelineResult), rows)
+    
+    if rollup_changes:
+        scopes = test_case_scopes(db, [change[0] for change in rollup_changes])
+        # Replaced results are retracted where they were counted, the test
+        # case may have moved since
+        old_scopes = counted_scopes(db, [
+            (test_case_id, created_at, old_status)
+            for test_case_id, created_at, old_status, _, _, _ in rollup_changes if old_status is not None
+        ], scopes)
+        deltas = RollupDeltas()
+        sketches = SketchDeltas()
+        for test_case_id, created_at, old_status, old_duration, new_status, new_duration in rollup_changes:
+            application_id, feature_id = scopes[test_case_id]
+            if old_status is not None:
+                old_application_id, old_feature_id = old_scopes[(test_case_id, created_at, old_status)]
+                deltas.add(created_at, old_application_id, old_feature_id, test_case_id, old_status, old_duration, sign=-1)
+                if new_duration != old_duration:
+                    sketches.add(old_application_id, old_feature_id, test_case_id, old_duration, sign=-1)
+            deltas.add(created_at, application_id, feature_id, test_case_id, new_status, new_duration)
+            if new_duration != old_duration:
+                sketches.add(application_id, feature_id, test_case_id, new_duration)
+        apply_rollup_deltas(db, deltas)
+        apply_sketch_deltas(db, sketches)
+    
+    summary.created += len(inserts)
+    summary.updated += len(updates)
+
+
+def _ingest_batch(
+    db: Session,
+    gitlab_project_id: str,
+    pipeline_id: str,
+    results: List[TestResultInput],
+    summary: IngestSummary,
+    pipeline_is_new: bool
+) -> None:
+    resolved = resolve_test_cases(db, gitlab_project_id, results)
+    matched = [(tc_id, result) for tc_id, result in zip(resolved, results) if tc_id]
+    summary.received += len(results)
+    summary.matched += len(matched)
+    write_results(db, pipeline_id, matched, summary, pipeline_is_new=pipeline_is_new)
+
+
+def ingest_pipeline_results(db: Session, data: RegisterPipelineResult) -> Tuple[GitlabPipeline, IngestSummary]:
+    """Register a pipeline and its test results in one transaction (committed here)."""
+    summary = IngestSummary()
+    pipeline, created = upsert_pipeline(db, data)
+    
+    if data.test_results:
+        _ingest_batch(db, data.gitlab_project_id, pipeline.id, data.test_results, summary, pipeline_is_new=created)
+    
+    db.commit()
+    db.refresh(pipeline)
+    return pipeline, summary
+
+
+def ingest_pipeline_report(
+    db: Session,
+    data: RegisterPipelineResult,
+    results: Iterable[TestResultInput],
+    batch_size: int
+) -> Tuple[GitlabPipeline, IngestSummary]:
+    """
+    Register a pipeline from a stream of results (e.g. a parsed report).
+
+    Results are consumed and written `batch_size` at a time, each batch in
+    its own transaction, so memory and lock time do not grow with the
+    report. Without an explicit pipeline status, the pipeline is FAILED
+    if any result failed and PASSED otherwise.
+    """
+    summary = IngestSummary()
+    pipeline, created = upsert_pipeline(db, data)
+    
+    any_failed = False
+    for batch in chunked(results, batch_size):
+        any_failed = any_failed or any(r.status == TestCaseResultStatus.FAILED for r in batch)
+        _ingest_batch(db, data.gitlab_project_id, pipeline.id, batch, summary, pipeline_is_new=created)
+        db.commit()
+        created = False
+    
+    if data.pipeline_status is None:
+        pipeline.status = PipelineStatus.FAILED if any_failed else PipelineStatus.PASSED
+    db.commit()
+    db.refresh(pipeline)
+    return pipeline, summary
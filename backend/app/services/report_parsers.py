@@ -0,0 +1,292 @@
+"""
+Incremental parsers for CI test reports.
+
+Both parsers read from a binary file object (optionally gzip-compressed)
+and yield one TestResultInput per scenario, keeping at most one Cucumber
+feature or one JUnit <testcase> in memory at a time.
+"""
+import codecs
+import gzip
+import io
+import json
+import re
+from typing import BinaryIO, Iterator, Optional
+from xml.etree.ElementTree import ParseError, TreeBuilder, XMLParser
+
+from app.config import settings
+from app.models import TestCaseResultStatus
+from app.schemas.pipeline import TestResultInput
+
+REPORT_FORMAT_CUCUMBER = "cucumber"
+REPORT_FORMAT_JUNIT = "junit"
+REPORT_FORMATS = (REPORT_FORMAT_CUCUMBER, REPORT_FORMAT_JUNIT)
+
+GZIP_MAGIC = b"\x1f\x8b"
+READ_SIZE = 64 * 1024
+# Failure messages are stored as result details; stack traces can be huge
+MAX_DETAILS_LENGTH = 4000
+
+# Worst status wins when a scenario has several outcomes (outline examples)
+_STATUS_RANK = {
+    TestCaseResultStatus.NOT_EXECUTED: 0,
+    TestCaseResultStatus.PASSED: 1,
+    TestCaseResultStatus.SKIPPED: 2,
+    TestCaseResultStatus.FAILED: 3,
+}
+
+
+class ReportParseError(ValueError):
+    """The report is malformed or in an unknown format."""
+
+
+def open_report(raw: BinaryIO) -> BinaryIO:
+    """Return a binary stream over the report, transparently un-gzipped."""
+    head = raw.read(2)
+    raw.seek(0)
+    if head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    return raw
+
+
+def detect_format(stream: BinaryIO) -> str:
+    """Guess the format from the first non-blank character: '[' JSON, '<' XML."""
+    head = stream.read(READ_SIZE)
+    stream.seek(0)
+    head = head.removeprefix(codecs.BOM_UTF8).lstrip(b" \t\r\n")
+    if head.startswith(b"["):
+        return REPORT_FORMAT_CUCUMBER
+    if head.startswith(b"<"):
+        return REPORT_FORMAT_JUNIT
+    raise ReportParseError("Formato de reporte no reconocido")
+
+
+def parse_report(stream: BinaryIO, report_format: str) -> Iterator[TestResultInput]:
+    if report_format == REPORT_FORMAT_CUCUMBER:
+        return parse_cucumber_json(stream)
+    if report_format == REPORT_FORMAT_JUNIT:
+        return parse_junit_xml(stream)
+    raise ReportParseError("Formato de reporte no reconocido")
+
+
+# ---------------------------------------------------------------- Cucumber
+
+# Ends of a buffer cut inside a literal or a number exponent; raw_decode
+# reports these before the end of the buffer
+_PARTIAL_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+_PARTIAL_EXPONENT = re.compile(r"[eE][-+]?")
+
+
+def _is_truncated(buffer: str, exc: json.JSONDecodeError) -> bool:
+    """Whether raw_decode failed only because the buffer ends inside the item."""
+    if exc.pos >= len(buffer) - 1 or exc.msg.startswith("Unterminated string"):
+        return True
+    tail = buffer[exc.pos:]
+    if exc.msg.startswith("Invalid \\uXXXX escape"):
+        # Up to a surrogate pair cut short
+        return len(tail) <= 12
+    return bool(_PARTIAL_EXPONENT.fullmatch(tail)) or any(literal.startswith(tail) for literal in _PARTIAL_LITERALS)
+
+
+def _iter_json_array(stream: BinaryIO) -> Iterator[object]:
+    """
+    Yield the items of a top-level JSON array one at a time.
+
+    Items are decoded with raw_decode as soon as they are complete in the
+    buffer. After a failed attempt the next read is at least the size of
+    the pending buffer, so large items are decoded in amortized linear time.
+    Errors that are not caused by the end of the buffer are raised at once,
+    and an item may not grow past PIPELINE_REPORT_MAX_ITEM_MB.
+    """
+    decoder = json.JSONDecoder()
+    max_item = settings.PIPELINE_REPORT_MAX_ITEM_MB * 1024 * 1024
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    buffer = ""
+    pos = 0
+    eof = False
+    
+    def fill(min_size: int) -> bool:
+        nonlocal buffer, pos
+        chunk = text.read(max(READ_SIZE, min_size))
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return bool(chunk)
+    
+    def skip_blank():
+        nonlocal pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            eof = not fill(0)
+    
+    skip_blank()
+    if buffer[pos:pos + 1] != "[":
+        raise ReportParseError("Se esperaba un arreglo JSON de features")
+    pos += 1
+    
+    expect_item = True
+    while True:
+        skip_blank()
+        if pos >= len(buffer):
+            raise ReportParseError("JSON incompleto")
+        if buffer[pos] == "]":
+            return
+        if not expect_item:
+            if buffer[pos] != ",":
+                raise ReportParseError("JSON inválido")
+            pos += 1
+            expect_item = True
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as exc:
+            if eof or not _is_truncated(buffer, exc):
+                raise ReportParseError(f"JSON inválido: {exc.msg}") from exc
+            if len(buffer) - pos > max_item:
+                raise ReportParseError(
+                    f"Una feature del reporte supera {settings.PIPELINE_REPORT_MAX_ITEM_MB} MB"
+                ) from exc
+            eof = not fill(len(buffer) - pos)
+            continue
+        pos = end
+        expect_item = False
+        yield item
+
+
+def _cucumber_result(element: dict) -> TestResultInput:
+    status = TestCaseResultStatus.PASSED
+    duration_ns = 0
+    details = None
+    executed = False
+    for step in (element.get("before") or []) + (element.get("steps") or []) + (element.get("after") or []):
+        result = step.get("result") or {}
+        step_status = result.get("status")
+        duration_ns += result.get("duration") or 0
+        if step_status is None:
+            continue
+        executed = True
+        if step_status == "failed":
+            status = TestCaseResultStatus.FAILED
+            if details is None and result.get("error_message"):
+                details = result["error_message"][:MAX_DETAILS_LENGTH]
+        elif step_status != "passed" and status != TestCaseResultStatus.FAILED:
+            # skipped, pending, undefined, ambiguous
+            status = TestCaseResultStatus.SKIPPED
+    return TestResultInput(
+        scenario_name=element.get("name"),
+        status=status if executed else TestCaseResultStatus.NOT_EXECUTED,
+        details=details,
+        duration=round(duration_ns / 1e9)
+    )
+
+
+def _merge(first: TestResultInput, second: TestResultInput) -> TestResultInput:
+    worst = first if _STATUS_RANK[first.status] >= _STATUS_RANK[second.status] else second
+    return TestResultInput(
+        scenario_name=first.scenario_name,
+        status=worst.status,
+        details=worst.details or first.details or second.details,
+        duration=(first.duration or 0) + (second.duration or 0)
+    )
+
+
+def parse_cucumber_json(stream: BinaryIO) -> Iterator[TestResultInput]:
+    """
+    Yield one result per scenario of a Cucumber JSON report.
+
+    Consecutive elements with the same name (the examples of a scenario
+    outline) are folded into one result with the worst status and the
+    summed duration.
+    """
+    for feature in _iter_json_array(stream):
+        if not isinstance(feature, dict):
+            raise ReportParseError("Feature inválida en el reporte")
+        pending: Optional[TestResultInput] = None
+        for element in feature.get("elements") or []:
+            if element.get("type", "scenario") == "background" or not element.get("name"):
+                continue
+            result = _cucumber_result(element)
+            if pending is not None and pending.scenario_name == result.scenario_name:
+                pending = _merge(pending, result)
+                continue
+            if pending is not None:
+                yield pending
+            pending = result
+        if pending is not None:
+            yield pending
+
+
+# ------------------------------------------------------------------- JUnit
+
+def _junit_result(testcase) -> TestResultInput:
+    status = TestCaseResultStatus.PASSED
+    details = None
+    for child in testcase:
+        if child.tag in ("failure", "error"):
+            status = TestCaseResultStatus.FAILED
+            details = (child.get("message") or child.text or "").strip()[:MAX_DETAILS_LENGTH] or None
+            break
+        if child.tag == "skipped":
+            status = TestCaseResultStatus.SKIPPED
+    try:
+        duration = round(float(testcase.get("time") or 0))
+    except ValueError:
+        duration = None
+    return TestResultInput(
+        scenario_name=testcase.get("name"),
+        status=status,
+        details=details,
+        duration=duration
+    )
+
+
+class _JUnitTreeBuilder(TreeBuilder):
+    """
+    Builds only the open elements: finished <testcase>s are detached and
+    queued, so the tree never grows. Reports come from CI jobs and are not
+    trusted: a DOCTYPE (the only place entities can be declared, e.g.
+    billion laughs or external entities) aborts the parse.
+    """
+    def __init__(self):
+        super().__init__()
+        self.testcases = []
+        self._open = []
+
+    def start(self, tag, attrs):
+        elem = super().start(tag, attrs)
+        self._open.append(elem)
+        return elem
+
+    def end(self, tag):
+        elem = super().end(tag)
+        self._open.pop()
+        if elem.tag == "testcase":
+            if elem.get("name"):
+                self.testcases.append(elem)
+            if self._open:
+                self._open[-1].remove(elem)
+        return elem
+
+    def doctype(self, name, pubid, system):
+        raise ReportParseError("XML inválido: no se admiten DOCTYPE ni declaraciones de entidades")
+
+
+def parse_junit_xml(stream: BinaryIO) -> Iterator[TestResultInput]:
+    """Yield one result per <testcase> of a JUnit XML report."""
+    builder = _JUnitTreeBuilder()
+    parser = XMLParser(target=builder)
+    try:
+        while True:
+            chunk = stream.read(READ_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            for testcase in builder.testcases:
+                yield _junit_result(testcase)
+            builder.testcases.clear()
+        parser.close()
+    except ParseError as exc:
+        raise ReportParseError(f"XML inválido: {exc}") from exc
+    for testcase in builder.testcases:
+        yield _junit_result(testcase)
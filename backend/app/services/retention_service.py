@@ -0,0 +1,196 @@
+"""
+Retention for raw pipeline history.
+
+Pipelines older than the retention period of their project are archived
+with their results to gzip-compressed NDJSON and then deleted in small
+batches, each in its own short transaction, so readers and ingestion
+are never blocked for long. Rollups are kept forever.
+
+The newest purged result of each project is recorded in
+result_purge_states, in the same transaction as its deletion, so the
+rollup and sketch backfills never rebuild from incomplete raw history.
+"""
+import gzip
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import GitlabPipeline, TestCasePipelineResult, IngestReceipt, ResultPurgeState
+from app.utils.batching import chunked
+
+PIPELINE_COLUMNS = ("id", "gitlab_project_id", "gitlab_pipeline_id", "branch", "status", "web_url", "executed_at", "created_at")
+RESULT_COLUMNS = ("id", "test_case_id", "pipeline_id", "status", "details", "log_url", "duration", "created_at")
+
+
+class PurgedHistoryError(ValueError):
+    """A rebuild would need raw results that retention already purged."""
+
+
+def retention_days(gitlab_project_id: str) -> int:
+    """Days of raw history kept for a project (0 = keep forever)."""
+    return settings.RESULT_RETENTION_PROJECT_DAYS.get(gitlab_project_id, settings.RESULT_RETENTION_DAYS)
+
+
+def purged_through(db: Session) -> Optional[datetime]:
+    """created_at of the newest result purged in any project (None if nothing was purged)."""
+    return db.query(func.max(ResultPurgeState.newest_result_at)).scalar()
+
+
+def _record_purge(db: Session, gitlab_project_id: str, results: List[TestCasePipelineResult]) -> None:
+    newest = max(result.created_at for result in results)
+    state = db.get(ResultPurgeState, gitlab_project_id)
+    if state is None:
+        state = ResultPurgeState(gitlab_project_id=gitlab_project_id, newest_result_at=newest, results=0)
+        db.add(state)
+    elif newest > state.newest_result_at:
+        state.newest_result_at = newest
+    state.results += len(results)
+    state.updated_at = datetime.utcnow()
+
+
+def _row(obj, columns, record_type: str) -> dict:
+    row = {"type": record_type}
+    for column in columns:
+        value = getattr(obj, column)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif hasattr(value, "value"):
+            value = value.value
+        row[column] = value
+    return row
+
+
+def _slug(project: str) -> str:
+    """Directory name for a project's archives; never leaves RESULT_ARCHIVE_DIR."""
+    return re.sub(r"[^\w.-]+", "_", project).strip("._") or "project"
+
+
+class _ArchiveWriter:
+    """Appends NDJSON records to one gzip file and makes them durable on demand."""
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._raw = open(path, "ab")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="ab")
+
+    def write(self, record: dict) -> None:
+        self._gzip.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def sync(self) -> None:
+        # Records must be on disk before the rows they describe are deleted
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def close(self) -> None:
+        self._gzip.close()
+        self._raw.close()
+
+
+def _purge_pipelines(db: Session, pipelines: List[GitlabPipeline], archive: Optional[_ArchiveWriter], stats: Dict[str, int]) -> None:
+    pipeline_ids = [p.id for p in pipelines]
+    # Captured now: commits below expire the loaded instances
+    pipeline_rows = [_row(p, PIPELINE_COLUMNS, "pipeline") for p in pipelines]
+    batch_size = settings.RETENTION_DELETE_BATCH_SIZE
+    
+    result_ids = [
+        row[0] for row in db.query(TestCasePipelineResult.id).filter(
+            TestCasePipelineResult.pipeline_id.in_(pipeline_ids)
+        )
+    ]
+    for batch in chunked(result_ids, batch_size):
+        results = db.query(TestCasePipelineResult).filter(TestCasePipelineResult.id.in_(batch)).all()
+        if archive:
+            for result in results:
+                archive.write(_row(result, RESULT_COLUMNS, "result"))
+            archive.sync()
+        _record_purge(db, pipeline_rows[0]["gitlab_project_id"], results)
+        db.query(TestCasePipelineResult).filter(
+            TestCasePipelineResult.id.in_(batch)
+        ).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+        stats["results"] += len(batch)
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+    
+    if archive:
+        for row in pipeline_rows:
+            archive.write(row)
+        archive.sync()
+    for row in pipeline_rows:
+        db.query(IngestReceipt).filter(
+            IngestReceipt.gitlab_project_id == row["gitlab_project_id"],
+            IngestReceipt.gitlab_pipeline_id == row["gitlab_pipeline_id"]
+        ).delete(synchronize_session=False)
+    db.query(GitlabPipeline).filter(GitlabPipeline.id.in_(pipeline_ids)).delete(synchronize_session=False)
+    db.commit()
+    db.expunge_all()
+    stats["pipelines"] += len(pipeline_ids)
+
+
+def purge_expired_results(
+    db: Session,
+    gitlab_project_id: Optional[str] = None,
+    dry_run: bool = False,
+    archive: bool = True,
+    now: Optional[datetime] = None
+) -> Dict[str, Dict[str, object]]:
+    """
+    Archive and delete pipelines past their project's retention period.
+
+    Returns per-project stats. With `dry_run`, only counts what would be
+    purged. Archives go to RESULT_ARCHIVE_DIR/<project>/pipelines-<timestamp>.ndjson.gz.
+    """
+    now = now or datetime.utcnow()
+    if gitlab_project_id:
+        projects = [gitlab_project_id]
+    else:
+        projects = [row[0] for row in db.query(GitlabPipeline.gitlab_project_id).distinct()]
+    
+    report = {}
+    for project in projects:
+        days = retention_days(project)
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        expired = db.query(GitlabPipeline.id).filter(
+            GitlabPipeline.gitlab_project_id == project,
+            GitlabPipeline.executed_at < cutoff
+        ).order_by(GitlabPipeline.executed_at)
+        
+        stats = {"cutoff": cutoff.isoformat(), "pipelines": 0, "results": 0, "archive": None}
+        if dry_run:
+            pipeline_ids = [row[0] for row in expired]
+            stats["pipelines"] = len(pipeline_ids)
+            for batch in chunked(pipeline_ids, 1000):
+                stats["results"] += db.query(TestCasePipelineResult).filter(
+                    TestCasePipelineResult.pipeline_id.in_(batch)
+                ).count()
+            report[project] = stats
+            continue
+        
+        writer = None
+        if archive:
+            path = os.path.join(
+                settings.RESULT_ARCHIVE_DIR, _slug(project), f"pipelines-{now.strftime('%Y%m%d%H%M%S')}.ndjson.gz"
+            )
+            writer = _ArchiveWriter(path)
+            stats["archive"] = path
+        try:
+            while True:
+                # Re-query each round: purged pipelines no longer match
+                pipeline_ids = [row[0] for row in expired.limit(settings.RETENTION_PIPELINES_PER_BATCH)]
+                if not pipeline_ids:
+                    break
+                pipelines = db.query(GitlabPipeline).filter(GitlabPipeline.id.in_(pipeline_ids)).all()
+                _purge_pipelines(db, pipelines, writer, stats)
+        finally:
+            if writer:
+                writer.close()
+        report[project] = stats
+    return report
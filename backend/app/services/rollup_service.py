@@ -0,0 +1,321 @@
+"""
+Hourly and daily rollups of pipeline results.
+
+The ingestion path records every inserted or changed result as a delta
+(+1 for the new status, -1 for the replaced one) and applies them with
+relative UPDATEs, so concurrent ingestions never overwrite each other's
+counts. A replaced result is retracted from the scope it was counted
+under, which is not the test case's current one after a move. Rollups
+are never purged with raw results; `backfill_rollups` only rebuilds days
+whose raw rows were never purged.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import (
+    TestCase, TestCasePipelineResult, TestCaseResultStatus,
+    TestResultHourlyRollup, TestResultDailyRollup
+)
+from app.services.retention_service import PurgedHistoryError, purged_through
+from app.utils.batching import chunked, MAX_IN_PARAMS
+
+ROLLUP_MODELS = (TestResultHourlyRollup, TestResultDailyRollup)
+# Bucket values per lookup statement; the rest of the IN budget goes to test case IDs
+_BUCKETS_PER_LOOKUP = 200
+
+RollupKey = Tuple[datetime, str, str, str, TestCaseResultStatus]
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupDeltas:
+    """Pending changes to the rollup tables, keyed like their primary keys."""
+    def __init__(self):
+        # key -> [count, duration_sum, duration_count], per model
+        self.changes: Dict[type, Dict[RollupKey, List[int]]] = {
+            model: defaultdict(lambda: [0, 0, 0]) for model in ROLLUP_MODELS
+        }
+
+    def add(
+        self,
+        created_at: datetime,
+        application_id: Optional[str],
+        feature_id: str,
+        test_case_id: str,
+        status: TestCaseResultStatus,
+        duration: Optional[int],
+        sign: int = 1
+    ) -> None:
+        for model, bucket in ((TestResultHourlyRollup, hour_bucket), (TestResultDailyRollup, day_bucket)):
+            change = self.changes[model][(bucket(created_at), application_id or "", feature_id, test_case_id, status)]
+            change[0] += sign
+            if duration is not None:
+                change[1] += sign * duration
+                change[2] += sign
+
+    def __bool__(self) -> bool:
+        return any(self.changes[model] for model in ROLLUP_MODELS)
+
+
+def test_case_scopes(db: Session, test_case_ids: Iterable[str]) -> Dict[str, Tuple[Optional[str], str]]:
+    """Map test case IDs to their (application_id, feature_id)."""
+    scopes = {}
+    for batch in chunked(set(test_case_ids), MAX_IN_PARAMS):
+        rows = db.query(TestCase.id, TestCase.application_id, TestCase.feature_id).filter(TestCase.id.in_(batch))
+        scopes.update({tc_id: (application_id, feature_id) for tc_id, application_id, feature_id in rows})
+    return scopes
+
+
+def counted_scopes(
+    db: Session,
+    results: Iterable[Tuple[str, datetime, TestCaseResultStatus]],
+    current: Dict[str, Tuple[Optional[str], str]]
+) -> Dict[Tuple[str, datetime, TestCaseResultStatus], Tuple[Optional[str], str]]:
+    """
+    Map stored results, as (test_case_id, created_at, status), to the
+    (application_id, feature_id) they were counted under.
+
+    The scope is read from the hourly rollups, since the test case may have
+    moved to another feature or application after the result was counted.
+    Results without a rollup row keep the test case's `current` scope.
+    """
+    results = list(results)
+    found: Dict[tuple, set] = defaultdict(set)
+    buckets = {hour_bucket(created_at) for _, created_at, _ in results}
+    test_case_ids = {test_case_id for test_case_id, _, _ in results}
+    model = TestResultHourlyRollup
+    for bucket_batch in chunked(buckets, _BUCKETS_PER_LOOKUP):
+        for id_batch in chunked(test_case_ids, MAX_IN_PARAMS - _BUCKETS_PER_LOOKUP):
+            rows = db.query(
+                model.bucket_start, model.test_case_id, model.status, model.application_id, model.feature_id
+            ).filter(model.bucket_start.in_(bucket_batch), model.test_case_id.in_(id_batch), model.count > 0)
+            for bucket, test_case_id, status, application_id, feature_id in rows:
+                found[(bucket, test_case_id, status)].add((application_id or None, feature_id))
+
+    scopes = {}
+    for test_case_id, created_at, status in results:
+        scope = current[test_case_id]
+        candidates = found.get((hour_bucket(created_at), test_case_id, status))
+        if candidates and scope not in candidates:
+            scope = min(candidates, key=lambda candidate: (candidate[0] or "", candidate[1]))
+        scopes[(test_case_id, created_at, status)] = scope
+    return scopes
+
+
+def _apply_model(db: Session, model, changes: Dict[RollupKey, List[int]]) -> None:
+    changes = {key: change for key, change in changes.items() if any(change)}
+    buckets = {key[0] for key in changes}
+    test_case_ids = {key[3] for key in changes}
+    existing = set()
+    for bucket_batch in chunked(buckets, _BUCKETS_PER_LOOKUP):
+        for id_batch in chunked(test_case_ids, MAX_IN_PARAMS - _BUCKETS_PER_LOOKUP):
+            rows = db.query(
+                model.bucket_start, model.application_id, model.feature_id, model.test_case_id, model.status
+            ).filter(model.bucket_start.in_(bucket_batch), model.test_case_id.in_(id_batch))
+            existing.update(key for key in map(tuple, rows) if key in changes)
+    
+    increments = []
+    inserts = []
+    for key, (count, duration_sum, duration_count) in changes.items():
+        bucket, application_id, feature_id, test_case_id, status = key
+        values = {
+            "k_bucket": bucket, "k_application": application_id, "k_feature": feature_id,
+            "k_test_case": test_case_id, "k_status": status,
+            "d_count": count, "d_duration_sum": duration_sum, "d_duration_count": duration_count
+        }
+        if key in existing:
+            increments.append(values)
+        else:
+            inserts.append({
+                "bucket_start": bucket, "application_id": application_id, "feature_id": feature_id,
+                "test_case_id": test_case_id, "status": status, "count": count,
+                "duration_sum": duration_sum, "duration_count": duration_count
+            })
+    
+    if increments:
+        table = model.__table__
+        db.execute(
+            update(table).where(
+                table.c.bucket_start == bindparam("k_bucket"),
+                table.c.application_id == bindparam("k_application"),
+                table.c.feature_id == bindparam("k_feature"),
+                table.c.test_case_id == bindparam("k_test_case"),
+                table.c.status == bindparam("k_status")
+            ).values(
+                count=table.c.count + bindparam("d_count"),
+                duration_sum=table.c.duration_sum + bindparam("d_duration_sum"),
+                duration_count=table.c.duration_count + bindparam("d_duration_count")
+            ),
+            increments
+        )
+    if inserts:
+        db.execute(insert(model.__table__), inserts)
+
+
+def apply_rollup_deltas(db: Session, deltas: RollupDeltas) -> None:
+    """
+    Apply pending deltas in the caller's transaction (not committed).
+
+    New bucket rows are inserted inside a savepoint; if a concurrent
+    ingestion inserted the same row first, the savepoint is rolled back
+    and the deltas are applied again as increments.
+    """
+    for model in ROLLUP_MODELS:
+        changes = deltas.changes[model]
+        if not changes:
+            continue
+        for attempt in range(3):
+            savepoint = db.begin_nested()
+            try:
+                _apply_model(db, model, changes)
+                savepoint.commit()
+                break
+            except IntegrityError:
+                savepoint.rollback()
+                if attempt == 2:
+                    raise
+
+
+def rebuildable_since(db: Session) -> Optional[datetime]:
+    """First day whose raw results were never purged (None if retention never ran)."""
+    newest_purged = purged_through(db)
+    if newest_purged is None:
+        return None
+    return day_bucket(newest_purged) + timedelta(days=1)
+
+
+def backfill_rollups(db: Session, since: Optional[datetime] = None, batch_size: int = 5000) -> int:
+    """
+    Rebuild the rollups from raw results created on or after `since`.
+
+    `since` is aligned to the start of its day. Without it, the oldest raw
+    result still stored is used, or the day after the newest purged result
+    if that is later. Retention purges whole pipelines, so a day with any
+    purged result can never be rebuilt: an earlier `since` raises
+    PurgedHistoryError. Commits per batch; returns how many raw results
+    were read.
+    """
+    floor = rebuildable_since(db)
+    if since is None:
+        oldest = db.query(TestCasePipelineResult.created_at).order_by(TestCasePipelineResult.created_at).first()
+        if oldest is None:
+            return 0
+        since = max(day_bucket(oldest[0]), floor) if floor else oldest[0]
+    since = day_bucket(since)
+    if floor and since < floor:
+        raise PurgedHistoryError(
+            f"Los rollups anteriores al {floor.date()} no se pueden reconstruir: "
+            "la retención ya purgó resultados de esos días"
+        )
+    
+    for model in ROLLUP_MODELS:
+        db.query(model).filter(model.bucket_start >= since).delete(synchronize_session=False)
+    db.commit()
+    
+    total = 0
+    last: Optional[Tuple[datetime, str]] = None
+    while True:
+        query = db.query(
+            TestCasePipelineResult.created_at, TestCasePipelineResult.id,
+            TestCasePipelineResult.test_case_id, TestCasePipelineResult.status,
+            TestCasePipelineResult.duration, TestCase.application_id, TestCase.feature_id
+        ).join(TestCase, TestCase.id == TestCasePipelineResult.test_case_id).filter(
+            TestCasePipelineResult.created_at >= since
+        )
+        if last is not None:
+            # Keyset pagination on (created_at, id)
+            query = query.filter(or_(
+                TestCasePipelineResult.created_at > last[0],
+                and_(TestCasePipelineResult.created_at == last[0], TestCasePipelineResult.id > last[1])
+            ))
+        rows = query.order_by(TestCasePipelineResult.created_at, TestCasePipelineResult.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        deltas = RollupDeltas()
+        for created_at, _, test_case_id, status, duration, application_id, feature_id in rows:
+            deltas.add(created_at, application_id, feature_id, test_case_id, status, duration)
+        apply_rollup_deltas(db, deltas)
+        db.commit()
+        
+        total += len(rows)
+        last = (rows[-1][0], rows[-1][1])
+    return total
+
+
+def rollup_status_counts(db: Session, start: datetime, **filters: str) -> Dict[TestCaseResultStatus, int]:
+    """
+    Count results created since `start` by status, from the rollups.
+
+    Whole days come from the daily table and the partial first day from
+    the hourly one, so the window is exact to the hour. `filters` may
+    restrict by application_id, feature_id or test_case_id.
+    """
+    first_full_day = day_bucket(start)
+    if first_full_day < start:
+        first_full_day += timedelta(days=1)
+    
+    counts: Dict[TestCaseResultStatus, int] = defaultdict(int)
+    ranges = (
+        (TestResultHourlyRollup, hour_bucket(start), first_full_day),
+        (TestResultDailyRollup, first_full_day, None),
+    )
+    for model, range_start, range_end in ranges:
+        query = db.query(model.status, func.sum(model.count)).filter(model.bucket_start >= range_start)
+        if range_end is not None:
+            query = query.filter(model.bucket_start < range_end)
+        for name, value in filters.items():
+            if value:
+                query = query.filter(getattr(model, name) == value)
+        for status, count in query.group_by(model.status):
+            counts[status] += count or 0
+    return counts
+
+
+def rollup_series(db: Session, start: datetime, granularity: str, **filters: str) -> List[dict]:
+    """
+    Result counts per bucket and status since `start`.
+
+    `granularity` is "hour" or "day"; daily series start at the beginning
+    of the day containing `start`. `filters` as in rollup_status_counts.
+    """
+    if granularity == "hour":
+        model, first_bucket = TestResultHourlyRollup, hour_bucket(start)
+    else:
+        model, first_bucket = TestResultDailyRollup, day_bucket(start)
+    
+    query = db.query(
+        model.bucket_start, model.status,
+        func.sum(model.count), func.sum(model.duration_sum), func.sum(model.duration_count)
+    ).filter(model.bucket_start >= first_bucket)
+    for name, value in filters.items():
+        if value:
+            query = query.filter(getattr(model, name) == value)
+    
+    series: Dict[datetime, dict] = {}
+    for bucket, status, count, duration_sum, duration_count in query.group_by(model.bucket_start, model.status):
+        if not count:
+            continue
+        point = series.setdefault(bucket, {"counts": {}, "durationSum": 0, "durationCount": 0})
+        point["counts"][status.value] = count or 0
+        point["durationSum"] += duration_sum or 0
+        point["durationCount"] += duration_count or 0
+    
+    return [
+        {
+            "bucket": bucket.isoformat(),
+            "counts": point["counts"],
+            "total": sum(point["counts"].values()),
+            "avgDuration": round(point["durationSum"] / point["durationCount"], 2) if point["durationCount"] else None
+        }
+        for bucket, point in sorted(series.items())
+    ]
@@ -0,0 +1,90 @@
+"""
+Duration-balanced CI shard plans.
+
+Scenarios are assigned with the LPT (longest processing time first)
+heuristic: longest first, each to the currently least loaded shard. Its
+makespan is within 4/3 of the optimum. Durations are the p90 cached in
+test_case_health by the flaky-test job; scenarios without history get
+the median of the known ones.
+"""
+import heapq
+from statistics import median
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import TestCase, TestCaseType, TestCaseStatus, TestCaseHealth, Application
+
+
+def select_test_cases(
+    db: Session,
+    gitlab_project_id: Optional[str] = None,
+    application_id: Optional[str] = None,
+    feature_ids: Optional[Sequence[str]] = None
+) -> List[tuple]:
+    """
+    (id, scenario_name, feature_id, duration_p90) of the automated,
+    non-obsolete test cases in the selection.
+    """
+    query = db.query(
+        TestCase.id, TestCase.scenario_name, TestCase.feature_id, TestCaseHealth.duration_p90
+    ).outerjoin(
+        TestCaseHealth, TestCaseHealth.test_case_id == TestCase.id
+    ).filter(
+        TestCase.type == TestCaseType.AUTOMATED,
+        TestCase.status != TestCaseStatus.OBSOLETE,
+        TestCase.scenario_name.isnot(None)
+    )
+    if gitlab_project_id:
+        query = query.join(Application, Application.id == TestCase.application_id).filter(
+            Application.gitlab_project_id == gitlab_project_id
+        )
+    if application_id:
+        query = query.filter(TestCase.application_id == application_id)
+    if feature_ids:
+        query = query.filter(TestCase.feature_id.in_(list(feature_ids)))
+    return query.all()
+
+
+def plan_shards(items: List[Dict[str, object]], shards: int) -> List[Dict[str, object]]:
+    """
+    Split `items` (dicts with "estimatedDuration") into `shards` groups
+    of balanced total duration, using LPT.
+    """
+    plan = [{"index": i + 1, "estimatedDuration": 0.0, "testCases": []} for i in range(shards)]
+    loads = [(0.0, i) for i in range(shards)]
+    # Ties broken by scenario so the same input always gives the same plan
+    for item in sorted(items, key=lambda it: (-it["estimatedDuration"], it["scenarioName"], it["testCaseId"])):
+        load, index = heapq.heappop(loads)
+        plan[index]["testCases"].append(item)
+        load += item["estimatedDuration"]
+        plan[index]["estimatedDuration"] = load
+        heapq.heappush(loads, (load, index))
+    return plan
+
+
+def build_shard_plan(db: Session, shards: int, **selection) -> Dict[str, object]:
+    """Shard plan for the test cases matched by `select_test_cases(**selection)`."""
+    rows = select_test_cases(db, **selection)
+    known = [duration for _, _, _, duration in rows if duration is not None]
+    fallback = median(known) if known else float(settings.SHARD_DEFAULT_DURATION_SECONDS)
+
+    items = [{
+        "testCaseId": test_case_id,
+        "scenarioName": scenario_name,
+        "featureId": feature_id,
+        "estimatedDuration": duration if duration is not None else fallback,
+        "hasHistory": duration is not None,
+    } for test_case_id, scenario_name, feature_id, duration in rows]
+    plan = plan_shards(items, shards)
+
+    total = sum(item["estimatedDuration"] for item in items)
+    for shard in plan:
+        shard["estimatedDuration"] = round(shard["estimatedDuration"], 1)
+    return {
+        "shards": plan,
+        "testCases": len(items),
+        "withoutHistory": len(items) - len(known),
+        "defaultDuration": round(fallback, 1),
+        "totalDuration": round(total, 1),
+        "estimatedMakespan": max((shard["estimatedDuration"] for shard in plan), default=0.0),
+    }
@@ -0,0 +1,84 @@
+from typing import Dict, Optional
+from sqlalchemy import select, func, type_coerce, String
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+# Dialects that understand GROUP BY GROUPING SETS (...)
+GROUPING_SETS_DIALECTS = {"mssql", "postgresql", "oracle"}
+
+
+class Breakdown:
+    """Counts grouped by several dimensions over the same base query."""
+    def __init__(self, total: int, groups: Dict[str, Dict[str, int]]):
+        self.total = total
+        self.groups = groups
+
+    def get(self, dimension: str) -> Dict[str, int]:
+        return self.groups.get(dimension, {})
+
+    def as_list(self, dimension: str, key: Optional[str] = None) -> list:
+        """Serialize one dimension as [{key: value, "count": n}, ...]."""
+        key = key or dimension
+        return [{key: value, "count": count} for value, count in self.get(dimension).items()]
+
+
+def _supports_grouping_sets(db: Session) -> bool:
+    return db.get_bind().dialect.name in GROUPING_SETS_DIALECTS
+
+
+def count_breakdowns(
+    db: Session,
+    base: Select,
+    dimensions: Dict[str, ColumnElement],
+    count_column: ColumnElement,
+) -> Breakdown:
+    """
+    Count rows of `base` grouped by every dimension, plus the grand total,
+    in a single statement.
+
+    `base` carries the FROM/JOIN/WHERE clauses; its selected columns are
+    replaced. Uses GROUPING SETS where the dialect supports it and a
+    single combined GROUP BY otherwise (e.g. SQLite).
+    Values are returned as their raw string form (enum names).
+    The total is the sum of any one dimension's groups, so it needs no
+    extra grouping set.
+    """
+    names = list(dimensions.keys())
+    groups: Dict[str, Dict[str, int]] = {name: {} for name in names}
+
+    if _supports_grouping_sets(db):
+        stmt = base.with_only_columns(
+            *[type_coerce(dimensions[name], String).label(f"d{i}") for i, name in enumerate(names)],
+            *[func.grouping(dimensions[name]).label(f"g{i}") for i, name in enumerate(names)],
+            func.count(count_column).label("n"),
+            maintain_column_froms=True,
+        ).group_by(
+            func.grouping_sets(*[dimensions[name] for name in names])
+        )
+        for row in db.execute(stmt):
+            flags = row[len(names):2 * len(names)]
+            idx = list(flags).index(0)
+            groups[names[idx]][row[idx]] = row[-1]
+    else:
+        # One GROUP BY over every dimension at once, folded per dimension
+        # here. Dimensions are low-cardinality (enums), so the combined
+        # groups stay small and the table is scanned once.
+        stmt = base.with_only_columns(
+            *[type_coerce(dimensions[name], String) for name in names],
+            func.count(count_column),
+            maintain_column_froms=True,
+        ).group_by(*[dimensions[name] for name in names])
+        for row in db.execute(stmt):
+            for i, name in enumerate(names):
+                groups[name][row[i]] = groups[name].get(row[i], 0) + row[-1]
+
+    total = sum(groups[names[0]].values())
+    return Breakdown(total, groups)
+
+
+def scalar_counts(db: Session, **counts: Select) -> Dict[str, int]:
+    """Run several independent scalar COUNT selects as one statement."""
+    stmt = select(*[query.scalar_subquery().label(name) for name, query in counts.items()])
+    row = db.execute(stmt).one()
+    return {name: row[i] or 0 for i, name in enumerate(counts)}
@@ -0,0 +1,307 @@
+"""
+Step library: the distinct step texts, with their parameters as placeholders.
+
+`the user logs in as "ana" with 3 items` and `the user logs in as "bob"
+with 10 items` are one entry, `the user logs in as {string} with {int}
+items`, used twice. Entries are keyed by the SHA-256 of the folded
+template (case, accents and spacing ignored). Usage counts are kept up
+to date by the writers of steps, which collect the step texts they add
+and remove as StepLibraryDeltas and apply them in their own transaction,
+as ingestion does with duration sketches. `python cli.py
+rebuild-step-library` recounts everything from the step tables.
+
+Suggestions (GET /api/steps/suggest) come from an in-process index of
+character trigrams of the templates. Each worker refreshes it with the
+rows updated since its last refresh, at most every
+STEP_LIBRARY_REFRESH_SECONDS, so it follows step changes without being
+rebuilt. Similar steps are found by comparing MinHash signatures of the
+same trigrams with LSH banding, then checking the exact similarity.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import numpy as np
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import GherkinStep, StepLibraryEntry
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.minhash import (
+    NUM_PERM, bands_for_threshold, candidate_pairs, jaccard, minhash_signature, shingle_hashes, verified_pairs
+)
+from app.utils.normalization import fold_text
+
+_PLACEHOLDERS = (
+    (re.compile(r'"[^"]*"'), "{string}"),
+    (re.compile(r"(?<!\w)'[^']*'(?!\w)"), "{string}"),
+    (re.compile(r"<[^<>\s][^<>]*>"), "{param}"),
+    (re.compile(r"(?<![\w.{])-?\d+[.,]\d+(?![\w.}])"), "{float}"),
+    (re.compile(r"(?<![\w.{])-?\d+(?![\w.}])"), "{int}"),
+)
+_WHITESPACE = re.compile(r"\s+")
+_MAX_ATTEMPTS = 3
+# Rows are re-read this far behind the last refresh, so changes committed
+# late by a transaction that started earlier are not missed
+_REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+def step_template(text: str) -> str:
+    """Step text with quoted strings, outline parameters and numbers replaced by placeholders."""
+    for pattern, placeholder in _PLACEHOLDERS:
+        text = pattern.sub(placeholder, text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def template_key(template: str) -> str:
+    return hashlib.sha256(fold_text(template).encode("utf-8")).hexdigest()
+
+
+def trigrams(template: str) -> Set[str]:
+    """Character trigrams of the folded template, words padded with spaces."""
+    folded = f" {fold_text(template)} "
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+class StepLibraryDeltas:
+    """Pending usage count changes, by template key."""
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.templates: Dict[str, str] = {}
+
+    def add(self, text: str, sign: int = 1) -> None:
+        template = step_template(text)
+        key = template_key(template)
+        self.counts[key] += sign
+        self.templates.setdefault(key, template)
+
+    def __bool__(self) -> bool:
+        return any(self.counts.values())
+
+
+def _apply(db: Session, deltas: StepLibraryDeltas) -> None:
+    keys = sorted(key for key, delta in deltas.counts.items() if delta)
+    stored: Dict[str, int] = {}
+    for batch in chunked(keys, MAX_IN_PARAMS):
+        # FOR UPDATE elsewhere; SQL Server ignores it and takes the hint instead
+        rows = db.query(StepLibraryEntry.key, StepLibraryEntry.usage_count).filter(
+            StepLibraryEntry.key.in_(batch)
+        ).with_for_update().with_hint(StepLibraryEntry, "WITH (UPDLOCK, ROWLOCK)", "mssql")
+        stored.update(rows)
+
+    now = datetime.utcnow()
+    updates = []
+    inserts = []
+    for key in keys:
+        delta = deltas.counts[key]
+        if key in stored:
+            updates.append({"k_key": key, "v_usage_count": max(stored[key] + delta, 0), "v_updated_at": now})
+        elif delta > 0:
+            inserts.append({"key": key, "template": deltas.templates[key], "usage_count": delta, "updated_at": now})
+    _write(db, updates, inserts)
+
+
+def _write(db: Session, updates: List[dict], inserts: List[dict]) -> None:
+    if updates:
+        table = StepLibraryEntry.__table__
+        db.execute(
+            update(table).where(table.c.key == bindparam("k_key")).values(
+                usage_count=bindparam("v_usage_count"), updated_at=bindparam("v_updated_at")
+            ),
+            updates
+        )
+    if inserts:
+        db.execute(insert(StepLibraryEntry.__table__), inserts)
+
+
+def apply_step_deltas(db: Session, deltas: StepLibraryDeltas) -> None:
+    """
+    Apply pending usage count changes in the caller's transaction (not
+    committed).
+
+    If a concurrent writer inserted one of the new templates first, the
+    savepoint is rolled back and the changes are retried from fresh rows.
+    """
+    if not deltas:
+        return
+    for attempt in range(_MAX_ATTEMPTS):
+        savepoint = db.begin_nested()
+        try:
+            _apply(db, deltas)
+            savepoint.commit()
+            return
+        except IntegrityError:
+            savepoint.rollback()
+            if attempt == _MAX_ATTEMPTS - 1:
+                raise
+
+
+def rebuild_step_library(db: Session, batch_size: int = 5000) -> Dict[str, int]:
+    """
+    Recount every template from the step tables and write the entries
+    whose count changed (templates no longer used go to 0). Commits.
+    """
+    counts: Counter = Counter()
+    templates: Dict[str, str] = {}
+    last_id: Optional[str] = None
+    steps = 0
+    while True:
+        # Keyset pagination on the primary key
+        query = select(GherkinStep.id, GherkinStep.text).order_by(GherkinStep.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(GherkinStep.id > last_id)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        for _, text in rows:
+            template = step_template(text)
+            key = template_key(template)
+            counts[key] += 1
+            templates.setdefault(key, template)
+        steps += len(rows)
+        last_id = rows[-1][0]
+
+    stored = dict(db.execute(select(StepLibraryEntry.key, StepLibraryEntry.usage_count)).all())
+    now = datetime.utcnow()
+    updates = [
+        {"k_key": key, "v_usage_count": counts.get(key, 0), "v_updated_at": now}
+        for key, usage_count in stored.items() if usage_count != counts.get(key, 0)
+    ]
+    inserts = [
+        {"key": key, "template": templates[key], "usage_count": count, "updated_at": now}
+        for key, count in counts.items() if key not in stored
+    ]
+    for batch in chunked(updates, MAX_IN_PARAMS):
+        _write(db, batch, [])
+    for batch in chunked(inserts, MAX_IN_PARAMS):
+        _write(db, [], batch)
+    db.commit()
+    return {"steps": steps, "templates": len(counts), "updated": len(updates), "created": len(inserts)}
+
+
+class StepSuggestionIndex:
+    """
+    In-process trigram index of the step library.
+
+    Templates never change for a key, so refreshes only append entries and
+    update counts; entries whose count drops to 0 stay indexed but are not
+    suggested.
+    """
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._position: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._templates: List[str] = []
+        self._trigrams: List[frozenset] = []
+        # MinHash signatures, computed on the first similar_pairs call
+        self._signatures: List[Optional[np.ndarray]] = []
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._sizes = np.zeros(0, dtype=np.int64)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._posting_arrays: Dict[str, np.ndarray] = {}
+        self._watermark: Optional[datetime] = None
+        self._refreshed_at: Optional[float] = None
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """Load entries updated since the last refresh, at most every refresh_seconds."""
+        now = time.monotonic()
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        query = select(
+            StepLibraryEntry.key, StepLibraryEntry.template, StepLibraryEntry.usage_count, StepLibraryEntry.updated_at
+        )
+        if self._watermark is not None:
+            query = query.where(StepLibraryEntry.updated_at >= self._watermark - _REFRESH_OVERLAP)
+        rows = db.execute(query).all()
+
+        with self._lock:
+            added_counts, added_sizes = [], []
+            for key, template, usage_count, updated_at in rows:
+                index = self._position.get(key)
+                if index is None:
+                    index = self._position[key] = len(self._keys)
+                    grams = frozenset(trigrams(template))
+                    self._keys.append(key)
+                    self._templates.append(template)
+                    self._trigrams.append(grams)
+                    self._signatures.append(None)
+                    for gram in grams:
+                        self._postings[gram].append(index)
+                        self._posting_arrays.pop(gram, None)
+                    added_counts.append(usage_count)
+                    added_sizes.append(len(grams))
+                else:
+                    self._counts[index] = usage_count
+                if self._watermark is None or updated_at > self._watermark:
+                    self._watermark = updated_at
+            if added_counts:
+                self._counts = np.concatenate([self._counts, np.array(added_counts, dtype=np.int64)])
+                self._sizes = np.concatenate([self._sizes, np.array(added_sizes, dtype=np.int64)])
+            self._refreshed_at = now
+
+    def _posting_array(self, gram: str) -> np.ndarray:
+        array = self._posting_arrays.get(gram)
+        if array is None:
+            array = self._posting_arrays[gram] = np.array(self._postings[gram], dtype=np.int64)
+        return array
+
+    def _entry(self, index: int) -> dict:
+        return {
+            "key": self._keys[index],
+            "template": self._templates[index],
+            "usageCount": int(self._counts[index])
+        }
+
+    def suggest(self, text: str, limit: int, min_similarity: float) -> List[dict]:
+        """
+        Templates containing most of the trigrams of `text` (normalized like
+        the library), best coverage first, then closest length and most used.
+        """
+        grams = trigrams(step_template(text))
+        with self._lock:
+            arrays = [self._posting_array(gram) for gram in grams if gram in self._postings]
+            if not arrays:
+                return []
+            shared = np.bincount(np.concatenate(arrays), minlength=len(self._keys))
+            coverage = shared / len(grams)
+            similarity = shared / (len(grams) + self._sizes - shared)
+            candidates = np.flatnonzero((coverage >= min_similarity) & (self._counts > 0))
+            order = np.lexsort((
+                -self._counts[candidates], -similarity[candidates], -coverage[candidates]
+            ))[:limit]
+            return [
+                dict(self._entry(index), similarity=round(float(coverage[index]), 3))
+                for index in candidates[order]
+            ]
+
+    def similar_pairs(self, threshold: float, limit: int) -> List[dict]:
+        """Pairs of used templates whose trigram Jaccard similarity is at least `threshold`, most similar first."""
+        with self._lock:
+            live = np.flatnonzero(self._counts > 0)
+            if len(live) < 2:
+                return []
+            for index in live:
+                if self._signatures[index] is None:
+                    self._signatures[index] = minhash_signature(shingle_hashes(self._trigrams[index]), NUM_PERM)
+            signatures = np.vstack([self._signatures[index] for index in live])
+
+            a, b = candidate_pairs(signatures, bands_for_threshold(NUM_PERM, threshold))
+            pairs = []
+            for i, j, score in verified_pairs(
+                signatures, a, b, threshold, lambda i, j: jaccard(self._trigrams[live[i]], self._trigrams[live[j]])
+            ):
+                i, j = live[i], live[j]
+                pairs.append((score, int(self._counts[i] + self._counts[j]), i, j))
+            pairs.sort(key=lambda item: (-item[0], -item[1]))
+            return [
+                {"similarity": round(score, 3), "steps": [self._entry(i), self._entry(j)]}
+                for score, _, i, j in pairs[:limit]
+            ]
+
+
+step_index = StepSuggestionIndex(settings.STEP_LIBRARY_REFRESH_SECONDS)
@@ -0,0 +1,170 @@
+"""
+Creation of test cases with their steps and sub-steps.
+
+IDs are generated here (generate_cuid) rather than by the database, so
+children can reference their parents before anything is written: test
+cases, steps and sub-steps then go out as three bulk INSERTs
+(executemany) in the caller's transaction, with no commit or refresh per
+row. The rows bypass the ORM, so the values the model events maintain
+(scenario_key, application_id, steps_document) are filled in here.
+"""
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models import TestCase, Feature, GherkinStep, GherkinSubStep, TestCaseType, TestCasePriority, TestCaseStatus
+from app.schemas.test_case import TestCaseCreate
+from app.services.step_library_service import StepLibraryDeltas, apply_step_deltas
+from app.services.test_case_steps_service import serialize_step_rows
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.id_generator import generate_cuid
+from app.utils.normalization import normalize_scenario_name
+
+
+class CreatedTestCases:
+    """Rows written by create_test_cases, by test case, and their features."""
+    def __init__(self, features: Dict[str, Feature]):
+        self.features = features
+        self.test_cases: List[dict] = []
+        self.steps: Dict[str, List[dict]] = {}
+        self.sub_steps: Dict[str, List[dict]] = {}
+
+
+def _label(index: int, total: int) -> str:
+    return f"Caso {index + 1}: " if total > 1 else ""
+
+
+def _load_features(db: Session, items: Sequence[TestCaseCreate]) -> Dict[str, Feature]:
+    feature_ids = {item.feature_id for item in items}
+    features = {}
+    for batch in chunked(feature_ids, MAX_IN_PARAMS):
+        features.update((f.id, f) for f in db.query(Feature).filter(Feature.id.in_(batch)))
+    for index, item in enumerate(items):
+        if item.feature_id not in features:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{_label(index, len(items))}Feature no encontrada"
+            )
+    return features
+
+
+def _ensure_unique_scenarios(db: Session, keys: List[tuple]) -> None:
+    """
+    Reject scenario names already used in the application, by another
+    test case of the batch or by a stored one. `keys` are
+    (application_id, scenario_key or None), one per item.
+    """
+    seen = {}
+    for index, key in enumerate(keys):
+        if key[1] is None:
+            continue
+        if key in seen:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{_label(index, len(keys))}Escenario repetido en la solicitud (caso {seen[key] + 1})"
+            )
+        seen[key] = index
+
+    for batch in chunked({key[1] for key in seen}, MAX_IN_PARAMS):
+        existing = db.query(TestCase.application_id, TestCase.scenario_key).filter(
+            TestCase.scenario_key.in_(batch)
+        )
+        for application_id, scenario_key in existing:
+            index = seen.get((application_id, scenario_key))
+            if index is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{_label(index, len(keys))}Ya existe un caso de prueba con ese escenario en la aplicación"
+                )
+
+
+def build_step_rows(test_case_id: str, steps_data: Sequence, now: datetime) -> Tuple[List[dict], Dict[str, List[dict]]]:
+    """
+    Rows for a test case's steps (GherkinStepCreate or alike) and, by step
+    ID, their sub-steps. Missing orders follow the list position.
+    """
+    steps, sub_steps = [], {}
+    for idx, step_data in enumerate(steps_data):
+        step = {
+            "id": generate_cuid(),
+            "test_case_id": test_case_id,
+            "type": step_data.type,
+            "text": step_data.text,
+            "order": step_data.order or idx + 1,
+            "created_at": now,
+            "updated_at": now
+        }
+        steps.append(step)
+        sub_steps[step["id"]] = [{
+            "id": generate_cuid(),
+            "step_id": step["id"],
+            "text": sub_data.text,
+            "order": sub_data.order or sub_idx + 1,
+            "created_at": now,
+            "updated_at": now
+        } for sub_idx, sub_data in enumerate(step_data.sub_steps or [])]
+    return steps, sub_steps
+
+
+def insert_rows(db: Session, test_cases: List[dict], steps: List[dict], sub_steps: List[dict]) -> None:
+    """Bulk INSERT the rows, parents first (they run in this order within the transaction)."""
+    if test_cases:
+        db.execute(insert(TestCase.__table__), test_cases)
+    if steps:
+        db.execute(insert(GherkinStep.__table__), steps)
+    if sub_steps:
+        db.execute(insert(GherkinSubStep.__table__), sub_steps)
+
+
+def create_test_cases(db: Session, items: Sequence[TestCaseCreate]) -> CreatedTestCases:
+    """
+    Insert `items` with their steps and sub-steps (not committed).
+    Raises 404 for an unknown feature and 400 for a scenario name already
+    taken in its application.
+    """
+    features = _load_features(db, items)
+    keys = [
+        (features[item.feature_id].application_id, normalize_scenario_name(item.scenario_name))
+        for item in items
+    ]
+    _ensure_unique_scenarios(db, keys)
+
+    now = datetime.utcnow()
+    created = CreatedTestCases(features)
+    step_rows, sub_step_rows = [], []
+    for item, (application_id, scenario_key) in zip(items, keys):
+        test_case_id = generate_cuid()
+        created.test_cases.append({
+            "id": test_case_id,
+            "name": item.name,
+            "description": item.description,
+            "type": item.type or TestCaseType.AUTOMATED,
+            "priority": item.priority or TestCasePriority.MEDIUM,
+            "status": item.status or TestCaseStatus.PLANNED,
+            "feature_id": item.feature_id,
+            "azure_user_story_id": item.azure_user_story_id,
+            "azure_user_story_url": item.azure_user_story_url,
+            "azure_test_case_id": item.azure_test_case_id,
+            "azure_test_case_url": item.azure_test_case_url,
+            "tags": item.tags or [],
+            "scenario_name": item.scenario_name,
+            "scenario_key": scenario_key,
+            "application_id": application_id,
+            "created_at": now,
+            "updated_at": now
+        })
+        steps, subs = build_step_rows(test_case_id, item.steps or [], now)
+        created.test_cases[-1]["steps_document"] = serialize_step_rows(steps, subs)
+        created.steps[test_case_id] = steps
+        created.sub_steps.update(subs)
+        step_rows.extend(steps)
+        for rows in subs.values():
+            sub_step_rows.extend(rows)
+
+    insert_rows(db, created.test_cases, step_rows, sub_step_rows)
+    deltas = StepLibraryDeltas()
+    for row in step_rows:
+        deltas.add(row["text"])
+    apply_step_deltas(db, deltas)
+    return created
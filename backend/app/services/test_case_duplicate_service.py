@@ -0,0 +1,281 @@
+"""
+Near-duplicate test cases: the same scenario written twice, in another
+feature or application.
+
+Each test case's steps (its steps document) are reduced to step templates
+(step_library_service.step_template, so logging in as "ana" or as "bob"
+is the same step), folded and cut into shingles of
+DUPLICATE_SHINGLE_WORDS consecutive words, with a marker between steps.
+Worker processes turn batches of DUPLICATE_BATCH_SIZE test cases into
+sorted shingle hashes and a MinHash signature each, while the main process
+keeps reading the next batches. LSH banding on the signatures gives
+candidate pairs; candidates whose signatures agree far less than the
+threshold are dropped and the rest are verified with the exact Jaccard
+similarity of their shingle hashes. Verified pairs are joined into
+clusters (connected components).
+
+Memory grows with the number of test cases only through the signatures
+(512 bytes each) and the shingle hashes (4 bytes per distinct shingle):
+a few hundred MB for 200k test cases.
+
+Clusters are stored in duplicate_clusters, keyed by their member IDs, so a
+re-run keeps the review decision of a cluster whose members did not
+change, or that is found again with only some of its reviewed members.
+Open clusters that are no longer found are deleted; reviewed ones are
+kept.
+"""
+import hashlib
+import json
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from sqlalchemy import Text, bindparam, delete, insert, select, type_coerce, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import TestCase, DuplicateCluster, DuplicateClusterMember, DuplicateClusterStatus
+from app.services.step_library_service import step_template
+from app.services.test_case_steps_service import build_steps_documents
+from app.utils.batching import chunked, MAX_IN_PARAMS
+from app.utils.id_generator import generate_cuid
+from app.utils.minhash import (
+    NUM_PERM, bands_for_threshold, candidate_pairs, minhash_signature, shingle_hashes, verified_pairs
+)
+from app.utils.normalization import fold_text
+
+_STEP_BREAK = "|"
+# Larger buckets (e.g. many copies of one scenario) are linked in a star
+_MAX_BUCKET = 200
+
+
+def step_shingles(steps: Sequence[dict], words_per_shingle: int) -> Set[str]:
+    """Shingles of consecutive words of the steps' templates, across step boundaries."""
+    words = []
+    for step in steps:
+        if words:
+            words.append(_STEP_BREAK)
+        words.extend(fold_text(step_template(step["text"])).split())
+    if len(words) <= words_per_shingle:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + words_per_shingle]) for i in range(len(words) - words_per_shingle + 1)}
+
+
+def signature_batch(documents: List, words_per_shingle: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    MinHash signatures and sorted shingle hashes (uint32) of a batch of
+    steps documents, given as lists or as their JSON text. Runs in the
+    worker processes.
+    """
+    signatures = np.empty((len(documents), NUM_PERM), dtype=np.uint32)
+    hashes = []
+    for row, document in enumerate(documents):
+        if isinstance(document, str):
+            document = json.loads(document)
+        shingles = np.sort(shingle_hashes(step_shingles(document or [], words_per_shingle)))
+        signatures[row] = minhash_signature(shingles, NUM_PERM)
+        hashes.append(shingles.astype(np.uint32))
+    return signatures, hashes
+
+
+def _read_batches(db: Session, batch_size: int) -> Iterator[Tuple[List[tuple], List]]:
+    """(id, application_id, feature_id) and steps document of every test case, in key order."""
+    last_id: Optional[str] = None
+    while True:
+        # Raw JSON text: it is parsed in the worker processes
+        query = select(
+            TestCase.id, TestCase.application_id, TestCase.feature_id, type_coerce(TestCase.steps_document, Text)
+        ).order_by(TestCase.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(TestCase.id > last_id)
+        rows = db.connection().execute(query).all()
+        if not rows:
+            return
+        # Test cases written before their document existed
+        missing = [row[0] for row in rows if row[3] is None]
+        built = build_steps_documents(db, missing) if missing else {}
+        yield (
+            [tuple(row[:3]) for row in rows],
+            [row[3] if row[3] is not None else built.get(row[0], []) for row in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def _signatures(
+    db: Session, workers: int, batch_size: int, words_per_shingle: int
+) -> Tuple[List[tuple], np.ndarray, List[np.ndarray]]:
+    cases: List[tuple] = []
+    signature_parts: List[np.ndarray] = []
+    hashes: List[np.ndarray] = []
+
+    def collect(result):
+        signature_parts.append(result[0])
+        hashes.extend(result[1])
+
+    if workers <= 1:
+        for rows, documents in _read_batches(db, batch_size):
+            cases.extend(rows)
+            collect(signature_batch(documents, words_per_shingle))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for rows, documents in _read_batches(db, batch_size):
+                cases.extend(rows)
+                pending.append(pool.submit(signature_batch, documents, words_per_shingle))
+                # Reading stays at most two batches per worker ahead
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+
+    if not signature_parts:
+        return cases, np.zeros((0, NUM_PERM), dtype=np.uint32), hashes
+    return cases, np.vstack(signature_parts), hashes
+
+
+def _verified_pairs(
+    signatures: np.ndarray, hashes: List[np.ndarray], threshold: float
+) -> Tuple[int, List[Tuple[int, int, float]]]:
+    """Candidate count and (i, j, similarity) of the pairs at or above `threshold`."""
+    # Test cases without steps are not duplicates of each other
+    present = np.flatnonzero(np.fromiter((len(h) > 0 for h in hashes), dtype=bool, count=len(hashes)))
+    if len(present) < 2:
+        return 0, []
+    a, b = candidate_pairs(signatures[present], bands_for_threshold(NUM_PERM, threshold), _MAX_BUCKET)
+    a, b = present[a], present[b]
+
+    def similarity(i: int, j: int) -> float:
+        shared = len(np.intersect1d(hashes[i], hashes[j], assume_unique=True))
+        return shared / (len(hashes[i]) + len(hashes[j]) - shared)
+
+    return len(a), list(verified_pairs(signatures, a, b, threshold, similarity))
+
+
+def _clusters(pairs: List[Tuple[int, int, float]]) -> Tuple[List[List[int]], Dict[int, float]]:
+    """Connected components of the pairs, and each member's best similarity."""
+    parent: Dict[int, int] = {}
+    best: Dict[int, float] = {}
+
+    def find(node: int) -> int:
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for i, j, similarity in pairs:
+        for node in (i, j):
+            parent.setdefault(node, node)
+            best[node] = max(best.get(node, 0.0), similarity)
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    components = defaultdict(list)
+    for node in parent:
+        components[find(node)].append(node)
+    return [sorted(members) for members in components.values()], best
+
+
+def _store(
+    db: Session, cases: List[tuple], clusters: List[List[int]], best: Dict[int, float], now: datetime
+) -> Dict[str, int]:
+    existing = {
+        key: (cluster_id, cluster_status)
+        for cluster_id, key, cluster_status in db.execute(
+            select(DuplicateCluster.id, DuplicateCluster.key, DuplicateCluster.status)
+        )
+    }
+    # Reviewed cluster of each test case: a cluster found again with fewer
+    # members (e.g. one was deleted) keeps its review
+    reviewed = dict(db.execute(
+        select(DuplicateClusterMember.test_case_id, DuplicateClusterMember.cluster_id).join(
+            DuplicateCluster, DuplicateCluster.id == DuplicateClusterMember.cluster_id
+        ).where(DuplicateCluster.status != DuplicateClusterStatus.OPEN)
+    ).all())
+
+    cluster_inserts, cluster_updates, member_inserts = [], [], []
+    kept = set()
+    for members in clusters:
+        member_ids = sorted(cases[i][0] for i in members)
+        key = hashlib.sha256("\n".join(member_ids).encode("utf-8")).hexdigest()
+        values = {
+            "key": key,
+            "size": len(members),
+            "application_count": len({cases[i][1] for i in members}),
+            "feature_count": len({cases[i][2] for i in members}),
+            "similarity": max(best[i] for i in members),
+            "computed_at": now,
+        }
+        cluster_id = existing[key][0] if key in existing else None
+        if cluster_id is None:
+            previous = {reviewed.get(test_case_id) for test_case_id in member_ids}
+            if len(previous) == 1 and None not in previous and not previous & kept:
+                cluster_id = previous.pop()
+        if cluster_id is not None:
+            kept.add(cluster_id)
+            cluster_updates.append({"k_id": cluster_id, **{f"v_{name}": value for name, value in values.items()}})
+        else:
+            cluster_id = generate_cuid()
+            cluster_inserts.append({"id": cluster_id, "status": DuplicateClusterStatus.OPEN, "created_at": now, **values})
+        member_inserts.extend(
+            {"cluster_id": cluster_id, "test_case_id": cases[i][0], "similarity": best[i]} for i in members
+        )
+    stale = [
+        cluster_id for cluster_id, cluster_status in existing.values()
+        if cluster_id not in kept and cluster_status == DuplicateClusterStatus.OPEN
+    ]
+
+    # Members of kept clusters are rewritten, their similarities may have changed
+    for batch in chunked(list(kept) + stale, MAX_IN_PARAMS):
+        db.execute(delete(DuplicateClusterMember).where(DuplicateClusterMember.cluster_id.in_(batch)))
+    for batch in chunked(stale, MAX_IN_PARAMS):
+        db.execute(delete(DuplicateCluster).where(DuplicateCluster.id.in_(batch)))
+    if cluster_updates:
+        table = DuplicateCluster.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("k_id")).values(
+                key=bindparam("v_key"),
+                size=bindparam("v_size"),
+                application_count=bindparam("v_application_count"),
+                feature_count=bindparam("v_feature_count"),
+                similarity=bindparam("v_similarity"),
+                computed_at=bindparam("v_computed_at")
+            ),
+            cluster_updates
+        )
+    if cluster_inserts:
+        db.execute(insert(DuplicateCluster), cluster_inserts)
+    if member_inserts:
+        db.execute(insert(DuplicateClusterMember), member_inserts)
+    db.commit()
+    return {"created": len(cluster_inserts), "kept": len(cluster_updates), "removed": len(stale)}
+
+
+def find_duplicate_test_cases(
+    db: Session,
+    threshold: Optional[float] = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Cluster every test case with its near-duplicates and replace the
+    stored clusters (see module docstring). Commits. Returns totals.
+    """
+    threshold = threshold or settings.DUPLICATE_THRESHOLD
+    workers = workers or settings.DUPLICATE_WORKERS or os.cpu_count() or 1
+    batch_size = batch_size or settings.DUPLICATE_BATCH_SIZE
+
+    cases, signatures, hashes = _signatures(db, workers, batch_size, settings.DUPLICATE_SHINGLE_WORDS)
+    candidates, pairs = _verified_pairs(signatures, hashes, threshold)
+    clusters, best = _clusters(pairs)
+    stored = _store(db, cases, clusters, best, datetime.utcnow())
+    return {
+        "testCases": len(cases),
+        "candidates": candidates,
+        "pairs": len(pairs),
+        "clusters": len(clusters),
+        **stored
+    }
@@ -0,0 +1,191 @@
+"""
+Gherkin step edits as a diff against the stored steps.
+
+Incoming steps and sub-steps are matched to stored ones by ID, or by
+position when they carry no ID; matched rows are updated only where a
+field changed, unmatched incoming ones are inserted and leftover stored
+ones deleted. Everything goes out in a single flush, which the unit of
+work batches into one statement per table and operation, so a one-word
+edit costs one UPDATE instead of rewriting every step.
+
+Every writer of steps also stores the serialized steps in
+TestCase.steps_document, which single test case reads serve without
+touching the step tables.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session, selectinload
+from app.models import TestCase, GherkinStep, GherkinSubStep
+from app.schemas.test_case import GherkinStepUpdate
+from app.services.step_library_service import StepLibraryDeltas, apply_step_deltas
+from app.utils.batching import chunked, MAX_IN_PARAMS
+
+
+def serialize_steps(steps: Sequence[GherkinStep]) -> List[dict]:
+    """API representation of steps (and their sub-steps), by order."""
+    return [
+        {
+            "id": step.id,
+            "type": step.type.value,
+            "text": step.text,
+            "order": step.order,
+            "subSteps": [
+                {"id": sub.id, "text": sub.text, "order": sub.order}
+                for sub in sorted(step.sub_steps, key=lambda x: x.order)
+            ]
+        }
+        for step in sorted(steps, key=lambda x: x.order)
+    ]
+
+
+def serialize_step_rows(steps: Sequence[dict], sub_steps: Dict[str, List[dict]]) -> List[dict]:
+    """serialize_steps for step and sub-step row dicts (sub-steps by step ID)."""
+    return [
+        {
+            "id": step["id"],
+            "type": step["type"].value,
+            "text": step["text"],
+            "order": step["order"],
+            "subSteps": [
+                {"id": sub["id"], "text": sub["text"], "order": sub["order"]}
+                for sub in sorted(sub_steps.get(step["id"], []), key=lambda x: x["order"])
+            ]
+        }
+        for step in sorted(steps, key=lambda x: x["order"])
+    ]
+
+
+def write_steps_documents(db: Session, documents: Dict[str, List[dict]]) -> None:
+    """Store steps_document for each test case ID (one executemany UPDATE)."""
+    if not documents:
+        return
+    table = TestCase.__table__
+    db.execute(
+        update(table).where(table.c.id == bindparam("k_id")).values(steps_document=bindparam("v_steps_document")),
+        [{"k_id": test_case_id, "v_steps_document": document} for test_case_id, document in documents.items()]
+    )
+
+
+def build_steps_documents(db: Session, test_case_ids: Iterable[str]) -> Dict[str, List[dict]]:
+    """Steps documents of the test cases, from the step tables (two queries per chunk)."""
+    documents = {}
+    for batch in chunked(test_case_ids, MAX_IN_PARAMS):
+        steps: Dict[str, List[dict]] = {test_case_id: [] for test_case_id in batch}
+        for row in db.execute(
+            select(GherkinStep.id, GherkinStep.test_case_id, GherkinStep.type, GherkinStep.text, GherkinStep.order)
+            .where(GherkinStep.test_case_id.in_(batch))
+        ).mappings():
+            steps[row["test_case_id"]].append(row)
+        sub_steps: Dict[str, List[dict]] = {}
+        for row in db.execute(
+            select(GherkinSubStep.id, GherkinSubStep.step_id, GherkinSubStep.text, GherkinSubStep.order)
+            .join(GherkinStep, GherkinStep.id == GherkinSubStep.step_id)
+            .where(GherkinStep.test_case_id.in_(batch))
+        ).mappings():
+            sub_steps.setdefault(row["step_id"], []).append(row)
+        documents.update(
+            (test_case_id, serialize_step_rows(rows, sub_steps)) for test_case_id, rows in steps.items()
+        )
+    return documents
+
+
+def backfill_steps_documents(db: Session, batch_size: int = MAX_IN_PARAMS) -> int:
+    """
+    Write steps_document for the test cases that have none, committing per
+    batch. Returns how many were written.
+    """
+    total = 0
+    while True:
+        test_case_ids = list(db.scalars(
+            select(TestCase.id).where(TestCase.steps_document.is_(None)).order_by(TestCase.id).limit(batch_size)
+        ))
+        if not test_case_ids:
+            return total
+        write_steps_documents(db, build_steps_documents(db, test_case_ids))
+        db.commit()
+        total += len(test_case_ids)
+
+
+def _match(existing: Sequence, incoming: Sequence) -> Tuple[List[tuple], List]:
+    """
+    Pair each incoming item with a stored row: the one with its ID, or
+    for items without ID the row at the same position, unless another
+    item claims that row by ID. Returns ([(item, row or None)], leftover rows).
+    """
+    by_id = {row.id: row for row in existing}
+    claimed = {item.id for item in incoming if item.id in by_id}
+    used = set()
+    pairs = []
+    for index, item in enumerate(incoming):
+        row = None
+        if item.id is not None:
+            # Unknown IDs (e.g. deleted meanwhile) are inserted as new rows
+            row = by_id.get(item.id)
+        elif index < len(existing) and existing[index].id not in claimed:
+            row = existing[index]
+        if row is not None and row.id in used:
+            row = None
+        if row is not None:
+            used.add(row.id)
+        pairs.append((item, row))
+    return pairs, [row for row in existing if row.id not in used]
+
+
+def _assign(row, **values) -> None:
+    """Set only the attributes that differ, so unchanged rows are not updated."""
+    for name, value in values.items():
+        if getattr(row, name) != value:
+            setattr(row, name, value)
+
+
+def _sync_sub_steps(step: GherkinStep, incoming: Optional[list]) -> None:
+    existing = sorted(step.sub_steps, key=lambda x: x.order) if step.id else []
+    pairs, removed = _match(existing, incoming or [])
+    for sub in removed:
+        step.sub_steps.remove(sub)
+    for index, (data, sub) in enumerate(pairs):
+        values = {"text": data.text, "order": data.order or index + 1}
+        if sub is None:
+            step.sub_steps.append(GherkinSubStep(**values))
+        else:
+            _assign(sub, **values)
+
+
+def update_steps(db: Session, test_case_id: str, steps_data: List[GherkinStepUpdate]) -> List[dict]:
+    """
+    Make the test case's steps match `steps_data`, flushing once, and
+    store the new steps document. The caller commits. Returns the
+    resulting steps, serialized.
+    """
+    existing = db.query(GherkinStep).options(
+        selectinload(GherkinStep.sub_steps)
+    ).filter(
+        GherkinStep.test_case_id == test_case_id
+    ).order_by(GherkinStep.order, GherkinStep.id).all()
+
+    deltas = StepLibraryDeltas()
+    for step in existing:
+        deltas.add(step.text, -1)
+    for data in steps_data:
+        deltas.add(data.text)
+
+    pairs, removed = _match(existing, steps_data)
+    for step in removed:
+        db.delete(step)
+
+    steps = []
+    for index, (data, step) in enumerate(pairs):
+        values = {"type": data.type, "text": data.text, "order": data.order or index + 1}
+        if step is None:
+            step = GherkinStep(test_case_id=test_case_id, **values)
+            db.add(step)
+        else:
+            _assign(step, **values)
+        _sync_sub_steps(step, data.sub_steps)
+        steps.append(step)
+
+    db.flush()
+    document = serialize_steps(steps)
+    write_steps_documents(db, {test_case_id: document})
+    apply_step_deltas(db, deltas)
+    return document
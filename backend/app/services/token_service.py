@@ -0,0 +1,164 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import User, UserStatus, RefreshToken, RevokedToken
+from app.services.auth_service import create_access_token, generate_refresh_token, hash_token
+from app.services.cache_service import bump_cache_version, VersionedSnapshot
+from app.utils.id_generator import generate_cuid
+
+REVOKED_TOKENS_CACHE = "revoked_tokens"
+
+
+def _access_token_lifetime() -> timedelta:
+    return timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRES_MINUTES)
+
+
+def _issue_tokens(db: Session, user: User) -> Tuple[Dict[str, object], RefreshToken]:
+    refresh_token = generate_refresh_token()
+    stored = RefreshToken(
+        id=generate_cuid(),
+        user_id=user.id,
+        token_hash=hash_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.JWT_EXPIRES_IN_DAYS)
+    )
+    db.add(stored)
+    tokens = {
+        "token": create_access_token(user),
+        "refreshToken": refresh_token,
+        "expiresIn": int(_access_token_lifetime().total_seconds())
+    }
+    return tokens, stored
+
+
+def issue_tokens(db: Session, user: User) -> Dict[str, object]:
+    """
+    Issue an access token and a refresh token for `user`.
+
+    Only the refresh token's hash is stored; the caller must commit.
+    """
+    tokens, _ = _issue_tokens(db, user)
+    return tokens
+
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> Optional[Tuple[User, Dict[str, object]]]:
+    """
+    Exchange a refresh token for a new token pair.
+
+    The presented token is revoked. Presenting an already revoked token
+    is treated as theft and revokes every refresh token of its user.
+    Returns None when the token is unknown, expired or revoked, or the
+    user is no longer active. The caller must commit.
+    """
+    stored = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_token(refresh_token)
+    ).first()
+    if not stored:
+        return None
+
+    now = datetime.utcnow()
+    if stored.revoked_at is not None:
+        revoke_refresh_tokens(db, stored.user_id)
+        return None
+    if stored.expires_at <= now:
+        return None
+
+    user = stored.user
+    if user.status != UserStatus.ACTIVE:
+        return None
+
+    tokens, replacement = _issue_tokens(db, user)
+    stored.revoked_at = now
+    stored.replaced_by_id = replacement.id
+    return user, tokens
+
+
+def revoke_refresh_token(db: Session, refresh_token: str) -> None:
+    """Revoke a single refresh token (logout). The caller must commit."""
+    db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_token(refresh_token),
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_refresh_tokens(db: Session, user_id: str) -> None:
+    """Revoke every active refresh token of a user. The caller must commit."""
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_access_token(db: Session, payload: dict) -> None:
+    """Add one access token to the revocation list. The caller must commit."""
+    db.add(RevokedToken(
+        jti=payload.get("jti"),
+        expires_at=datetime.utcfromtimestamp(payload["exp"])
+    ))
+    _bump_revocations(db)
+
+
+def revoke_user_access_tokens(db: Session, user_id: str) -> None:
+    """
+    Revoke every access token issued to a user so far.
+
+    Used when the claims embedded in them (role, names, status) change.
+    The caller must commit.
+    """
+    db.add(RevokedToken(
+        user_id=user_id,
+        revoked_before=time.time(),
+        expires_at=datetime.utcnow() + _access_token_lifetime()
+    ))
+    _bump_revocations(db)
+
+
+def _bump_revocations(db: Session) -> None:
+    db.query(RevokedToken).filter(
+        RevokedToken.expires_at < datetime.utcnow()
+    ).delete(synchronize_session=False)
+    bump_cache_version(db, REVOKED_TOKENS_CACHE)
+    # This worker reloads on its next check; others within the check interval
+    event.listen(db, "after_commit", lambda session: revocation_list.expire(), once=True)
+
+
+def _load_revocations(db: Session) -> Tuple[Set[str], Dict[str, float]]:
+    jtis: Set[str] = set()
+    users: Dict[str, float] = {}
+    rows = db.query(RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_before).filter(
+        RevokedToken.expires_at >= datetime.utcnow()
+    ).all()
+    for jti, user_id, revoked_before in rows:
+        if jti:
+            jtis.add(jti)
+        if user_id and revoked_before:
+            users[user_id] = max(users.get(user_id, 0.0), revoked_before)
+    return jtis, users
+
+
+class RevocationList:
+    """
+    In-process copy of the `revoked_tokens` table.
+
+    Reloaded when the shared version stamp changes, which each worker
+    checks at most every AUTH_CACHE_VERSION_CHECK_SECONDS. The table only
+    holds entries younger than an access token's lifetime, so it stays small.
+    """
+    def __init__(self, version_check_seconds: int):
+        self._snapshot = VersionedSnapshot(REVOKED_TOKENS_CACHE, _load_revocations, version_check_seconds)
+
+    def expire(self) -> None:
+        """Force a version check on the next lookup."""
+        self._snapshot.expire()
+
+    def is_revoked(self, db: Session, payload: dict) -> bool:
+        jtis, users = self._snapshot.get(db)
+        if payload.get("jti") in jtis:
+            return True
+        revoked_before = users.get(payload.get("userId"))
+        return revoked_before is not None and float(payload.get("iat", 0)) < revoked_before
+
+
+revocation_list = RevocationList(settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
@@ -0,0 +1,18 @@
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+# SQL Server accepts at most 2100 parameters per statement
+MAX_IN_PARAMS = 1000
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of at most `size` items."""
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
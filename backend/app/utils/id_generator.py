@@ -2,23 +2,35 @@ import random
 import string
 import time
 
+_BASE36 = string.digits + string.ascii_lowercase
+# Two base-36 digits at a time: half the divisions
+_BASE36_PAIRS = [high + low for high in _BASE36 for low in _BASE36]
+_RANDOM_LENGTH = 12
+_RANDOM_SPACE = 36 ** _RANDOM_LENGTH
+
+# Last timestamp encoded; bulk inserts generate many IDs per millisecond
+_last_timestamp = (0, "")
+
+
+def _to_base36(value: int, width: int = 0) -> str:
+    pairs = []
+    while value > 0:
+        value, remainder = divmod(value, 1296)
+        pairs.append(_BASE36_PAIRS[remainder])
+    return "".join(reversed(pairs)).lstrip("0").rjust(width, "0")
+
 
 def generate_cuid() -> str:
     """
     Generate a CUID-like identifier.
     Format: c + timestamp_base36 + random_chars
     """
+    global _last_timestamp
     timestamp = int(time.time() * 1000)
+    if _last_timestamp[0] != timestamp:
+        _last_timestamp = (timestamp, _to_base36(timestamp))
     
-    # Convert timestamp to base36
-    chars = string.digits + string.ascii_lowercase
-    timestamp_str = ""
-    while timestamp > 0:
-        timestamp_str = chars[timestamp % 36] + timestamp_str
-        timestamp //= 36
-    
-    # Generate random characters
-    random_part = ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
+    # One draw for the 12 random characters (uniform over all of them)
+    random_part = _to_base36(random.randrange(_RANDOM_SPACE), _RANDOM_LENGTH)
     
-    return f"c{timestamp_str}{random_part}"
-
+    return f"c{_last_timestamp[1]}{random_part}"
@@ -0,0 +1,140 @@
+"""
+MinHash signatures and LSH banding, for finding similar sets (Jaccard).
+
+Shingles are hashed with CRC32, which unlike hash() is the same in every
+process, so signatures can be computed in worker processes or stored.
+Each of the `num_perm` hash functions is (a * x + b) mod (2^31 - 1); a
+signature is the minimum of each over the set, and the fraction of equal
+positions in two signatures estimates their Jaccard similarity.
+
+LSH splits signatures into `bands` bands of `num_perm / bands` rows; two
+sets become candidates when any band matches exactly, which happens with
+probability 1 - (1 - s^rows)^bands for similarity s.
+"""
+import zlib
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+import numpy as np
+
+_PRIME = (1 << 31) - 1
+EMPTY_VALUE = _PRIME  # signature value of an empty set
+NUM_PERM = 128
+# Candidate pairs whose estimated similarity is this far below the threshold
+# are not verified (about 4 standard deviations of the estimate)
+_ESTIMATE_MARGIN = 0.15
+_PAIR_BATCH = 100000
+
+
+def shingle_hashes(shingles: Iterable[str]) -> np.ndarray:
+    """CRC32 of each distinct shingle, as uint64."""
+    return np.fromiter({zlib.crc32(shingle.encode("utf-8")) for shingle in shingles}, dtype=np.uint64)
+
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _PRIME, size=(num_perm, 1)).astype(np.uint64)
+    b = rng.randint(0, _PRIME, size=(num_perm, 1)).astype(np.uint64)
+    return a, b
+
+
+def minhash_signature(hashes: np.ndarray, num_perm: int = NUM_PERM, seed: int = 1) -> np.ndarray:
+    """MinHash signature (uint32, length num_perm) of a set given by shingle_hashes."""
+    if len(hashes) == 0:
+        return np.full(num_perm, EMPTY_VALUE, dtype=np.uint32)
+    a, b = _permutations(num_perm, seed)
+    # a < 2^31 and hashes < 2^32, so the products fit in 64 bits
+    return ((a * hashes[np.newaxis, :] + b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def estimated_similarity(signature_a: np.ndarray, signature_b: np.ndarray):
+    """Fraction of equal positions; rows of two n x num_perm arrays are compared pairwise."""
+    result = np.mean(signature_a == signature_b, axis=-1)
+    return float(result) if result.ndim == 0 else result
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def lsh_buckets(signatures: np.ndarray, bands: int) -> Iterator[np.ndarray]:
+    """
+    Row indices of `signatures` (n x num_perm) that share a band, one array
+    per band and bucket with at least two rows. A pair can be in several
+    buckets.
+    """
+    count, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError("num_perm must be a multiple of bands")
+    rows = num_perm // bands
+    for band in range(bands):
+        part = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        # One opaque value per row so the band is bucketed as a whole
+        keys = part.view(np.dtype((np.void, part.dtype.itemsize * rows))).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1], True])
+        for start, end in zip(starts[:-1], starts[1:]):
+            if end - start > 1:
+                yield order[start:end]
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int, max_bucket: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row index pairs (a < b) of `signatures` that share a band, each once.
+
+    Rows of a bucket larger than `max_bucket` are only paired with its
+    first row: a large group of near-identical sets stays connected with
+    a linear number of pairs instead of a quadratic one.
+    """
+    count = len(signatures)
+    firsts, seconds = [], []
+    uppers = {}
+    for bucket in lsh_buckets(signatures, bands):
+        if max_bucket is not None and len(bucket) > max_bucket:
+            firsts.append(np.full(len(bucket) - 1, bucket[0]))
+            seconds.append(bucket[1:])
+            continue
+        upper = uppers.get(len(bucket))
+        if upper is None:
+            upper = uppers[len(bucket)] = np.triu_indices(len(bucket), 1)
+        firsts.append(bucket[upper[0]])
+        seconds.append(bucket[upper[1]])
+    if not firsts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    a, b = np.concatenate(firsts).astype(np.int64), np.concatenate(seconds).astype(np.int64)
+    codes = np.unique(np.minimum(a, b) * count + np.maximum(a, b))
+    return codes // count, codes % count
+
+
+def bands_for_threshold(num_perm: int, threshold: float, recall: float = 0.9) -> int:
+    """
+    Fewest bands (a divisor of num_perm) that make a pair with similarity
+    `threshold` a candidate with probability at least `recall`; fewer bands
+    mean longer ones, so fewer dissimilar pairs to verify.
+    """
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands == 0 and 1 - (1 - threshold ** (num_perm // bands)) ** bands >= recall:
+            return bands
+    return num_perm
+
+
+def verified_pairs(
+    signatures: np.ndarray, a: np.ndarray, b: np.ndarray, threshold: float,
+    similarity: Callable[[int, int], float]
+) -> Iterator[Tuple[int, int, float]]:
+    """
+    (i, j, similarity) of the candidate pairs (a[k], b[k]) whose exact
+    `similarity` is at least `threshold`. Pairs whose signatures estimate
+    a similarity well below it are skipped without computing it.
+    """
+    for start in range(0, len(a), _PAIR_BATCH):
+        part_a, part_b = a[start:start + _PAIR_BATCH], b[start:start + _PAIR_BATCH]
+        close = estimated_similarity(signatures[part_a], signatures[part_b]) >= threshold - _ESTIMATE_MARGIN
+        for i, j in zip(part_a[close].tolist(), part_b[close].tolist()):
+            score = similarity(i, j)
+            if score >= threshold:
+                yield i, j, score
@@ -0,0 +1,28 @@
+import re
+import unicodedata
+from typing import Optional
+
+# Keeps the key indexable on SQL Server (NVARCHAR(400) fits the index key limit)
+SCENARIO_KEY_MAX_LENGTH = 400
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fold_text(value: str) -> str:
+    """Lower-case, strip accents and collapse runs of whitespace."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    without_accents = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", without_accents.casefold()).strip()
+
+
+def normalize_scenario_name(value: Optional[str]) -> Optional[str]:
+    """
+    Lookup key for a scenario name.
+
+    "  Login  Exitoso " and "login exitoso" map to the same key; empty
+    names map to None.
+    """
+    if value is None:
+        return None
+    key = fold_text(value)[:SCENARIO_KEY_MAX_LENGTH]
+    return key or None
@@ -0,0 +1,107 @@
+"""
+Benchmark /dashboard/test-cases-stats: three GROUP BYs vs one aggregate.
+
+Run from the backend directory:
+    python -m benchmarks.bench_dashboard_stats --test-cases 500000
+"""
+import argparse
+import random
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import func, select, insert
+from app.models import (
+    Group, Application, Feature, TestCase,
+    TestCaseStatus, TestCaseType, TestCasePriority
+)
+from app.services.stats_service import count_breakdowns
+
+
+def populate(db, n_test_cases: int, n_features: int = 500) -> str:
+    """Create one application with n_test_cases spread over n_features."""
+    now = datetime.utcnow()
+    group_id, app_id = ids(2)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    feature_ids = ids(n_features)
+    db.execute(insert(Feature), [{
+        "id": fid, "name": f"feature {i}", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    } for i, fid in enumerate(feature_ids)])
+
+    statuses = [s.value for s in TestCaseStatus]
+    types = [t.value for t in TestCaseType]
+    priorities = [p.value for p in TestCasePriority]
+    batch = []
+    for i in range(n_test_cases):
+        batch.append({
+            "id": f"tc{i:09d}", "name": f"test case {i}", "feature_id": random.choice(feature_ids),
+            "status": random.choice(statuses), "type": random.choice(types),
+            "priority": random.choice(priorities), "tags": [],
+            "created_at": now, "updated_at": now,
+        })
+        if len(batch) == 10000:
+            db.execute(insert(TestCase), batch)
+            batch = []
+    if batch:
+        db.execute(insert(TestCase), batch)
+    db.commit()
+    return app_id
+
+
+def legacy_stats(db, app_id: str) -> dict:
+    """The original implementation: one GROUP BY per dimension."""
+    result = {}
+    for name, column in (("status", TestCase.status), ("type", TestCase.type), ("priority", TestCase.priority)):
+        rows = db.query(column, func.count(TestCase.id)).join(Feature).filter(
+            Feature.application_id == app_id
+        ).group_by(column).all()
+        result[name] = {value.value: count for value, count in rows}
+    return result
+
+
+def breakdown_stats(db, app_id: str) -> dict:
+    base = select(TestCase.id).join(Feature).where(Feature.application_id == app_id)
+    breakdown = count_breakdowns(
+        db, base,
+        {"status": TestCase.status, "type": TestCase.type, "priority": TestCase.priority},
+        TestCase.id
+    )
+    return breakdown.groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--test-cases", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    print(f"Populating {args.test_cases} test cases...")
+    app_id = populate(db, args.test_cases)
+
+    assert legacy_stats(db, app_id) == breakdown_stats(db, app_id)
+
+    counter = StatementCounter()
+    legacy_stats(db, app_id)
+    legacy_statements = counter.count
+    counter.reset()
+    breakdown_stats(db, app_id)
+    breakdown_statements = counter.count
+
+    legacy_time = best_of(lambda: legacy_stats(db, app_id), args.repeat)
+    breakdown_time = best_of(lambda: breakdown_stats(db, app_id), args.repeat)
+
+    report(f"test-cases-stats over {args.test_cases} test cases ({db.get_bind().dialect.name})", [
+        ("legacy (GROUP BY x3)", f"{legacy_time * 1000:8.1f} ms  {legacy_statements} statements"),
+        ("count_breakdowns", f"{breakdown_time * 1000:8.1f} ms  {breakdown_statements} statements"),
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
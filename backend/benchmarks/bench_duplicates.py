@@ -0,0 +1,145 @@
+"""
+Benchmark near-duplicate test case detection (python cli.py find-duplicates).
+
+Run from the backend directory:
+    python -m benchmarks.bench_duplicates --test-cases 200000 --workers 4
+
+Creates test cases with synthetic steps documents, --duplicates of them
+copies of another test case with other parameter values or one step
+changed, and reports each phase of the job: signatures (worker
+processes), candidate pairs and verification, clustering and storing.
+All-pairs comparison is timed on a --sample of test cases and scaled to
+the full count, since it grows quadratically.
+"""
+import argparse
+import json
+import random
+import re
+import time
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, report
+from sqlalchemy import insert
+from app.config import settings
+from app.models import Group, Application, Feature, TestCase
+from app.services import test_case_duplicate_service as service
+
+_ACTORS = ["the user", "the admin", "a guest", "the customer", "the operator", "the auditor"]
+_ACTIONS = ["opens", "closes", "selects", "fills", "submits", "clears", "validates", "downloads", "uploads", "reviews"]
+_THINGS = [
+    "the login form", "the search box", "the cart", "the invoice", "the report", "the profile page",
+    "the payment method", "the shipping address", "the order history", "the settings menu",
+]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice("bcdfglmnprstv") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+
+
+def _step(rng: random.Random, keyword: str) -> dict:
+    text = f"{rng.choice(_ACTORS)} {rng.choice(_ACTIONS)} {rng.choice(_THINGS)} on the {_word(rng)} screen"
+    if rng.random() < 0.5:
+        text += f' with "{_word(rng)}" and {rng.randint(1, 99)} items'
+    return {"id": None, "type": keyword, "text": text, "order": 0, "subSteps": []}
+
+
+def make_documents(n: int, n_duplicates: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(n - n_duplicates):
+        steps = [_step(rng, "GIVEN")] + [_step(rng, "AND") for _ in range(rng.randint(2, 8))] + [_step(rng, "THEN")]
+        documents.append(steps)
+    for _ in range(n_duplicates):
+        copy = json.loads(json.dumps(rng.choice(documents[:n - n_duplicates])))
+        if rng.random() < 0.5:
+            # Same steps, other parameter values
+            for step in copy:
+                step["text"] = re.sub(r"\d+", str(rng.randint(1, 99)), re.sub(r'"[^"]*"', f'"{_word(rng)}"', step["text"]))
+        else:
+            copy[rng.randrange(len(copy))] = _step(rng, "AND")
+        documents.append(copy)
+    rng.shuffle(documents)
+    return documents
+
+
+def populate(db, documents: list) -> None:
+    now = datetime.utcnow()
+    group_id, feature_ids = ids(1)[0], ids(20)
+    app_ids = ids(4)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": f"bench {i}", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    } for i, app_id in enumerate(app_ids)])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": f"feature {i}", "application_id": app_ids[i % 4], "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    } for i, feature_id in enumerate(feature_ids)])
+    rows = []
+    for i, (test_case_id, document) in enumerate(zip(ids(len(documents)), documents)):
+        rows.append({
+            "id": test_case_id, "name": test_case_id, "feature_id": feature_ids[i % 20], "application_id": app_ids[i % 20 % 4],
+            "status": "PRODUCTIVE", "type": "AUTOMATED", "priority": "MEDIUM", "tags": [],
+            "steps_document": document, "created_at": now, "updated_at": now,
+        })
+        if len(rows) == 10000:
+            db.execute(insert(TestCase.__table__), rows)
+            rows = []
+    if rows:
+        db.execute(insert(TestCase.__table__), rows)
+    db.commit()
+
+
+def all_pairs(hashes: list, threshold: float) -> int:
+    sets = [set(h.tolist()) for h in hashes]
+    found = 0
+    for i, a in enumerate(sets):
+        for b in sets[i + 1:]:
+            if a and b and len(a & b) / len(a | b) >= threshold:
+                found += 1
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--test-cases", type=int, default=20000)
+    parser.add_argument("--duplicates", type=int, default=None, help="Default: 2%% of the test cases")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+    duplicates = args.duplicates if args.duplicates is not None else args.test_cases // 50
+    threshold = settings.DUPLICATE_THRESHOLD
+
+    reset_schema()
+    db = SessionLocal()
+    populate(db, make_documents(args.test_cases, duplicates))
+
+    start = time.perf_counter()
+    cases, signatures, hashes = service._signatures(
+        db, args.workers, settings.DUPLICATE_BATCH_SIZE, settings.DUPLICATE_SHINGLE_WORDS
+    )
+    signed = time.perf_counter()
+    candidates, pairs = service._verified_pairs(signatures, hashes, threshold)
+    verified = time.perf_counter()
+    clusters, best = service._clusters(pairs)
+    service._store(db, cases, clusters, best, datetime.utcnow())
+    stored = time.perf_counter()
+    db.close()
+
+    sample = min(args.sample, len(hashes))
+    sample_start = time.perf_counter()
+    all_pairs(hashes[:sample], threshold)
+    scaled = (time.perf_counter() - sample_start) * (len(hashes) / max(sample, 1)) ** 2
+    memory = (signatures.nbytes + sum(h.nbytes for h in hashes)) / 2 ** 20
+
+    report(f"find-duplicates, {len(cases)} test cases ({duplicates} near-copies), {args.workers} worker(s)", [
+        ("read + signatures", f"{signed - start:8.1f} s  ({memory:.0f} MB signatures and shingle hashes)"),
+        ("LSH + verification", f"{verified - signed:8.1f} s  {candidates} candidates, {len(pairs)} pairs"),
+        ("clusters + store", f"{stored - verified:8.1f} s  {len(clusters)} clusters"),
+        ("total", f"{stored - start:8.1f} s"),
+        ("all pairs (scaled from sample)", f"{scaled:8.0f} s"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
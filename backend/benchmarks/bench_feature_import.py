@@ -0,0 +1,116 @@
+"""
+Benchmark .feature file imports: ORM rows per scenario vs the bulk import,
+and re-imports where file hashes let unchanged files be skipped.
+
+Run from the backend directory:
+    python -m benchmarks.bench_feature_import --files 100 --scenarios 100
+"""
+import argparse
+import time
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, report
+from sqlalchemy import insert
+from app.models import Group, Application, Feature, TestCase, GherkinStep, GherkinSubStep
+from app.services.feature_file_service import import_feature_files
+from app.services.gherkin_parser import parse_feature
+from app.utils.normalization import normalize_scenario_name
+
+
+def populate(db) -> str:
+    now = datetime.utcnow()
+    group_id, app_id = ids(2)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.commit()
+    return app_id
+
+
+def feature_files(n_files: int, n_scenarios: int) -> list:
+    files = []
+    for f in range(n_files):
+        lines = [f"Feature: Feature {f}\n", "  Background:\n", "    Given the user is logged in\n"]
+        for i in range(n_scenarios):
+            lines.append(
+                f"\n  @smoke\n  Scenario: Scenario {f}-{i}\n"
+                f"    When the user opens item {i}\n"
+                f"      | field | value |\n      | id | {i} |\n"
+                f"    Then the item is shown\n"
+            )
+        files.append((f"features/f{f}.feature", "".join(lines).encode("utf-8")))
+    return files
+
+
+def orm_import(db, app_id: str, files: list) -> None:
+    """Feature, test cases and steps as ORM objects, looking each scenario up first."""
+    for path, content in files:
+        parsed = parse_feature(content.decode("utf-8"))
+        feature = db.query(Feature).filter(Feature.application_id == app_id, Feature.name == parsed.name).first()
+        if feature is None:
+            feature = Feature(name=parsed.name, application_id=app_id, feature_file_path=path)
+            db.add(feature)
+            db.flush()
+        for scenario in parsed.scenarios:
+            db.query(TestCase.id).filter(
+                TestCase.application_id == app_id,
+                TestCase.scenario_key == normalize_scenario_name(scenario.name)
+            ).first()
+            test_case = TestCase(
+                name=scenario.name, scenario_name=scenario.name, description=scenario.description,
+                tags=scenario.tags, feature_id=feature.id
+            )
+            for order, step in enumerate(scenario.steps, start=1):
+                row = GherkinStep(type=step.type, text=step.text, order=order)
+                row.sub_steps = [GherkinSubStep(text=sub.text, order=j) for j, sub in enumerate(step.sub_steps, start=1)]
+                test_case.steps.append(row)
+            db.add(test_case)
+            db.flush()
+        db.commit()
+
+
+def measure(label: str, fn, files: list, reimport: list = None) -> tuple:
+    reset_schema()
+    db = SessionLocal()
+    app_id = populate(db)
+    if reimport is not None:
+        import_feature_files(db, app_id, files)
+        db.commit()
+        files = reimport
+    counter = StatementCounter()
+    counter.reset()
+    start = time.perf_counter()
+    fn(db, app_id, files)
+    elapsed = time.perf_counter() - start
+    count = counter.count
+    db.close()
+    return label, f"{elapsed * 1000:9.1f} ms  {count} statements"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--scenarios", type=int, default=100, help="Scenarios per file")
+    args = parser.parse_args()
+
+    files = feature_files(args.files, args.scenarios)
+    edited = list(files)
+    path, content = edited[0]
+    edited[0] = (path, content.replace(b"Then the item is shown", b"Then the item is listed", 1))
+
+    def bulk(db, app_id, batch):
+        import_feature_files(db, app_id, batch)
+        db.commit()
+
+    report(f"import of {args.files} files x {args.scenarios} scenarios", [
+        measure("ORM objects per scenario", orm_import, files),
+        measure("bulk import", bulk, files),
+        measure("re-import, nothing changed", bulk, files, reimport=files),
+        measure("re-import, one step changed", bulk, files, reimport=edited),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark flaky-test scoring: per-test-case Python loop vs NumPy.
+
+Run from the backend directory:
+    python -m benchmarks.bench_flaky --test-cases 100000 --runs 50 --db-test-cases 5000
+
+The scoring step runs on synthetic arrays of test-cases x runs rows; the
+full refresh (SQL read + scoring + writes) runs on a database populated
+with db-test-cases x runs results.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+
+import numpy as np
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import insert
+from app.config import settings
+from app.models import Group, Application, Feature, TestCase, GitlabPipeline, TestCasePipelineResult
+from app.services.flaky_service import score_histories, refresh_test_case_health
+
+
+def synthetic_history(n_cases: int, runs: int, n_branches: int = 3):
+    """Flat arrays, one row per result, ~10% of test cases flaky."""
+    rng = np.random.default_rng(1)
+    case_codes = np.repeat(np.arange(n_cases), runs)
+    ranks = np.tile(np.arange(1, runs + 1), n_cases)
+    branch_codes = rng.integers(0, n_branches, size=n_cases * runs)
+    fail_probability = np.where(rng.random(n_cases) < 0.1, 0.3, 0.01)
+    failed = rng.random(n_cases * runs) < np.repeat(fail_probability, runs)
+    return case_codes, branch_codes, ranks, failed
+
+
+def python_scores(case_codes, branch_codes, ranks, failed) -> list:
+    """The same metrics, one test case at a time."""
+    rows = sorted(zip(case_codes.tolist(), branch_codes.tolist(), (-ranks).tolist(), failed.tolist()))
+    scores = []
+    for _, history in groupby(rows, key=lambda row: row[0]):
+        history = list(history)
+        runs = len(history)
+        failures = sum(1 for row in history if row[3])
+        pairs = flips = weighted_pairs = weighted_flips = 0.0
+        for previous, current in zip(history, history[1:]):
+            if previous[1] != current[1]:
+                continue
+            weight = 0.5 ** ((-current[2] - 1) / settings.FLAKY_HALF_LIFE_RUNS)
+            pairs += 1
+            weighted_pairs += weight
+            if previous[3] != current[3]:
+                flips += 1
+                weighted_flips += weight
+        confidence = min(1.0, runs / settings.FLAKY_MIN_RUNS)
+        scores.append((
+            flips / pairs if pairs else 0.0,
+            failures / runs,
+            (weighted_flips / weighted_pairs if weighted_pairs else 0.0) * confidence,
+        ))
+    return scores
+
+
+def populate(db, n_test_cases: int, runs: int) -> None:
+    now = datetime.utcnow()
+    group_id, app_id, feature_id = ids(3)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": "feature", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    }])
+    test_case_ids = [f"tc{i:09d}" for i in range(n_test_cases)]
+    db.execute(insert(TestCase), [{
+        "id": tc_id, "name": tc_id, "feature_id": feature_id, "application_id": app_id,
+        "status": "PRODUCTIVE", "type": "AUTOMATED", "priority": "MEDIUM", "tags": [],
+        "created_at": now, "updated_at": now,
+    } for tc_id in test_case_ids])
+    flaky = {tc_id for tc_id in test_case_ids if random.random() < 0.1}
+    for p in range(runs):
+        executed_at = now - timedelta(hours=p)
+        pipeline_id = f"p{p:09d}"
+        db.execute(insert(GitlabPipeline), [{
+            "id": pipeline_id, "gitlab_project_id": "bench", "gitlab_pipeline_id": str(p),
+            "branch": random.choice(["main", "develop"]), "status": "PASSED",
+            "executed_at": executed_at, "created_at": executed_at,
+        }])
+        db.execute(insert(TestCasePipelineResult), [{
+            "id": f"{pipeline_id}-{i}", "test_case_id": tc_id, "pipeline_id": pipeline_id,
+            "status": "FAILED" if random.random() < (0.3 if tc_id in flaky else 0.01) else "PASSED",
+            "created_at": executed_at,
+        } for i, tc_id in enumerate(test_case_ids)])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--test-cases", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--db-test-cases", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    history = synthetic_history(args.test_cases, args.runs)
+    vectorized = score_histories(
+        *history, args.test_cases, settings.FLAKY_MIN_RUNS, settings.FLAKY_HALF_LIFE_RUNS
+    )
+    looped = python_scores(*history)
+    assert np.allclose(vectorized["score"], [score for _, _, score in looped])
+
+    python_time = best_of(lambda: python_scores(*history), 1)
+    numpy_time = best_of(lambda: score_histories(
+        *history, args.test_cases, settings.FLAKY_MIN_RUNS, settings.FLAKY_HALF_LIFE_RUNS
+    ), args.repeat)
+
+    reset_schema()
+    db = SessionLocal()
+    print(f"Populating {args.db_test_cases} test cases x {args.runs} runs...")
+    populate(db, args.db_test_cases, args.runs)
+    counter = StatementCounter()
+    start = time.perf_counter()
+    stats = refresh_test_case_health(db)
+    refresh_time = time.perf_counter() - start
+
+    report(f"Flaky scoring, {args.test_cases} test cases x {args.runs} runs", [
+        ("python loop", f"{python_time * 1000:9.1f} ms"),
+        ("numpy", f"{numpy_time * 1000:9.1f} ms"),
+    ])
+    report(f"refresh_test_case_health, {args.db_test_cases} x {args.runs} ({db.get_bind().dialect.name})", [
+        ("total", f"{refresh_time * 1000:9.1f} ms  {counter.count} statements"),
+        ("results read", str(stats["results"])),
+        ("flaky", str(stats["flaky"])),
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the GitLab pipeline sync against the local stub server.
+
+Run from the backend directory:
+    python -m benchmarks.bench_gitlab_sync --projects 4 --pipelines 500 --latency-ms 20
+
+Compares one request at a time with the pooled client at
+GITLAB_SYNC_CONCURRENCY, then runs an incremental sync after a few
+pipelines changed. The stub throttles every 50th request (429) to
+exercise the retries.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import SessionLocal, reset_schema, StatementCounter, report
+from benchmarks.gitlab_stub import GitlabStub, serve
+from app.config import settings
+from app.models import GitlabPipeline, GitlabSyncState
+from app.services.gitlab_sync_service import sync_gitlab_pipelines
+
+
+def run_sync(project_ids) -> tuple:
+    start = time.perf_counter()
+    stats = asyncio.run(sync_gitlab_pipelines(project_ids, session_factory=SessionLocal))
+    return time.perf_counter() - start, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=4)
+    parser.add_argument("--pipelines", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=settings.GITLAB_SYNC_CONCURRENCY)
+    args = parser.parse_args()
+
+    project_ids = [str(100 + i) for i in range(args.projects)]
+    stub = GitlabStub(project_ids, args.pipelines, latency=args.latency_ms / 1000, throttle_every=50)
+    server = serve(stub)
+    settings.GITLAB_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    settings.GITLAB_SYNC_INITIAL_DAYS = 365 * 10
+
+    rows = []
+    for concurrency in (1, args.concurrency):
+        reset_schema()
+        settings.GITLAB_SYNC_CONCURRENCY = concurrency
+        stub.requests = 0
+        counter = StatementCounter()
+        elapsed, stats = run_sync(project_ids)
+        db = SessionLocal()
+        stored = db.query(GitlabPipeline).count()
+        db.close()
+        assert stored == args.projects * args.pipelines, stored
+        rows.append((f"full sync, concurrency {concurrency}",
+                     f"{elapsed * 1000:9.1f} ms  {stats['requests']} requests  {counter.count} statements"))
+
+    # Incremental: only changed and new pipelines are fetched
+    for project_id in project_ids:
+        stub.touch(project_id, 10)
+        stub.add(project_id, 5)
+    elapsed, stats = run_sync(project_ids)
+    changed = sum(project["pipelines"] for project in stats["projects"].values())
+    rows.append(("incremental sync", f"{elapsed * 1000:9.1f} ms  {stats['requests']} requests  {changed} pipelines"))
+
+    db = SessionLocal()
+    assert all(state.updated_after for state in db.query(GitlabSyncState))
+    db.close()
+    server.shutdown()
+
+    report(f"GitLab sync, {args.projects} projects x {args.pipelines} pipelines, "
+           f"{args.latency_ms:.0f} ms latency, {stub.throttled} throttled", rows)
+
+
+if __name__ == "__main__":
+    main()
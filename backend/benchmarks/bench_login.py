@@ -0,0 +1,89 @@
+"""
+Benchmark login throughput and how much a login burst slows other routes.
+
+Fires `--logins` concurrent logins while pinging /api/health, then
+reports logins/s and health-check latency. Set BCRYPT_ROUNDS and
+PASSWORD_HASH_WORKERS in the environment to compare configurations.
+
+Run from the backend directory:
+    python -m benchmarks.bench_login --logins 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import SessionLocal, reset_schema, report
+import httpx
+from app.main import app
+from app.models import User, UserRole
+from app.services.auth_service import hash_password
+from app.services.password_hasher import password_hasher
+
+
+async def ping_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def run(logins: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        latencies: list = []
+        pinger = asyncio.create_task(ping_health(client, stop, latencies))
+        await asyncio.sleep(0.1)
+        idle = list(latencies)
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/auth/login", json={"email": "bench@docudash.com", "password": "bench123"})
+            for _ in range(logins)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await pinger
+
+    statuses = [r.status_code for r in responses]
+    busy = latencies[len(idle):]
+    return {
+        "elapsed": elapsed,
+        "ok": statuses.count(200),
+        "rejected": statuses.count(503),
+        "health_p50": statistics.median(busy) if busy else 0.0,
+        "health_max": max(busy) if busy else 0.0,
+        "health_samples": len(busy),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    db.add(User(
+        email="bench@docudash.com", password=hash_password("bench123"),
+        first_name="Bench", last_name="User", role=UserRole.USER
+    ))
+    db.commit()
+    db.close()
+
+    result = asyncio.run(run(args.logins))
+    stats = password_hasher.stats()
+    report(f"{args.logins} concurrent logins ({password_hasher.workers} hashing workers)", [
+        ("throughput", f"{result['ok'] / result['elapsed']:.1f} logins/s ({result['ok']} ok, {result['rejected']} rejected)"),
+        ("wall time", f"{result['elapsed']:.2f} s"),
+        ("bcrypt run time", f"{stats['avgRunMs']} ms avg"),
+        ("hash queue wait", f"{stats['avgWaitMs']} ms avg, {stats['maxWaitMs']} ms max"),
+        ("/api/health during burst", f"{result['health_p50'] * 1000:.1f} ms p50, {result['health_max'] * 1000:.1f} ms max"
+                                     f" ({result['health_samples']} samples)"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark /pipelines/{id}/diff: SQL set operations vs loading both
+result sets into Python.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline_diff --results 50000
+
+Two pipelines share most scenarios; a few percent change status, appear,
+disappear or get slower.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import insert
+from app.config import settings
+from app.models import Group, Application, Feature, TestCase, GitlabPipeline, TestCasePipelineResult
+from app.services.pipeline_diff_service import CATEGORIES, diff_pipelines
+
+
+def populate(db, n_results: int) -> tuple:
+    now = datetime.utcnow()
+    group_id, app_id, feature_id = ids(3)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": "feature", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    }])
+    n_test_cases = int(n_results * 1.02)
+    test_case_ids = [f"tc{i:09d}" for i in range(n_test_cases)]
+    db.execute(insert(TestCase), [{
+        "id": tc_id, "name": tc_id, "feature_id": feature_id, "application_id": app_id,
+        "status": "PRODUCTIVE", "type": "AUTOMATED", "priority": "MEDIUM", "tags": [],
+        "created_at": now, "updated_at": now,
+    } for tc_id in test_case_ids])
+
+    rng = random.Random(7)
+    previous = {tc_id: ("PASSED" if rng.random() > 0.03 else "FAILED", rng.randint(1, 120))
+                for tc_id in test_case_ids[:n_results]}
+    current = {}
+    for tc_id, (status, duration) in previous.items():
+        if rng.random() < 0.01:
+            continue  # missing
+        if rng.random() < 0.03:
+            status = "FAILED" if status == "PASSED" else "PASSED"
+        if rng.random() < 0.02:
+            duration = duration * 3 + 10
+        current[tc_id] = (status, duration)
+    for tc_id in test_case_ids[n_results:]:
+        current[tc_id] = ("PASSED", rng.randint(1, 120))
+
+    pipeline_ids = []
+    for p, results in enumerate((previous, current)):
+        executed_at = now - timedelta(hours=2 - p)
+        pipeline_id = f"p{p:09d}"
+        pipeline_ids.append(pipeline_id)
+        db.execute(insert(GitlabPipeline), [{
+            "id": pipeline_id, "gitlab_project_id": "bench", "gitlab_pipeline_id": str(p),
+            "branch": "main", "status": "PASSED", "executed_at": executed_at, "created_at": executed_at,
+        }])
+        db.execute(insert(TestCasePipelineResult), [{
+            "id": f"{pipeline_id}-{tc_id}", "test_case_id": tc_id, "pipeline_id": pipeline_id,
+            "status": status, "duration": duration, "created_at": executed_at,
+        } for tc_id, (status, duration) in results.items()])
+    db.commit()
+    return pipeline_ids[1], pipeline_ids[0]
+
+
+def python_diff(db, pipeline_id: str, against_id: str) -> dict:
+    """Load both result sets and compare them in Python (totals only)."""
+    def load(pid):
+        return {
+            result.test_case_id: result for result in
+            db.query(TestCasePipelineResult).filter(TestCasePipelineResult.pipeline_id == pid)
+        }
+    current, previous = load(pipeline_id), load(against_id)
+    totals = {category: 0 for category in CATEGORIES}
+    for tc_id in current.keys() | previous.keys():
+        cur, prev = current.get(tc_id), previous.get(tc_id)
+        if prev is None:
+            totals["new"] += 1
+            continue
+        if cur is None:
+            totals["missing"] += 1
+            continue
+        if cur.status.value == "FAILED" and prev.status.value != "FAILED":
+            totals["newlyFailing"] += 1
+        elif cur.status.value == "PASSED" and prev.status.value == "FAILED":
+            totals["newlyPassing"] += 1
+        if (cur.duration is not None and prev.duration is not None
+                and cur.duration > prev.duration * (1 + settings.DIFF_DURATION_REGRESSION_RATIO)
+                and cur.duration - prev.duration >= settings.DIFF_DURATION_REGRESSION_MIN_SECONDS):
+            totals["durationRegressed"] += 1
+    db.expunge_all()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=50_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    print(f"Populating two pipelines with {args.results} results each...")
+    pipeline_id, against_id = populate(db, args.results)
+
+    assert python_diff(db, pipeline_id, against_id) == diff_pipelines(db, pipeline_id, against_id, args.limit)["summary"]
+
+    counter = StatementCounter()
+    python_time = best_of(lambda: python_diff(db, pipeline_id, against_id), args.repeat)
+    python_statements = counter.count // args.repeat
+    counter.reset()
+    sql_time = best_of(lambda: diff_pipelines(db, pipeline_id, against_id, args.limit), args.repeat)
+    sql_statements = counter.count // args.repeat
+
+    report(f"pipeline diff, {args.results} results per pipeline ({db.get_bind().dialect.name})", [
+        ("python (load both)", f"{python_time * 1000:8.1f} ms  {python_statements} statements"),
+        ("sql set operations", f"{sql_time * 1000:8.1f} ms  {sql_statements} statements"),
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark POST /pipelines/results: per-row lookups vs set-based ingestion.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline_ingest --results 10000
+"""
+import argparse
+import random
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import func, insert
+from app.models import (
+    Group, Application, Feature, TestCase, GitlabPipeline, TestCasePipelineResult,
+    PipelineStatus, TestCaseResultStatus
+)
+from app.schemas.pipeline import RegisterPipelineResult
+from app.services.pipeline_ingest_service import ingest_pipeline_results
+
+PROJECT_ID = "bench"
+
+
+def populate(db, n_test_cases: int, n_features: int = 100) -> None:
+    """Create one application with n_test_cases, each with a unique scenario name."""
+    now = datetime.utcnow()
+    group_id, app_id = ids(2)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "gitlab_project_id": PROJECT_ID, "created_at": now, "updated_at": now,
+    }])
+    feature_ids = ids(n_features)
+    db.execute(insert(Feature), [{
+        "id": fid, "name": f"feature {i}", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    } for i, fid in enumerate(feature_ids)])
+    db.execute(insert(TestCase), [{
+        "id": f"tc{i:09d}", "name": f"test case {i}", "scenario_name": f"Scenario {i}",
+        "scenario_key": f"scenario {i}", "application_id": app_id,
+        "feature_id": random.choice(feature_ids), "status": "PRODUCTIVE", "type": "AUTOMATED",
+        "priority": "MEDIUM", "tags": [], "created_at": now, "updated_at": now,
+    } for i in range(n_test_cases)])
+    db.commit()
+
+
+def payload(pipeline_id: str, n_results: int) -> RegisterPipelineResult:
+    statuses = [s.value for s in TestCaseResultStatus]
+    return RegisterPipelineResult(**{
+        "gitlabProjectId": PROJECT_ID,
+        "gitlabPipelineId": pipeline_id,
+        "pipelineStatus": "PASSED",
+        "testResults": [{
+            "scenarioName": f"scenario {i}",
+            "status": random.choice(statuses),
+            "duration": random.randint(1, 300),
+        } for i in range(n_results)],
+    })
+
+
+def legacy_ingest(db, data: RegisterPipelineResult) -> None:
+    """The original implementation: two queries per result, ORM unit of work."""
+    pipeline = db.query(GitlabPipeline).filter(
+        GitlabPipeline.gitlab_project_id == data.gitlab_project_id,
+        GitlabPipeline.gitlab_pipeline_id == data.gitlab_pipeline_id
+    ).first()
+    if pipeline:
+        pipeline.status = data.pipeline_status or PipelineStatus.PASSED
+    else:
+        pipeline = GitlabPipeline(
+            gitlab_project_id=data.gitlab_project_id,
+            gitlab_pipeline_id=data.gitlab_pipeline_id,
+            branch=data.branch or "main",
+            status=data.pipeline_status or PipelineStatus.PASSED,
+            executed_at=datetime.utcnow()
+        )
+        db.add(pipeline)
+        db.commit()
+        db.refresh(pipeline)
+
+    for result_data in data.test_results:
+        test_case = db.query(TestCase).filter(
+            func.lower(TestCase.scenario_name) == result_data.scenario_name.lower()
+        ).first()
+        if test_case:
+            existing_result = db.query(TestCasePipelineResult).filter(
+                TestCasePipelineResult.test_case_id == test_case.id,
+                TestCasePipelineResult.pipeline_id == pipeline.id
+            ).first()
+            if existing_result:
+                existing_result.status = result_data.status
+                if result_data.duration:
+                    existing_result.duration = result_data.duration
+            else:
+                db.add(TestCasePipelineResult(
+                    test_case_id=test_case.id,
+                    pipeline_id=pipeline.id,
+                    status=result_data.status,
+                    duration=result_data.duration
+                ))
+    db.commit()
+
+
+def measure(fn, n_results: int, repeat: int, counter: StatementCounter) -> dict:
+    """Best time and statement count of a first post (inserts) and a re-post (updates)."""
+    best = {}
+    for run in range(repeat):
+        data = payload(f"{fn.__name__}-{run}", n_results)
+        for phase in ("insert", "update"):
+            db = SessionLocal()
+            counter.reset()
+            elapsed = best_of(lambda: fn(db, data), 1)
+            best[phase] = min(best.get(phase, elapsed), elapsed)
+            best[f"{phase}_statements"] = counter.count
+            db.close()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    print(f"Populating {args.results} test cases...")
+    populate(db, args.results)
+    dialect = db.get_bind().dialect.name
+    db.close()
+
+    counter = StatementCounter()
+    legacy = measure(legacy_ingest, args.results, args.repeat, counter)
+    bulk = measure(ingest_pipeline_results, args.results, args.repeat, counter)
+
+    report(f"pipeline ingestion of {args.results} results ({dialect})", [
+        ("legacy, new pipeline", f"{legacy['insert'] * 1000:9.1f} ms  {legacy['insert_statements']} statements"),
+        ("legacy, re-post", f"{legacy['update'] * 1000:9.1f} ms  {legacy['update_statements']} statements"),
+        ("set-based, new pipeline", f"{bulk['insert'] * 1000:9.1f} ms  {bulk['insert_statements']} statements"),
+        ("set-based, re-post", f"{bulk['update'] * 1000:9.1f} ms  {bulk['update_statements']} statements"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
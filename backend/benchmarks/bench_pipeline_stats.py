@@ -0,0 +1,103 @@
+"""
+Benchmark /dashboard/pipeline-stats: raw result scan vs rollup tables.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline_stats --results 600000 --days 14
+
+Rollups pay off when each test case runs several times per bucket; the
+defaults give about 20 pipelines a day.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import func, insert
+from app.models import (
+    Group, Application, Feature, TestCase, GitlabPipeline, TestCasePipelineResult, TestCaseResultStatus
+)
+from app.services.rollup_service import backfill_rollups, rollup_status_counts
+
+
+def populate(db, n_results: int, n_test_cases: int = 2000, days: int = 90) -> None:
+    """Spread n_results over `days` days, one pipeline per n_test_cases results."""
+    now = datetime.utcnow()
+    group_id, app_id, feature_id = ids(3)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": "feature", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    }])
+    test_case_ids = [f"tc{i:09d}" for i in range(n_test_cases)]
+    db.execute(insert(TestCase), [{
+        "id": tc_id, "name": tc_id, "feature_id": feature_id, "application_id": app_id,
+        "status": "PRODUCTIVE", "type": "AUTOMATED", "priority": "MEDIUM", "tags": [],
+        "created_at": now, "updated_at": now,
+    } for tc_id in test_case_ids])
+
+    statuses = [s.value for s in TestCaseResultStatus]
+    n_pipelines = max(1, n_results // n_test_cases)
+    for p in range(n_pipelines):
+        executed_at = now - timedelta(seconds=random.randint(0, days * 86400))
+        pipeline_id = f"p{p:09d}"
+        db.execute(insert(GitlabPipeline), [{
+            "id": pipeline_id, "gitlab_project_id": "bench", "gitlab_pipeline_id": str(p),
+            "branch": "main", "status": "PASSED", "executed_at": executed_at, "created_at": executed_at,
+        }])
+        db.execute(insert(TestCasePipelineResult), [{
+            "id": f"{pipeline_id}-{i}", "test_case_id": tc_id, "pipeline_id": pipeline_id,
+            "status": random.choice(statuses), "duration": random.randint(1, 300), "created_at": executed_at,
+        } for i, tc_id in enumerate(test_case_ids)])
+    db.commit()
+
+
+def legacy_counts(db, start: datetime) -> dict:
+    """The original query: GROUP BY status over raw results in the window."""
+    rows = db.query(
+        TestCasePipelineResult.status, func.count(TestCasePipelineResult.id)
+    ).filter(TestCasePipelineResult.created_at >= start).group_by(TestCasePipelineResult.status).all()
+    return {status: count for status, count in rows}
+
+
+def rollup_counts(db, start: datetime) -> dict:
+    return {status: count for status, count in rollup_status_counts(db, start).items() if count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", type=int, default=600_000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    print(f"Populating {args.results} results over {args.days} days...")
+    populate(db, args.results, days=args.days)
+    print("Building rollups...")
+    backfill_rollups(db)
+
+    # Align to the hour: rollups are exact to the hour
+    start = (datetime.utcnow() - timedelta(days=args.days)).replace(minute=0, second=0, microsecond=0)
+    assert legacy_counts(db, start) == rollup_counts(db, start)
+
+    counter = StatementCounter()
+    legacy_time = best_of(lambda: legacy_counts(db, start), args.repeat)
+    legacy_statements = counter.count // args.repeat
+    counter.reset()
+    rollup_time = best_of(lambda: rollup_counts(db, start), args.repeat)
+    rollup_statements = counter.count // args.repeat
+
+    report(f"pipeline-stats results by status, {args.results} results / {args.days} days ({db.get_bind().dialect.name})", [
+        ("raw results", f"{legacy_time * 1000:8.1f} ms  {legacy_statements} statements"),
+        ("rollups", f"{rollup_time * 1000:8.1f} ms  {rollup_statements} statements"),
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark /applications/{id}/result-matrix against building the same
+heatmap from /test-cases/{id}/results, one call per test case.
+
+Run from the backend directory:
+    python -m benchmarks.bench_result_matrix --test-cases 2000 --pipelines 50
+"""
+import argparse
+import json
+
+from benchmarks.common import SessionLocal, reset_schema, StatementCounter, best_of, report
+from benchmarks.bench_pipeline_stats import populate
+from app.models import Application, TestCase
+from app.services.result_matrix_service import build_result_matrix
+
+
+def per_test_case(db, app_id: str, last: int) -> str:
+    """What the frontend does today: the latest results of each test case, one request each."""
+    payload = []
+    for (tc_id,) in db.query(TestCase.id).filter(TestCase.application_id == app_id):
+        tc = db.query(TestCase).filter(TestCase.id == tc_id).first()
+        payload.append([{
+            "id": pr.id, "status": pr.status.value, "duration": pr.duration,
+            "pipeline": {"id": pr.pipeline.id, "branch": pr.pipeline.branch}
+        } for pr in sorted(tc.pipeline_results, key=lambda x: x.created_at, reverse=True)[:last]])
+    db.expunge_all()
+    return json.dumps(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--test-cases", type=int, default=2000)
+    parser.add_argument("--pipelines", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    print(f"Populating {args.test_cases} test cases x {args.pipelines} pipelines...")
+    populate(db, args.test_cases * args.pipelines, n_test_cases=args.test_cases)
+    app_id = db.query(Application.id).scalar()
+
+    counter = StatementCounter()
+    # Slow enough that one run is representative
+    legacy_size = 0
+
+    def legacy():
+        nonlocal legacy_size
+        legacy_size = len(per_test_case(db, app_id, args.pipelines))
+    legacy_time = best_of(legacy, 1)
+    legacy_statements = counter.count
+    counter.reset()
+    matrix_time = best_of(lambda: build_result_matrix(db, app_id, args.pipelines), args.repeat)
+    matrix_statements = counter.count // args.repeat
+    matrix_size = len(json.dumps(build_result_matrix(db, app_id, args.pipelines)))
+
+    report(f"result matrix, {args.test_cases} test cases x {args.pipelines} pipelines ({db.get_bind().dialect.name})", [
+        ("per test case", f"{legacy_time * 1000:8.1f} ms  {legacy_statements} statements  {legacy_size / 1024:8.0f} KB"),
+        ("result-matrix", f"{matrix_time * 1000:8.1f} ms  {matrix_statements} statements  {matrix_size / 1024:8.0f} KB"),
+    ])
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark step suggestions: scoring every library template per query vs
+the trigram index, and all-pairs comparison vs MinHash/LSH for the
+near-duplicate report.
+
+Run from the backend directory:
+    python -m benchmarks.bench_step_suggest --templates 50000
+
+Fills step_library with synthetic templates, some of them near-duplicates
+(a word changed or dropped), and reports time per suggestion and for one
+duplicates report (all-pairs on a --pair-templates sample, which grows
+quadratically).
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, best_of, report
+from sqlalchemy import insert
+from app.models import StepLibraryEntry
+from app.services.step_library_service import StepSuggestionIndex, step_template, template_key, trigrams
+from app.utils.minhash import jaccard
+
+_SUBJECTS = ["the user", "the admin", "a guest", "the customer", "the operator", "the system"]
+_VERBS = ["opens", "closes", "selects", "fills", "submits", "clears", "validates", "downloads", "uploads", "reviews"]
+_OBJECTS = [
+    "the login form", "the search box", "the cart", "the invoice", "the report", "the profile page",
+    "the payment method", "the shipping address", "the order history", "the settings menu",
+]
+_ENDINGS = [
+    "", "with {string}", "with {int} items", "in the {string} section", "and waits {int} seconds",
+    "from the main menu", "using the keyboard", "after logging in", "without saving", "twice",
+]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice("bcdfglmnprstv") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+
+
+def make_templates(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    templates = {}
+    while len(templates) < n:
+        words = [rng.choice(_SUBJECTS), rng.choice(_VERBS), rng.choice(_OBJECTS), rng.choice(_ENDINGS)]
+        words.append(f"on the {_word(rng)} {rng.choice(['screen', 'tab', 'dialog', 'panel'])}")
+        text = " ".join(word for word in words if word)
+        if rng.random() < 0.1:
+            # Near-duplicate: one word dropped
+            parts = text.split()
+            del parts[rng.randrange(1, len(parts))]
+            text = " ".join(parts)
+        template = step_template(text)
+        templates[template_key(template)] = template
+    return list(templates.items())
+
+
+def populate(db, templates: list) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"key": key, "template": template, "usage_count": random.Random(key).randint(1, 50), "updated_at": now}
+        for key, template in templates
+    ]
+    for start in range(0, len(rows), 5000):
+        db.execute(insert(StepLibraryEntry.__table__), rows[start:start + 5000])
+    db.commit()
+
+
+def scan(entries: list, text: str, limit: int) -> list:
+    """Score every template, as a query without an index would."""
+    grams = trigrams(step_template(text))
+    scored = []
+    for template, template_grams in entries:
+        shared = len(grams & template_grams)
+        if shared / len(grams) >= 0.5:
+            scored.append((-shared / len(grams), -jaccard(grams, template_grams), template))
+    return [template for _, _, template in sorted(scored)[:limit]]
+
+
+def all_pairs(entries: list, threshold: float) -> set:
+    pairs = set()
+    for i, (a, grams_a) in enumerate(entries):
+        for b, grams_b in entries[i + 1:]:
+            if jaccard(grams_a, grams_b) >= threshold:
+                pairs.add(frozenset((a, b)))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", type=int, default=50000)
+    parser.add_argument("--pair-templates", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    templates = make_templates(args.templates)
+    reset_schema()
+    db = SessionLocal()
+    populate(db, templates)
+
+    index = StepSuggestionIndex(refresh_seconds=0)
+    start = time.perf_counter()
+    index.refresh(db)
+    load = time.perf_counter() - start
+    db.close()
+
+    entries = [(template, trigrams(template)) for _, template in templates]
+    rng = random.Random(2)
+    queries = [" ".join(rng.choice(templates)[1].split()[:rng.randint(2, 5)]) for _ in range(args.queries)]
+
+    scan_time = best_of(lambda: [scan(entries, q, 10) for q in queries], 3)
+    index_time = best_of(lambda: [index.suggest(q, 10, 0.5) for q in queries], 3)
+    report(f"GET /steps/suggest, {args.templates} templates (index loaded in {load:.1f}s)", [
+        ("scan every template", f"{scan_time * 1000 / args.queries:8.2f} ms per query"),
+        ("trigram index", f"{index_time * 1000 / args.queries:8.2f} ms per query"),
+    ])
+
+    sample = entries[:args.pair_templates]
+    sample_index = StepSuggestionIndex(refresh_seconds=0)
+    db = SessionLocal()
+    db.query(StepLibraryEntry).filter(
+        StepLibraryEntry.key.notin_([key for key, _ in templates[:args.pair_templates]])
+    ).delete(synchronize_session=False)
+    db.commit()
+    sample_index.refresh(db)
+    db.close()
+
+    start = time.perf_counter()
+    exact = all_pairs(sample, args.threshold)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    found = sample_index.similar_pairs(args.threshold, len(sample) ** 2)
+    lsh_time = time.perf_counter() - start
+    found = {frozenset(step["template"] for step in pair["steps"]) for pair in found}
+    recall = len(found & exact) / len(exact) if exact else 1.0
+    report(f"GET /steps/duplicates, {len(sample)} templates, threshold {args.threshold}", [
+        ("all pairs", f"{exact_time:8.2f} s  {len(exact)} pairs"),
+        ("MinHash + LSH", f"{lsh_time:8.2f} s  {len(found)} pairs  recall {recall:.1%}"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
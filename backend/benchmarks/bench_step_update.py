@@ -0,0 +1,118 @@
+"""
+Benchmark PUT /test-cases/{id}/steps: delete-and-reinsert vs diff.
+
+Run from the backend directory:
+    python -m benchmarks.bench_step_update --steps 60 --sub-steps 2
+
+Edits one word of one step of a scenario, sending the steps back with
+their IDs (as the editor does), and reports statements (round trips)
+and time for both implementations.
+"""
+import argparse
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import insert
+from app.models import Group, Application, Feature, TestCase, GherkinStep, GherkinSubStep
+from app.schemas.test_case import UpdateStepsRequest
+from app.services.test_case_steps_service import update_steps, serialize_steps
+
+
+def populate(db) -> str:
+    now = datetime.utcnow()
+    group_id, app_id, feature_id, test_case_id = ids(4)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": "feature", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(TestCase), [{
+        "id": test_case_id, "name": "scenario", "feature_id": feature_id, "application_id": app_id,
+        "status": "PRODUCTIVE", "type": "AUTOMATED", "priority": "MEDIUM", "tags": [],
+        "created_at": now, "updated_at": now,
+    }])
+    db.commit()
+    return test_case_id
+
+
+def legacy_update(db, test_case_id: str, steps_data: UpdateStepsRequest) -> list:
+    """The original endpoint body."""
+    tc = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    db.query(GherkinStep).filter(GherkinStep.test_case_id == test_case_id).delete()
+    db.commit()
+    for idx, step_data in enumerate(steps_data.steps):
+        step = GherkinStep(
+            test_case_id=test_case_id, type=step_data.type, text=step_data.text,
+            order=step_data.order or idx + 1
+        )
+        db.add(step)
+        db.commit()
+        db.refresh(step)
+        if step_data.sub_steps:
+            for sub_idx, sub_data in enumerate(step_data.sub_steps):
+                db.add(GherkinSubStep(step_id=step.id, text=sub_data.text, order=sub_data.order or sub_idx + 1))
+    db.commit()
+    db.refresh(tc)
+    return serialize_steps(tc.steps)
+
+
+def diff_update(db, test_case_id: str, steps_data: UpdateStepsRequest) -> list:
+    db.query(TestCase.id).filter(TestCase.id == test_case_id).first()
+    steps = update_steps(db, test_case_id, steps_data.steps)
+    db.commit()
+    return steps
+
+
+def edit_one_word(steps: list, round_: int) -> UpdateStepsRequest:
+    steps = [dict(step) for step in steps]
+    middle = len(steps) // 2
+    steps[middle]["text"] = f"the user edits word {round_}"
+    return UpdateStepsRequest(steps=steps)
+
+
+def run(update, n_steps: int, n_sub_steps: int, repeat: int) -> tuple:
+    reset_schema()
+    db = SessionLocal()
+    test_case_id = populate(db)
+    steps = update(db, test_case_id, UpdateStepsRequest(steps=[{
+        "type": "GIVEN" if i == 0 else "AND", "text": f"step number {i}",
+        "subSteps": [{"text": f"sub-step {i}.{j}"} for j in range(n_sub_steps)],
+    } for i in range(n_steps)]))
+    db.close()
+
+    counter = StatementCounter()
+    rounds = iter(range(repeat))
+
+    def edit():
+        nonlocal steps
+        db = SessionLocal()
+        steps = update(db, test_case_id, edit_one_word(steps, next(rounds)))
+        db.close()
+    elapsed = best_of(edit, repeat)
+    statements = counter.count // repeat
+    assert len(steps) == n_steps and all(len(step["subSteps"]) == n_sub_steps for step in steps)
+    return elapsed, statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=60)
+    parser.add_argument("--sub-steps", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy_time, legacy_statements = run(legacy_update, args.steps, args.sub_steps, args.repeat)
+    diff_time, diff_statements = run(diff_update, args.steps, args.sub_steps, args.repeat)
+
+    report(f"one-word edit of a {args.steps}-step scenario, {args.sub_steps} sub-steps each", [
+        ("delete and reinsert", f"{legacy_time * 1000:8.1f} ms  {legacy_statements} statements"),
+        ("diff, single flush", f"{diff_time * 1000:8.1f} ms  {diff_statements} statements"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
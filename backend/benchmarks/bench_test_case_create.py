@@ -0,0 +1,112 @@
+"""
+Benchmark test case creation: commit and refresh per step vs pre-generated
+IDs and bulk inserts.
+
+Run from the backend directory:
+    python -m benchmarks.bench_test_case_create --test-cases 200 --steps 10 --sub-steps 2
+"""
+import argparse
+import time
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, report
+from sqlalchemy import insert
+from app.models import Group, Application, Feature, TestCase, GherkinStep, GherkinSubStep
+from app.schemas.test_case import TestCaseCreate
+from app.services.test_case_create_service import create_test_cases
+
+
+def populate(db) -> str:
+    now = datetime.utcnow()
+    group_id, app_id, feature_id = ids(3)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": "feature", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    }])
+    db.commit()
+    return feature_id
+
+
+def payloads(feature_id: str, n: int, n_steps: int, n_sub_steps: int) -> list:
+    return [TestCaseCreate(**{
+        "name": f"test case {i}", "featureId": feature_id, "scenarioName": f"Scenario {i}",
+        "steps": [{
+            "type": "GIVEN" if s == 0 else "AND", "text": f"step {s}",
+            "subSteps": [{"text": f"sub-step {s}.{j}"} for j in range(n_sub_steps)],
+        } for s in range(n_steps)],
+    }) for i in range(n)]
+
+
+def legacy_create(db, tc_data: TestCaseCreate) -> None:
+    """The original endpoint body (validation queries included)."""
+    db.query(Feature).filter(Feature.id == tc_data.feature_id).first()
+    db.query(TestCase.id).filter(TestCase.scenario_key == tc_data.scenario_name.lower()).first()
+    new_tc = TestCase(
+        name=tc_data.name, type=tc_data.type, priority=tc_data.priority, status=tc_data.status,
+        feature_id=tc_data.feature_id, tags=tc_data.tags or [], scenario_name=tc_data.scenario_name
+    )
+    db.add(new_tc)
+    db.commit()
+    db.refresh(new_tc)
+    for idx, step_data in enumerate(tc_data.steps):
+        step = GherkinStep(test_case_id=new_tc.id, type=step_data.type, text=step_data.text, order=idx + 1)
+        db.add(step)
+        db.commit()
+        db.refresh(step)
+        for sub_idx, sub_data in enumerate(step_data.sub_steps):
+            db.add(GherkinSubStep(step_id=step.id, text=sub_data.text, order=sub_idx + 1))
+    db.commit()
+    db.refresh(new_tc)
+    [step.sub_steps for step in new_tc.steps]
+
+
+def measure(label: str, fn, n: int, args) -> tuple:
+    reset_schema()
+    db = SessionLocal()
+    feature_id = populate(db)
+    items = payloads(feature_id, n, args.steps, args.sub_steps)
+    counter = StatementCounter()
+    counter.reset()
+    start = time.perf_counter()
+    fn(db, items)
+    elapsed = time.perf_counter() - start
+    assert db.query(TestCase).count() == n
+    db.close()
+    return label, f"{elapsed * 1000:9.1f} ms  {counter.count} statements  ({elapsed * 1000 / n:.2f} ms per case)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--test-cases", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--sub-steps", type=int, default=2)
+    parser.add_argument("--bulk", type=int, default=5000)
+    args = parser.parse_args()
+
+    def legacy(db, items):
+        for item in items:
+            legacy_create(db, item)
+
+    def one_by_one(db, items):
+        for item in items:
+            create_test_cases(db, [item])
+            db.commit()
+
+    def bulk(db, items):
+        create_test_cases(db, items)
+        db.commit()
+
+    report(f"test case creation, {args.steps} steps x {args.sub_steps} sub-steps each", [
+        measure(f"commit per step, {args.test_cases} cases", legacy, args.test_cases, args),
+        measure(f"bulk inserts, {args.test_cases} cases one by one", one_by_one, args.test_cases, args),
+        measure(f"POST /test-cases/bulk, {args.bulk} cases", bulk, args.bulk, args),
+    ])
+
+
+if __name__ == "__main__":
+    main()
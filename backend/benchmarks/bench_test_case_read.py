@@ -0,0 +1,111 @@
+"""
+Benchmark reading one test case's steps: step tables through the ORM
+relationships vs the stored steps document.
+
+Run from the backend directory:
+    python -m benchmarks.bench_test_case_read --steps 30 --sub-steps 3
+
+Reads the steps of random test cases (as GET /test-cases/{id}/steps
+does), one session per read, and reports time and statements per read.
+"""
+import argparse
+import random
+from datetime import datetime
+
+from benchmarks.common import SessionLocal, reset_schema, ids, StatementCounter, best_of, report
+from sqlalchemy import insert
+from app.models import Group, Application, Feature, TestCase, GherkinStepType
+from app.services.test_case_create_service import build_step_rows, insert_rows
+from app.services.test_case_steps_service import serialize_step_rows, serialize_steps
+
+
+class _Step:
+    def __init__(self, index: int, n_sub_steps: int):
+        self.type = GherkinStepType.GIVEN if index == 0 else GherkinStepType.AND
+        self.text = f"step number {index} of the scenario"
+        self.order = None
+        self.sub_steps = [_SubStep(f"| value {index} | {j} |") for j in range(n_sub_steps)]
+
+
+class _SubStep:
+    def __init__(self, text: str):
+        self.text = text
+        self.order = None
+
+
+def populate(db, n_test_cases: int, n_steps: int, n_sub_steps: int) -> list:
+    now = datetime.utcnow()
+    group_id, app_id, feature_id = ids(3)
+    db.execute(insert(Group), [{"id": group_id, "name": "bench", "created_at": now, "updated_at": now}])
+    db.execute(insert(Application), [{
+        "id": app_id, "name": "bench", "group_id": group_id, "status": "ACTIVE",
+        "created_at": now, "updated_at": now,
+    }])
+    db.execute(insert(Feature), [{
+        "id": feature_id, "name": "feature", "application_id": app_id, "status": "PLANNED",
+        "created_at": now, "updated_at": now,
+    }])
+    steps_data = [_Step(i, n_sub_steps) for i in range(n_steps)]
+    test_cases, step_rows, sub_step_rows = [], [], []
+    for test_case_id in ids(n_test_cases):
+        steps, subs = build_step_rows(test_case_id, steps_data, now)
+        test_cases.append({
+            "id": test_case_id, "name": test_case_id, "feature_id": feature_id, "application_id": app_id,
+            "status": "PRODUCTIVE", "type": "AUTOMATED", "priority": "MEDIUM", "tags": [],
+            "steps_document": serialize_step_rows(steps, subs), "created_at": now, "updated_at": now,
+        })
+        step_rows.extend(steps)
+        for rows in subs.values():
+            sub_step_rows.extend(rows)
+    insert_rows(db, test_cases, step_rows, sub_step_rows)
+    db.commit()
+    return [tc["id"] for tc in test_cases]
+
+
+def from_tables(db, test_case_id: str) -> list:
+    """The original endpoint body."""
+    tc = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    return serialize_steps(tc.steps)
+
+
+def from_document(db, test_case_id: str) -> list:
+    return db.query(TestCase.steps_document).filter(TestCase.id == test_case_id).scalar()
+
+
+def measure(label: str, read, test_case_ids: list, reads: int) -> tuple:
+    sample = random.Random(1).choices(test_case_ids, k=reads)
+    counter = StatementCounter()
+
+    def run():
+        for test_case_id in sample:
+            db = SessionLocal()
+            read(db, test_case_id)
+            db.close()
+    counter.reset()
+    elapsed = best_of(run, 3)
+    statements = counter.count / (3 * reads)
+    return label, f"{elapsed * 1000 / reads:7.2f} ms per read  {statements:.0f} statements"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--test-cases", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--sub-steps", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    reset_schema()
+    db = SessionLocal()
+    test_case_ids = populate(db, args.test_cases, args.steps, args.sub_steps)
+    assert from_tables(db, test_case_ids[0]) == from_document(db, test_case_ids[0])
+    db.close()
+
+    report(f"steps of one test case, {args.steps} steps x {args.sub_steps} sub-steps", [
+        measure("step tables (ORM relationships)", from_tables, test_case_ids, args.reads),
+        measure("steps_document", from_document, test_case_ids, args.reads),
+    ])
+
+
+if __name__ == "__main__":
+    main()
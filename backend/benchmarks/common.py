@@ -0,0 +1,68 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file by default. Set
+BENCH_DATABASE_URL to point them at another database (e.g. SQL Server).
+"""
+import os
+import tempfile
+import time
+
+_tmp_dir = tempfile.mkdtemp(prefix="docudash-bench-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+)
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import engine, Base, SessionLocal  # noqa: E402
+from app.utils.id_generator import generate_cuid  # noqa: E402
+
+
+def reset_schema() -> None:
+    """Drop and recreate every table."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def ids(n: int) -> list:
+    """Generate n unique CUIDs."""
+    return [generate_cuid() for _ in range(n)]
+
+
+class StatementCounter:
+    """Count statements sent to the database (round trips)."""
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """Best wall time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title: str, rows: list) -> None:
+    """Print a small aligned table of (label, value) rows."""
+    print(f"\n{title}")
+    print("-" * len(title))
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label.ljust(width)}  {value}")
+
+
+__all__ = [
+    "engine", "SessionLocal", "reset_schema", "ids",
+    "StatementCounter", "best_of", "report",
+]
@@ -0,0 +1,178 @@
+"""
+Minimal stub of the GitLab pipelines and jobs API, for exercising the
+pipeline sync engine locally.
+
+Run from the backend directory:
+    python -m benchmarks.gitlab_stub --projects 42,77 --pipelines 500 --port 8929
+
+then point GITLAB_URL at http://127.0.0.1:8929. Implements
+GET /api/v4/projects/:id/pipelines (updated_after, order_by=updated_at,
+sort, per_page, page, X-Next-Page) and GET .../pipelines/:id/jobs, with
+optional latency and throttling (every Nth request gets a 429).
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+STATUSES = ["success", "failed", "running", "canceled", "skipped", "success", "success"]
+
+
+class GitlabStub:
+    """In-memory projects -> pipelines, with request accounting."""
+    def __init__(self, projects, pipelines_per_project: int, jobs_per_pipeline: int = 3,
+                 latency: float = 0.0, throttle_every: int = 0):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.jobs_per_pipeline = jobs_per_pipeline
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self.pipelines = {}
+        base = datetime(2024, 1, 1)
+        for p, project in enumerate(projects):
+            self.pipelines[project] = [
+                self._pipeline(project, p * 1_000_000 + i + 1, base + timedelta(minutes=i))
+                for i in range(pipelines_per_project)
+            ]
+
+    @staticmethod
+    def _iso(value: datetime) -> str:
+        return value.isoformat(timespec="milliseconds") + "Z"
+
+    def _pipeline(self, project: str, pipeline_id: int, created: datetime) -> dict:
+        return {
+            "id": pipeline_id,
+            "project_id": project,
+            "ref": "main" if pipeline_id % 3 else "develop",
+            "status": STATUSES[pipeline_id % len(STATUSES)],
+            "web_url": f"http://gitlab.local/{project}/-/pipelines/{pipeline_id}",
+            "created_at": self._iso(created),
+            "updated_at": self._iso(created + timedelta(minutes=5)),
+        }
+
+    def touch(self, project: str, count: int) -> None:
+        """Update the first `count` pipelines of a project (new status, newer updated_at)."""
+        now = self._iso(datetime.utcnow())
+        for pipeline in self.pipelines[project][:count]:
+            pipeline["status"] = "failed" if pipeline["status"] != "failed" else "success"
+            pipeline["updated_at"] = now
+
+    def add(self, project: str, count: int) -> None:
+        pipelines = self.pipelines[project]
+        last = pipelines[-1]["id"] if pipelines else 1
+        for i in range(count):
+            pipelines.append(self._pipeline(project, last + i + 1, datetime.utcnow()))
+
+    def handle(self, path: str, query: dict):
+        """(status, headers, body) for one GET."""
+        with self._lock:
+            self.requests += 1
+            throttle = self.throttle_every and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if throttle:
+            return 429, {"Retry-After": "0"}, {"message": "429 Too Many Requests"}
+
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        # api/v4/projects/:id/pipelines[/:pid/jobs]
+        if len(parts) < 5 or parts[:3] != ["api", "v4", "projects"] or parts[4] != "pipelines":
+            return 404, {}, {"message": "404 Not Found"}
+        project = parts[3]
+        if project not in self.pipelines:
+            return 404, {}, {"message": "404 Project Not Found"}
+        per_page = int(query.get("per_page", ["20"])[0])
+        page = int(query.get("page", ["1"])[0])
+
+        if len(parts) == 7 and parts[6] == "jobs":
+            pipeline_id = int(parts[5])
+            created = next(
+                (p["created_at"] for p in self.pipelines[project] if p["id"] == pipeline_id), None
+            )
+            if created is None:
+                return 404, {}, {"message": "404 Pipeline Not Found"}
+            start = datetime.fromisoformat(created.rstrip("Z"))
+            items = [{
+                "id": pipeline_id * 100 + j,
+                "name": f"job-{j}",
+                "status": "success",
+                "started_at": self._iso(start + timedelta(seconds=30 * (j + 1))),
+            } for j in range(self.jobs_per_pipeline)]
+        else:
+            items = list(self.pipelines[project])
+            updated_after = query.get("updated_after", [None])[0]
+            if updated_after:
+                items = [p for p in items if p["updated_at"] > self._iso(datetime.fromisoformat(updated_after.rstrip("Z")))]
+            if query.get("order_by", ["id"])[0] == "updated_at":
+                items.sort(key=lambda p: (p["updated_at"], p["id"]))
+            else:
+                items.sort(key=lambda p: p["id"])
+            if query.get("sort", ["desc"])[0] == "desc":
+                items.reverse()
+
+        start = (page - 1) * per_page
+        headers = {"X-Page": str(page), "X-Per-Page": str(per_page)}
+        if start + per_page < len(items):
+            headers["X-Next-Page"] = str(page + 1)
+        return 200, headers, items[start:start + per_page]
+
+
+def make_handler(stub: GitlabStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; avoid delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, headers, body = stub.handle(url.path, parse_qs(url.query))
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(stub: GitlabStub, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; returns the server (see server_address)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", default="42")
+    parser.add_argument("--pipelines", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8929)
+    args = parser.parse_args()
+
+    stub = GitlabStub(args.projects.split(","), args.pipelines,
+                      latency=args.latency_ms / 1000, throttle_every=args.throttle_every)
+    server = serve(stub, args.port)
+    print(f"GitLab stub on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,17 @@ from webdriver_manager.chrome import ChromeDriverManager
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models import Application
+from app.services.rollup_service import backfill_rollups
+from app.services.retention_service import PurgedHistoryError, purge_expired_results
+from app.services.flaky_service import refresh_test_case_health
+from app.services.duration_sketch_service import backfill_duration_sketches
+from app.services.test_case_steps_service import backfill_steps_documents
+from app.services.step_library_service import rebuild_step_library
+from app.services.test_case_duplicate_service import find_duplicate_test_cases
+from app.services.feature_file_service import (
+    import_feature_files, read_directory, read_zip, FeatureFileError,
+    load_manifest, save_manifest, scan_feature_files
+)
 
 
 def ensure_output_dir():
@@ -384,6 +395,48 @@ def save_mapping_results(results: List[Dict], output_dir: Path):
     print(f"\n✅ Results saved to: {output_file}")
 
 
+def print_import_summary(summary: Dict) -> None:
+    """Print the counters of an import_feature_files summary."""
+    print(f"   Features: {summary['features']['created']} created, {summary['features']['updated']} updated")
+    cases = summary["testCases"]
+    print(f"   Test cases: {cases['created']} created, {cases['updated']} updated, {cases['unchanged']} unchanged")
+    if cases["missing"]:
+        print(f"   ⚠️  {cases['missing']} test cases are no longer in their file (kept)")
+    for error in summary["errors"]:
+        print(f"   ❌ {error['path']}: {error['message']}")
+
+
+def sync_feature_checkout(app_id: str, root: str, manifest_path: str, force: bool) -> None:
+    """One sync-features pass: import the files changed since the manifest, then update it."""
+    start = time.time()
+    manifest = {} if force else load_manifest(manifest_path, app_id, root)
+    changed, files, removed = scan_feature_files(root, manifest)
+    if changed:
+        db = SessionLocal()
+        try:
+            if not db.query(Application.id).filter(Application.id == app_id).first():
+                raise click.ClickException(f"Application {app_id} not found")
+            # Passing the removed files lets a renamed file keep its feature
+            summary = import_feature_files(db, app_id, changed, force, removed_paths=removed)
+            db.commit()
+        finally:
+            db.close()
+        print(f"\n📋 {len(changed)} changed of {len(files)} files")
+        print_import_summary(summary)
+        # Failed files stay out of the manifest so they are retried next time,
+        # and removed ones stay in so a failed rename can still move its feature
+        for error in summary["errors"]:
+            files.pop(error["path"], None)
+        if summary["errors"]:
+            files.update({path: manifest[path] for path in removed})
+    if removed:
+        print(f"   ⚠️  {len(removed)} files removed (their features are kept)")
+    if files != manifest:
+        save_manifest(manifest_path, app_id, root, files)
+    if changed or removed:
+        print(f"   Synced in {time.time() - start:.2f}s")
+
+
 @click.group()
 def cli():
     """DocuDash CLI tool."""
@@ -506,6 +559,240 @@ def scrape_apps_names(headed: str, timeout: int, delay: float):
         db.close()
 
 
+
+@cli.command("backfill-rollups")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Rebuild from this day (YYYY-MM-DD); default: oldest day never purged")
+@click.option("--batch-size", type=int, default=5000, help="Raw results read per batch (default: 5000)")
+def backfill_rollups_command(since, batch_size: int):
+    """
+    Rebuild the hourly/daily pipeline result rollups from raw results.
+    
+    Rollups for days before --since (or before the oldest raw result) are
+    kept. Days with results already purged by retention cannot be rebuilt,
+    so a --since before the last of them is refused.
+    """
+    print("🚀 Rebuilding result rollups...")
+    if since:
+        print(f"   Since: {since.date()}")
+    
+    db = SessionLocal()
+    try:
+        try:
+            total = backfill_rollups(db, since=since, batch_size=batch_size)
+        except PurgedHistoryError as exc:
+            raise click.ClickException(str(exc))
+        print(f"\n🎉 Rollups rebuilt from {total} results")
+    finally:
+        db.close()
+
+
+@cli.command("backfill-duration-sketches")
+@click.option("--batch-size", type=int, default=5000, help="Raw results read per batch (default: 5000)")
+def backfill_duration_sketches_command(batch_size: int):
+    """
+    Rebuild the duration percentile sketches from raw results.
+    
+    Ingestion keeps them up to date; this is only needed once for results
+    stored before they existed. Refused once retention has purged any
+    result, since the sketches cover all history.
+    """
+    print("🚀 Rebuilding duration sketches...")
+    
+    db = SessionLocal()
+    try:
+        try:
+            total = backfill_duration_sketches(db, batch_size=batch_size)
+        except PurgedHistoryError as exc:
+            raise click.ClickException(str(exc))
+        print(f"\n🎉 Sketches rebuilt from {total} results")
+    finally:
+        db.close()
+
+
+@cli.command("backfill-steps-documents")
+@click.option("--batch-size", type=int, default=1000, help="Test cases written per transaction (default: 1000)")
+def backfill_steps_documents_command(batch_size: int):
+    """
+    Store the steps document of every test case that has none.
+    
+    Needed once after migrate_add_steps_document.py; steps edited through
+    the API keep their document up to date.
+    """
+    print("🚀 Writing steps documents...")
+    
+    db = SessionLocal()
+    try:
+        start = time.time()
+        total = backfill_steps_documents(db, batch_size=batch_size)
+        print(f"\n🎉 {total} test cases written in {time.time() - start:.1f}s")
+    finally:
+        db.close()
+
+
+@cli.command("rebuild-step-library")
+@click.option("--batch-size", type=int, default=5000, help="Steps read per query (default: 5000)")
+def rebuild_step_library_command(batch_size: int):
+    """
+    Recount the step library from every stored step.
+    
+    Needed once to build the library; creating, editing, importing and
+    deleting test cases keep it up to date.
+    """
+    print("🚀 Rebuilding step library...")
+    
+    db = SessionLocal()
+    try:
+        start = time.time()
+        result = rebuild_step_library(db, batch_size=batch_size)
+        print(f"   {result['created']} new steps, {result['updated']} counts updated")
+        print(f"\n🎉 {result['templates']} steps from {result['steps']} step rows in {time.time() - start:.1f}s")
+    finally:
+        db.close()
+
+
+@cli.command("find-duplicates")
+@click.option("--threshold", type=float, default=None, help="Minimum step similarity, 0-1 (default: DUPLICATE_THRESHOLD)")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: DUPLICATE_WORKERS, or one per CPU)")
+def find_duplicates_command(threshold: Optional[float], workers: Optional[int]):
+    """
+    Find test cases with near-identical steps and group them in clusters.
+    
+    Clusters are stored in duplicate_clusters and reviewed through
+    GET /api/test-cases/duplicates.
+    """
+    print("🚀 Looking for duplicate test cases...")
+    
+    db = SessionLocal()
+    try:
+        start = time.time()
+        stats = find_duplicate_test_cases(db, threshold=threshold, workers=workers)
+        print(f"   Test cases: {stats['testCases']}")
+        print(f"   Candidate pairs: {stats['candidates']}")
+        print(f"   Similar pairs: {stats['pairs']}")
+        print(f"   Clusters: {stats['clusters']} ({stats['created']} new, {stats['kept']} kept, {stats['removed']} removed)")
+        print(f"\n🎉 Done in {time.time() - start:.1f}s")
+    finally:
+        db.close()
+
+
+@cli.command("purge-results")
+@click.option("--project", default=None, help="Only this GitLab project ID (default: all projects)")
+@click.option("--dry-run", is_flag=True, help="Only report what would be purged")
+@click.option("--no-archive", is_flag=True, help="Delete without writing the NDJSON archive")
+def purge_results_command(project: Optional[str], dry_run: bool, no_archive: bool):
+    """
+    Archive and delete pipelines older than the retention period.
+    
+    Retention is RESULT_RETENTION_DAYS (per project overrides in
+    RESULT_RETENTION_PROJECT_DAYS). Archives are written under
+    RESULT_ARCHIVE_DIR; rollups are not touched.
+    """
+    print("🚀 Purging expired pipeline history..." + (" (dry run)" if dry_run else ""))
+    
+    db = SessionLocal()
+    try:
+        report = purge_expired_results(db, gitlab_project_id=project, dry_run=dry_run, archive=not no_archive)
+        for project_id, stats in report.items():
+            print(f"\n📋 Project {project_id} (before {stats['cutoff']})")
+            print(f"   Pipelines: {stats['pipelines']}")
+            print(f"   Results: {stats['results']}")
+            if stats["archive"]:
+                print(f"   Archive: {stats['archive']}")
+        print("\n🎉 Done")
+    finally:
+        db.close()
+
+
+@cli.command("refresh-test-health")
+@click.option("--window", type=int, default=None, help="Recent runs scored per test case (default: FLAKY_WINDOW_RUNS)")
+def refresh_test_health_command(window: Optional[int]):
+    """
+    Recompute flip rate, failure rate and flakiness score of every test case.
+    
+    Results are stored in test_case_health and served by
+    GET /api/test-cases/flaky.
+    """
+    print("🚀 Scoring test case history...")
+    
+    db = SessionLocal()
+    try:
+        start = time.time()
+        stats = refresh_test_case_health(db, window=window)
+        print(f"   Test cases: {stats['testCases']}")
+        print(f"   Results read: {stats['results']}")
+        print(f"   Scored: {stats['scored']}")
+        print(f"   Flaky: {stats['flaky']}")
+        print(f"\n🎉 Done in {time.time() - start:.1f}s")
+    finally:
+        db.close()
+
+
+@cli.command("import-features")
+@click.argument("app_id")
+@click.argument("path", type=click.Path(exists=True))
+@click.option("--force", is_flag=True, help="Also import files unchanged since their last import")
+def import_features_command(app_id: str, path: str, force: bool):
+    """
+    Import the .feature files of a directory or zip into an application.
+    
+    Features are matched by file path (relative to PATH), then by name;
+    test cases by scenario name. Everything is written in one transaction.
+    """
+    print(f"🚀 Importing .feature files from {path}...")
+    
+    db = SessionLocal()
+    try:
+        if not db.query(Application.id).filter(Application.id == app_id).first():
+            raise click.ClickException(f"Application {app_id} not found")
+        start = time.time()
+        try:
+            if os.path.isdir(path):
+                summary = import_feature_files(db, app_id, read_directory(path), force)
+            else:
+                with open(path, "rb") as archive:
+                    summary = import_feature_files(db, app_id, read_zip(archive), force)
+        except FeatureFileError as exc:
+            raise click.ClickException(str(exc))
+        db.commit()
+        print(f"   Files: {summary['files']} ({summary['unchanged']} unchanged)")
+        print_import_summary(summary)
+        print(f"\n🎉 Done in {time.time() - start:.1f}s")
+    finally:
+        db.close()
+
+
+@cli.command("sync-features")
+@click.argument("app_id")
+@click.argument("root", type=click.Path(exists=True, file_okay=False))
+@click.option("--manifest", default=None, help="Manifest file (default: output/feature-manifest-<APP_ID>.json)")
+@click.option("--watch", is_flag=True, help="Keep running and sync again every --interval seconds")
+@click.option("--interval", type=float, default=2.0, help="Seconds between scans with --watch (default: 2)")
+@click.option("--force", is_flag=True, help="Ignore the manifest and stored hashes; re-import every file")
+def sync_features_command(app_id: str, root: str, manifest: Optional[str], watch: bool, interval: float, force: bool):
+    """
+    Sync the .feature files of a checkout into an application, incrementally.
+    
+    A manifest of path -> mtime/size/hash from the previous run lets
+    unchanged files be skipped without reading them; changed files are
+    imported as with import-features, keyed by their path relative to ROOT.
+    """
+    manifest_path = manifest or str(ensure_output_dir() / f"feature-manifest-{app_id}.json")
+    print(f"🚀 Syncing .feature files from {root}..." + (" (Ctrl+C to stop)" if watch else ""))
+    
+    start = time.time()
+    sync_feature_checkout(app_id, root, manifest_path, force)
+    if not watch:
+        print(f"\n🎉 Done in {time.time() - start:.2f}s")
+        return
+    try:
+        while True:
+            time.sleep(interval)
+            sync_feature_checkout(app_id, root, manifest_path, False)
+    except KeyboardInterrupt:
+        print("\n🎉 Stopped")
+
+
 if __name__ == "__main__":
     cli()
 
@@ -0,0 +1,49 @@
+"""
+Add the imported file hash to features.
+
+Used by .feature file imports to skip files that did not change; it is
+filled on the next import.
+
+Run once:
+    python migrate_add_feature_file_hash.py
+"""
+
+from sqlalchemy import text
+
+from app.database import engine
+
+
+def migrate() -> None:
+    """Add feature_file_hash to features."""
+    print("Starting migration for features.feature_file_hash...")
+
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text(
+                    """
+                    SELECT COLUMN_NAME
+                    FROM INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_NAME = 'features'
+                    """
+                )
+            )
+            existing = {row[0] for row in result}
+
+            if "feature_file_hash" not in existing:
+                conn.execute(text("ALTER TABLE features ADD feature_file_hash NVARCHAR(64) NULL"))
+                print("  Added column: feature_file_hash")
+            else:
+                print("  Column feature_file_hash already exists")
+
+            conn.commit()
+            print("\nMigration completed successfully!")
+
+        except Exception as exc:  # noqa: BLE001
+            print(f"\nMigration failed: {exc}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,50 @@
+"""
+Index pipeline results by pipeline.
+
+The (test_case_id, pipeline_id) unique key does not help queries over a
+whole pipeline (diffs, retention), which otherwise scan the table.
+
+Run once:
+    python migrate_add_pipeline_results_index.py
+"""
+
+from sqlalchemy import text
+
+from app.database import engine
+
+INDEX_NAME = "ix_test_case_pipeline_results_pipeline"
+
+
+def migrate() -> None:
+    """Create the (pipeline_id, test_case_id) index, covering status and duration."""
+    print(f"Starting migration for {INDEX_NAME}...")
+
+    with engine.connect() as conn:
+        try:
+            indexes = {
+                row[0] for row in conn.execute(
+                    text("SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('test_case_pipeline_results')")
+                )
+            }
+            if INDEX_NAME not in indexes:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX {INDEX_NAME} ON test_case_pipeline_results (pipeline_id, test_case_id) "
+                        "INCLUDE (status, duration)"
+                    )
+                )
+                print(f"  Created index: {INDEX_NAME}")
+            else:
+                print(f"  Index {INDEX_NAME} already exists")
+
+            conn.commit()
+            print("\nMigration completed successfully!")
+
+        except Exception as exc:  # noqa: BLE001
+            print(f"\nMigration failed: {exc}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,120 @@
+"""
+Add the normalized scenario lookup key to test_cases.
+
+Adds scenario_key and application_id, backfills them, and creates the
+lookup index plus the unique (application_id, scenario_key) index.
+Test cases whose scenario duplicates an older one in the same
+application keep a NULL key and are listed so they can be renamed.
+
+Run once:
+    python migrate_add_scenario_key.py
+"""
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.utils.normalization import normalize_scenario_name
+
+BATCH_SIZE = 1000
+
+
+def migrate() -> None:
+    """Add and backfill scenario_key / application_id on test_cases."""
+    print("Starting migration for test_cases.scenario_key...")
+
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text(
+                    """
+                    SELECT COLUMN_NAME
+                    FROM INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_NAME = 'test_cases'
+                    """
+                )
+            )
+            existing = {row[0] for row in result}
+
+            if "scenario_key" not in existing:
+                conn.execute(text("ALTER TABLE test_cases ADD scenario_key NVARCHAR(400) NULL"))
+                print("  Added column: scenario_key")
+
+            if "application_id" not in existing:
+                conn.execute(text("ALTER TABLE test_cases ADD application_id NVARCHAR(64) NULL"))
+                print("  Added column: application_id")
+            conn.commit()
+
+            # application_id from each test case's feature
+            conn.execute(
+                text(
+                    """
+                    UPDATE tc SET application_id = f.application_id
+                    FROM test_cases tc
+                    JOIN features f ON f.id = tc.feature_id
+                    """
+                )
+            )
+            print("  Backfilled application_id")
+
+            # scenario_key, oldest test case first so it keeps the key
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT id, application_id, scenario_name
+                    FROM test_cases
+                    WHERE scenario_name IS NOT NULL
+                    ORDER BY created_at
+                    """
+                )
+            ).fetchall()
+            seen = set()
+            updates = []
+            duplicates = []
+            for test_case_id, application_id, scenario_name in rows:
+                key = normalize_scenario_name(scenario_name)
+                if key and (application_id, key) in seen:
+                    duplicates.append((test_case_id, scenario_name))
+                    key = None
+                elif key:
+                    seen.add((application_id, key))
+                updates.append({"id": test_case_id, "key": key})
+
+            statement = text("UPDATE test_cases SET scenario_key = :key WHERE id = :id")
+            for start in range(0, len(updates), BATCH_SIZE):
+                conn.execute(statement, updates[start:start + BATCH_SIZE])
+            print(f"  Backfilled scenario_key for {len(updates)} test cases")
+
+            if duplicates:
+                print(f"  {len(duplicates)} duplicated scenarios left without key:")
+                for test_case_id, scenario_name in duplicates:
+                    print(f"    {test_case_id}: {scenario_name}")
+
+            indexes = {
+                row[0] for row in conn.execute(
+                    text("SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('test_cases')")
+                )
+            }
+            if "ix_test_cases_scenario_key" not in indexes:
+                conn.execute(text("CREATE INDEX ix_test_cases_scenario_key ON test_cases (scenario_key)"))
+                print("  Created index: ix_test_cases_scenario_key")
+            if "uq_test_case_scenario_key" not in indexes:
+                conn.execute(
+                    text(
+                        "CREATE UNIQUE INDEX uq_test_case_scenario_key "
+                        "ON test_cases (application_id, scenario_key) "
+                        "WHERE scenario_key IS NOT NULL"
+                    )
+                )
+                print("  Created index: uq_test_case_scenario_key")
+
+            conn.commit()
+            print("\nMigration completed successfully!")
+
+        except Exception as exc:  # noqa: BLE001
+            print(f"\nMigration failed: {exc}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,49 @@
+"""
+Add the denormalized steps document to test_cases.
+
+Test cases without one are read from the step tables until
+`python cli.py backfill-steps-documents` fills them in.
+
+Run once:
+    python migrate_add_steps_document.py
+"""
+
+from sqlalchemy import text
+
+from app.database import engine
+
+
+def migrate() -> None:
+    """Add steps_document to test_cases."""
+    print("Starting migration for test_cases.steps_document...")
+
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text(
+                    """
+                    SELECT COLUMN_NAME
+                    FROM INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_NAME = 'test_cases'
+                    """
+                )
+            )
+            existing = {row[0] for row in result}
+
+            if "steps_document" not in existing:
+                conn.execute(text("ALTER TABLE test_cases ADD steps_document NVARCHAR(MAX) NULL"))
+                print("  Added column: steps_document")
+            else:
+                print("  Column steps_document already exists")
+
+            conn.commit()
+            print("\nMigration completed successfully!")
+
+        except Exception as exc:  # noqa: BLE001
+            print(f"\nMigration failed: {exc}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
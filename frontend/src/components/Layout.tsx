@@ -17,6 +17,7 @@ import {
   BellIcon,
 } from '@heroicons/react/24/outline';
 import { useAuthStore } from '@/store/authStore';
+import { authApi } from '@/services/api';
 import clsx from 'clsx';
 
 const navigation = [
@@ -36,10 +37,11 @@ const adminNavigation = [
 export default function Layout() {
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [userMenuOpen, setUserMenuOpen] = useState(false);
-  const { user, logout } = useAuthStore();
+  const { user, refreshToken, logout } = useAuthStore();
   const navigate = useNavigate();
 
   const handleLogout = () => {
+    authApi.logout(refreshToken).catch(() => undefined);
     logout();
     navigate('/login');
   };
@@ -32,8 +32,8 @@ export default function LoginPage() {
     try {
       setLoading(true);
       const response = await authApi.login(data.email, data.password);
-      const { token, user } = response.data.data;
-      setAuth(token, user);
+      const { token, refreshToken, user } = response.data.data;
+      setAuth(token, user, refreshToken);
       toast.success(`¡Bienvenido, ${user.firstName}!`);
       navigate('/');
     } catch (error: any) {
@@ -25,7 +25,7 @@ interface PasswordForm {
 
 export default function ProfilePage() {
   const [activeTab, setActiveTab] = useState<'profile' | 'password' | 'subscriptions'>('profile');
-  const { user, updateUser } = useAuthStore();
+  const { user, updateUser, setTokens } = useAuthStore();
   const queryClient = useQueryClient();
 
   const { register, handleSubmit, reset, formState: { errors }, watch } = useForm<PasswordForm>();
@@ -60,7 +60,10 @@ export default function ProfilePage() {
   const changePasswordMutation = useMutation({
     mutationFn: (data: PasswordForm) =>
       authApi.changePassword(data.currentPassword, data.newPassword),
-    onSuccess: () => {
+    onSuccess: (response) => {
+      // Other sessions are signed out; keep this one with the new tokens
+      const { token, refreshToken } = response.data.data;
+      setTokens(token, refreshToken);
       toast.success('Contraseña actualizada exitosamente');
       reset();
     },
@@ -1,4 +1,4 @@
-import axios from 'axios';
+import axios, { InternalAxiosRequestConfig } from 'axios';
 import { useAuthStore } from '@/store/authStore';
 
 const API_URL = '/api';
@@ -24,11 +24,49 @@ api.interceptors.request.use(
   }
 );
 
+// Access tokens are short-lived: renew them once with the refresh token.
+// Concurrent 401s share a single refresh request.
+let refreshPromise: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = useAuthStore.getState().refreshToken;
+  if (!refreshToken) {
+    return Promise.resolve(null);
+  }
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${API_URL}/auth/refresh`, { refreshToken })
+      .then((response) => {
+        const { token, refreshToken: newRefreshToken, user } = response.data.data;
+        useAuthStore.getState().setTokens(token, newRefreshToken);
+        useAuthStore.getState().updateUser(user);
+        return token as string;
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // Response interceptor for handling errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
+  async (error) => {
+    const original = error.config as (InternalAxiosRequestConfig & { _retry?: boolean }) | undefined;
+    const isAuthCall = ['/auth/login', '/auth/refresh', '/auth/logout'].some((path) =>
+      original?.url?.startsWith(path)
+    );
+    if (error.response?.status === 401 && original && !original._retry && !isAuthCall) {
+      original._retry = true;
+      const token = await refreshAccessToken();
+      if (token) {
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      }
+    }
+    if (error.response?.status === 401 && !isAuthCall) {
       useAuthStore.getState().logout();
       window.location.href = '/login';
     }
@@ -47,6 +85,8 @@ export const authApi = {
     lastName: string;
   }) => api.post('/auth/register', data),
   me: () => api.get('/auth/me'),
+  logout: (refreshToken?: string | null) =>
+    api.post('/auth/logout', { refreshToken }),
   changePassword: (currentPassword: string, newPassword: string) =>
     api.post('/auth/change-password', { currentPassword, newPassword }),
 };
@@ -4,9 +4,11 @@ import { AuthUser } from '@/types';
 
 interface AuthState {
   token: string | null;
+  refreshToken: string | null;
   user: AuthUser | null;
   isAuthenticated: boolean;
-  setAuth: (token: string, user: AuthUser) => void;
+  setAuth: (token: string, user: AuthUser, refreshToken?: string | null) => void;
+  setTokens: (token: string, refreshToken: string) => void;
   logout: () => void;
   updateUser: (user: Partial<AuthUser>) => void;
 }
@@ -15,17 +17,25 @@ export const useAuthStore = create<AuthState>()(
   persist(
     (set) => ({
       token: null,
+      refreshToken: null,
       user: null,
       isAuthenticated: false,
-      setAuth: (token, user) =>
+      setAuth: (token, user, refreshToken = null) =>
         set({
           token,
+          refreshToken,
           user,
           isAuthenticated: true,
         }),
+      setTokens: (token, refreshToken) =>
+        set({
+          token,
+          refreshToken,
+        }),
       logout: () =>
         set({
           token: null,
+          refreshToken: null,
           user: null,
           isAuthenticated: false,
         }),
@@ -38,6 +48,7 @@ export const useAuthStore = create<AuthState>()(
       name: 'auth-storage',
       partialize: (state) => ({
         token: state.token,
+        refreshToken: state.refreshToken,
         user: state.user,
         isAuthenticated: state.isAuthenticated,
       }),